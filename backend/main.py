@@ -4,26 +4,43 @@ import os
 import io
 import json
 import asyncio
+import functools
+import logging
 import time
 from collections import defaultdict, deque
 from datetime import datetime, timezone
 from pathlib import Path
-from typing import List, Optional
+from typing import AsyncIterator, List, Optional
 from urllib.parse import urlparse, quote_plus, urlunparse
 
 import numpy as np
 import pandas as pd
 from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks
+from fastapi import FastAPI, HTTPException, UploadFile, File, BackgroundTasks, Response
+from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel, Field
 from starlette.requests import Request
 
 load_dotenv()
 
-from src.multi_predict import MultiModelPredictor, close_shared_client
+from src.logging_config import configure_logging, shutdown_logging
+
+configure_logging()
+logger = logging.getLogger(__name__)
+
+from src.request_parser import ParsedRequest
+from src.multi_predict import MultiModelPredictor, _PAYLOAD_CACHE, _BATCH_CHUNK_ROWS, batch_summary, detach_late
+from src.http_gateway import get_gateway, close_gateway
+from src.compute_pool import get_compute_pool, shutdown_compute_pool
+from src.dns_resolver import shutdown_resolver
+from src.logging_config import log_queue_stats
+from src import metrics
+from src import tracing
+from src.tracing import span, traced
 from src.domain_intelligence import DomainIntelligence
 from src.model4_features import extract_model4_features
+from src.sessionizer import Sessionizer
 from src import threat_engine
 from src.decision_controller import (
     scan_payload,
@@ -57,8 +74,74 @@ async def normalize_api_prefix(request: Request, call_next):
         request.scope["path"] = path[4:]
     return await call_next(request)
 
+
+# ── Request metrics ─────────────────────────────────────────────────────────
+HTTP_LATENCY = metrics.histogram(
+    "cyhub_http_request_duration_seconds",
+    "HTTP request latency by endpoint",
+    ["endpoint", "method"],
+)
+HTTP_REQUESTS = metrics.counter(
+    "cyhub_http_requests_total",
+    "HTTP requests by endpoint and status code",
+    ["endpoint", "method", "status"],
+)
+_route_paths: Optional[set] = None
+
+
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    """Per-endpoint latency + status counts (unknown paths collapse to 'other')."""
+    global _route_paths
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        if _route_paths is None:
+            _route_paths = {getattr(r, "path", "") for r in app.router.routes}
+        path = request.scope.get("path", "")
+        if path.startswith("/api/"):
+            path = path[4:]
+        endpoint = path if path in _route_paths else "other"
+        HTTP_LATENCY.labels(endpoint, request.method).observe(time.perf_counter() - start)
+        HTTP_REQUESTS.labels(endpoint, request.method, str(status)).inc()
+
+
+# Pipelines with per-stage tracing (see src/tracing.py)
+_TRACED_PATHS = {"/analyze", "/predict-url"}
+
+
+@app.middleware("http")
+async def trace_pipeline(request: Request, call_next):
+    """Sample /analyze and /predict-url into a per-stage trace.
+
+    A client-supplied X-Trace-Id forces tracing under that ID.
+    """
+    path = request.scope.get("path", "")
+    if path.startswith("/api/"):
+        path = path[4:]
+    if path not in _TRACED_PATHS:
+        return await call_next(request)
+
+    incoming_id = request.headers.get("x-trace-id")
+    token = tracing.start_trace(incoming_id[:64] if incoming_id else None, force=bool(incoming_id))
+    try:
+        response = await call_next(request)
+    finally:
+        trace = tracing.finish_trace(token)
+    if trace is not None:
+        response.headers["X-Trace-Id"] = trace.trace_id
+        if tracing.TRACE_SERVER_TIMING and trace.spans:
+            response.headers["Server-Timing"] = trace.server_timing()
+    return response
+
+
 predictor: Optional[MultiModelPredictor] = None
 domain_intelligence: Optional[DomainIntelligence] = None
+_loop_lag_task: Optional[asyncio.Task] = None
 
 # ── Persistent file-based fallback log storage ─────────────────────────────
 LOGS_FILE = Path(os.getenv("LOGS_FILE", "data/request_logs.json"))
@@ -70,7 +153,7 @@ def _load_logs_from_disk() -> List[dict]:
             with LOGS_FILE.open("r", encoding="utf-8") as f:
                 return json.load(f)
         except Exception as e:
-            print(f"[WARN] Could not load logs file: {e}")
+            logger.warning("Could not load logs file: %s", e)
     return []
 
 def _save_logs_to_disk(logs: List[dict]) -> None:
@@ -82,7 +165,7 @@ def _save_logs_to_disk(logs: List[dict]) -> None:
             json.dump(logs, f, indent=2)
         tmp.replace(LOGS_FILE)
     except Exception as e:
-        print(f"[WARN] Could not persist logs to disk: {e}")
+        logger.warning("Could not persist logs to disk: %s", e)
 
 request_logs: List[dict] = _load_logs_from_disk()
 
@@ -90,6 +173,8 @@ request_logs: List[dict] = _load_logs_from_disk()
 REQUEST_WINDOW = 20  # sliding window: most-recent N requests per IP
 request_history: defaultdict = defaultdict(lambda: deque(maxlen=REQUEST_WINDOW))
 bot_alerts: dict = {}  # ip → probability (0.0–1.0); set by background task
+# Running Model 2 flow features per IP, fed to the model router by /analyze
+sessionizer = Sessionizer()
 
 # ── Risk Memory (IP/domain reputation tracking) ──────────────────────────────
 risk_memory = RiskMemory()
@@ -97,6 +182,50 @@ risk_memory = RiskMemory()
 # ── Feedback Store (tracks verdict corrections for threshold tuning) ─────────
 feedback_store: List[dict] = []
 
+# ── Structure sizes + queue depths (evaluated at scrape time) ────────────────
+_SIZES = metrics.gauge("cyhub_structure_entries", "Entries held in in-memory structures", ["structure"])
+_SIZES.set_function(lambda: len(request_logs), "request_logs")
+_SIZES.set_function(lambda: len(request_history), "request_history")
+_SIZES.set_function(lambda: len(bot_alerts), "bot_alerts")
+_SIZES.set_function(lambda: len(sessionizer), "sessions")
+_SIZES.set_function(lambda: len(feedback_store), "feedback_store")
+_SIZES.set_function(lambda: len(_PAYLOAD_CACHE), "payload_cache")
+for _table in ("ip_scores", "domains", "patterns"):
+    _SIZES.set_function(lambda t=_table: risk_memory.sizes()[t], f"risk_memory_{_table}")
+for _table in ("classification", "blocklist", "whitelist", "blocklist_index", "dns", "verdicts"):
+    _SIZES.set_function(
+        lambda t=_table: domain_intelligence.cache_sizes()[t] if domain_intelligence else 0,
+        f"domain_cache_{_table}",
+    )
+
+_QUEUES = metrics.gauge("cyhub_queue_depth", "Pending items in background queues", ["queue"])
+_QUEUES.set_function(lambda: get_compute_pool().queue_depths()["interactive"], "compute_interactive")
+_QUEUES.set_function(lambda: get_compute_pool().queue_depths()["batch"], "compute_batch")
+_QUEUES.set_function(lambda: log_queue_stats()["depth"], "log")
+metrics.counter(
+    "cyhub_log_records_dropped_total", "Log records dropped because the log queue was full",
+    fn=lambda: log_queue_stats()["dropped"],
+)
+
+# ── Event-loop lag ───────────────────────────────────────────────────────────
+LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", "0.5"))
+LOOP_LAG = metrics.histogram(
+    "cyhub_event_loop_lag_seconds",
+    "Delay between a scheduled event-loop wake-up and when it actually ran",
+    buckets=(0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+LOOP_LAG_LAST = metrics.gauge("cyhub_event_loop_lag_last_seconds", "Most recent event-loop lag sample")
+
+
+async def _monitor_loop_lag() -> None:
+    """Background loop: sample how late asyncio.sleep wakes up."""
+    while True:
+        start = time.perf_counter()
+        await asyncio.sleep(LOOP_LAG_INTERVAL)
+        lag = max(0.0, time.perf_counter() - start - LOOP_LAG_INTERVAL)
+        LOOP_LAG.observe(lag)
+        LOOP_LAG_LAST.set(lag)
+
 def _encode_mongo_uri(uri: str) -> str:
     """
     Re-encode username and password inside a MongoDB URI so that special
@@ -133,11 +262,11 @@ try:
         mongo_client = AsyncIOMotorClient(mongo_uri)
         mongo_db = mongo_client[os.getenv("MONGODB_DB", "cyhub")]
         mongo_collection = mongo_db["request_logs"]
-        print("[INFO] MongoDB client initialized")
+        logger.info("MongoDB client initialized")
     else:
-        print("[INFO] MongoDB not configured — using in-memory log storage")
+        logger.info("MongoDB not configured — using in-memory log storage")
 except Exception as e:
-    print(f"[WARN] MongoDB init failed: {e} — using in-memory log storage")
+    logger.warning("MongoDB init failed: %s — using in-memory log storage", e)
 
 
 # ── Behavioral bot detection helpers ────────────────────────────────────────
@@ -152,6 +281,20 @@ def log_request(ip: str, endpoint: str, method: str, user_agent: str) -> None:
     })
 
 
+def session_flow_features(parsed: ParsedRequest) -> Optional[List[float]]:
+    """Add an analyzed request to its client's session and return the
+    session's flow features for Model 2.
+
+    The session is keyed by the client named in the analyzed request itself
+    (X-Forwarded-For / X-Real-IP), not by the caller of /analyze. None when
+    the request names no client or the session is shorter than
+    SESSION_MIN_REQUESTS.
+    """
+    if not parsed.client_ip:
+        return None
+    return sessionizer.update(parsed.client_ip, parsed.url or "/", time.time(), parsed.user_agent)
+
+
 def _compute_bot_probability(history: deque) -> float:
     """Heuristic behavioral bot score derived from request history.
 
@@ -191,7 +334,7 @@ async def analyze_bot_behavior(ip: str) -> None:
 
     if probability > 0.5:
         bot_alerts[ip] = probability
-        print(f"[BOT] Behavioral alert — IP={ip} score={probability:.2f}")
+        logger.info("Bot behavioral alert — IP=%s score=%.2f", ip, probability)
     elif ip in bot_alerts and probability < 0.2:
         # Clear stale alert once behavior normalises
         del bot_alerts[ip]
@@ -207,29 +350,30 @@ async def _periodic_cleanup() -> None:
             if not hist or hist[-1]["timestamp"] < cutoff:
                 del request_history[ip]
                 bot_alerts.pop(ip, None)
+        sessionizer.evict_idle()
 
 
 @app.on_event("startup")
 async def startup():
-    global predictor, mongo_collection, domain_intelligence
+    global predictor, mongo_collection, domain_intelligence, _loop_lag_task
     # Verify MongoDB is reachable; disable it if not so every endpoint falls
     # back to in-memory storage without raising uncaught exceptions.
     if mongo_collection is not None:
         try:
             await mongo_client.admin.command("ping")
-            print("[INFO] MongoDB ping OK")
+            logger.info("MongoDB ping OK")
         except Exception as e:
-            print(f"[WARN] MongoDB unreachable ({e}) — using in-memory storage")
+            logger.warning("MongoDB unreachable (%s) — using in-memory storage", e)
             mongo_collection = None
 
     # Initialize Multi-Model Predictor (requires base IsolationForest model)
     model_path = os.getenv("MODEL_PATH", "models/isolation_forest.pkl")
     try:
         predictor = MultiModelPredictor(base_model_path=model_path)
-        print(f"[INFO] Multi-model pipeline loaded (base: {model_path})")
+        logger.info("Multi-model pipeline loaded (base: %s)", model_path)
     except Exception as exc:
-        print(f"[WARN] Model pipeline failed to load: {exc}")
-        print("[WARN] /predict endpoints will return 503 until models are available")
+        logger.warning("Model pipeline failed to load: %s", exc)
+        logger.warning("/predict endpoints will return 503 until models are available")
 
     # Initialize Domain Intelligence Layer (works with or without MongoDB)
     try:
@@ -237,29 +381,50 @@ async def startup():
         if mongo_client is not None:
             di_db = mongo_client[os.getenv("MONGODB_DB", "cyhub")]
         domain_intelligence = DomainIntelligence(di_db)
-        print(f"[INFO] Domain Intelligence Layer initialized (MongoDB: {'yes' if di_db is not None else 'no — in-memory only'})")
+        logger.info("Domain Intelligence Layer initialized (MongoDB: %s)",
+                    "yes" if di_db is not None else "no — in-memory only")
+        if di_db is not None:
+            # Bulk-loads the MongoDB whitelist now, then keeps it fresh
+            asyncio.create_task(domain_intelligence.run_whitelist_refresh())
+        # Builds / maps the shared blocklist index snapshot, then keeps it fresh
+        asyncio.create_task(domain_intelligence.run_blocklist_refresh())
 
         # Optionally load blocklists on startup (requires MongoDB)
         load_blocklists_on_startup = os.getenv("LOAD_BLOCKLISTS_ON_STARTUP", "false").lower() == "true"
         if load_blocklists_on_startup and di_db is not None:
-            print("[INFO] Loading public blocklists on startup...")
+            logger.info("Loading public blocklists on startup...")
             asyncio.create_task(domain_intelligence.load_blocklists_from_sources())
     except Exception as e:
-        print(f"[WARN] Domain Intelligence Layer failed to initialize: {e}")
+        logger.warning("Domain Intelligence Layer failed to initialize: %s", e)
         # Still create a minimal instance so /analyze doesn't 503
         domain_intelligence = DomainIntelligence(None)
 
+    # Open keep-alive connections to the remote model hosts before traffic arrives
+    if os.getenv("HTTP_WARMUP", "true").lower() == "true":
+        warm_urls = [domain_intelligence.hf_model4_url]
+        if predictor is not None:
+            warm_urls.extend(predictor.remote_urls())
+        asyncio.create_task(get_gateway().warm_up(warm_urls))
+
     # Start background cleanup for request history
     asyncio.create_task(_periodic_cleanup())
-    print("[INFO] Behavioral bot detection enabled (in-memory history)")
+    _loop_lag_task = asyncio.create_task(_monitor_loop_lag())
+    logger.info("Behavioral bot detection enabled (in-memory history)")
 
 
 @app.on_event("shutdown")
 async def shutdown():
     """Clean up shared resources."""
-    await close_shared_client()
+    if _loop_lag_task is not None:
+        _loop_lag_task.cancel()
+    await close_gateway()
+    if predictor is not None:
+        predictor.shutdown()
+    shutdown_compute_pool()
+    shutdown_resolver()
     if mongo_client is not None:
         mongo_client.close()
+    shutdown_logging()
 
 
 @app.api_route("/", methods=["GET", "HEAD"])
@@ -328,6 +493,14 @@ class BatchResultItem(BaseModel):
     threat_type: str = "Normal"
 
 
+class BatchDedupStats(BaseModel):
+    """Work saved by batch deduplication (BATCH_DEDUP)."""
+    mode: str                 # off | exact | template
+    scored_requests: int      # rows actually scored
+    reused_results: int       # rows answered from a duplicate's result
+    saved_rate: float         # percentage (0-100) of rows not scored
+
+
 class BatchSummaryResponse(BaseModel):
     """Batch analysis summary with contamination rate."""
     total_requests: int
@@ -337,6 +510,7 @@ class BatchSummaryResponse(BaseModel):
     path_traversal: int
     unknown_attack: int
     contamination_rate: float  # percentage (0-100)
+    deduplication: Optional[BatchDedupStats] = None
     results: List[BatchResultItem]
 
 
@@ -435,7 +609,7 @@ async def save_log(raw_request: str, anomaly_score: float, prediction: str):
             request_logs.append(log_entry)
             return
         except Exception as e:
-            print(f"[WARN] MongoDB insert failed: {e} — falling back to disk storage")
+            logger.warning("MongoDB insert failed: %s — falling back to disk storage", e)
 
     # File-backed fallback — survives server restarts
     request_logs.append(log_entry)
@@ -465,7 +639,7 @@ async def predict_single(body: PredictRequest):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] /predict endpoint failed: {e}")
+        logger.error("/predict endpoint failed: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(
@@ -474,8 +648,53 @@ async def predict_single(body: PredictRequest):
         )
 
 
+# Chunks scored concurrently by a streaming /predict/batch (bounds peak memory)
+BATCH_STREAM_WINDOW = int(os.getenv("BATCH_STREAM_WINDOW", "2"))
+
+
+async def _iter_csv_chunks(reader) -> AsyncIterator[List[str]]:
+    """Pull BATCH_CHUNK_ROWS-row frames off a chunked CSV reader without blocking the loop."""
+    loop = asyncio.get_running_loop()
+    while True:
+        frame = await loop.run_in_executor(None, next, reader, None)
+        if frame is None:
+            return
+        requests = frame["request"].dropna().tolist()
+        if requests:
+            yield requests
+
+
+async def _stream_batch_ndjson(first: List[str], rest: AsyncIterator[List[str]]) -> AsyncIterator[str]:
+    """One NDJSON line per scored row, then a final {"summary": ...} line."""
+
+    async def chunks() -> AsyncIterator[List[str]]:
+        yield first
+        async for chunk in rest:
+            yield chunk
+
+    counts: defaultdict = defaultdict(int)
+    total = 0
+    try:
+        async for chunk_results, chunk_counts in predictor.stream_batch_with_threshold(
+            chunks(), window=BATCH_STREAM_WINDOW
+        ):
+            total += len(chunk_results)
+            for key, value in chunk_counts.items():
+                counts[key] += value
+            yield "".join(json.dumps(r) + "\n" for r in chunk_results)
+    except Exception as e:
+        # Headers are already sent — report the failure in-band
+        logger.error("/predict/batch stream failed after %d rows: %s", total, e)
+        yield json.dumps({"error": f"Batch prediction failed: {str(e)[:200]}"}) + "\n"
+        return
+
+    summary = batch_summary(counts, total)
+    logger.info("Batch stream: %d rows, contamination rate %.2f%%", total, summary["contamination_rate"])
+    yield json.dumps({"summary": summary}) + "\n"
+
+
 @app.post("/predict/batch", response_model=BatchSummaryResponse)
-async def predict_batch(file: UploadFile = File(...)):
+async def predict_batch(file: UploadFile = File(...), stream: bool = False):
     """Batch score HTTP requests from an uploaded CSV file.
 
     Pipeline:
@@ -486,6 +705,12 @@ async def predict_batch(file: UploadFile = File(...)):
       5. Calculate contamination rate
       6. Return batch summary
 
+    With ?stream=true the upload is read and scored BATCH_CHUNK_ROWS rows at a
+    time and the response is NDJSON: one line per row, then a final
+    {"summary": {...}} line (or {"error": ...} if scoring fails midway).
+    Peak memory no longer depends on the file size; rows are not written to
+    the request log.
+
     CSV must have a 'request' column.
     """
     try:
@@ -495,6 +720,26 @@ async def predict_batch(file: UploadFile = File(...)):
                 detail="Model not loaded. Train the model first: python src/train_model.py"
             )
 
+        if stream:
+            try:
+                reader = pd.read_csv(
+                    file.file, usecols=["request"], dtype={"request": str}, chunksize=_BATCH_CHUNK_ROWS
+                )
+            except ValueError:
+                raise HTTPException(status_code=400, detail="CSV must have a 'request' column")
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {str(e)}")
+
+            # Validate up to the first non-empty chunk before committing to a 200
+            rest = _iter_csv_chunks(reader)
+            try:
+                first = await rest.__anext__()
+            except StopAsyncIteration:
+                raise HTTPException(status_code=400, detail="No valid requests found in CSV")
+            except Exception as e:
+                raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {str(e)}")
+            return StreamingResponse(_stream_batch_ndjson(first, rest), media_type="application/x-ndjson")
+
         try:
             content = await file.read()
             text = content.decode("utf-8")
@@ -528,6 +773,7 @@ async def predict_batch(file: UploadFile = File(...)):
             path_traversal=batch_result["path_traversal"],
             unknown_attack=batch_result["unknown_attack"],
             contamination_rate=batch_result["contamination_rate"],
+            deduplication=BatchDedupStats(**batch_result["deduplication"]),
             results=[
                 BatchResultItem(
                     raw_request=r["raw_request"],
@@ -541,7 +787,7 @@ async def predict_batch(file: UploadFile = File(...)):
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] /predict/batch endpoint failed: {e}")
+        logger.error("/predict/batch endpoint failed: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(
@@ -571,14 +817,14 @@ async def get_logs(limit: int = 100):
                             prediction=row.get("prediction", "Unknown"),
                         ))
                     except Exception as item_error:
-                        print(f"[WARN] Could not parse log entry: {item_error}")
+                        logger.warning("Could not parse log entry: %s", item_error)
                         continue
 
                 if log_entries:
-                    print(f"[INFO] Retrieved {len(log_entries)} logs from MongoDB")
+                    logger.debug("Retrieved %d logs from MongoDB", len(log_entries))
                     return log_entries
             except Exception as mongo_error:
-                print(f"[WARN] MongoDB query failed (using in-memory): {mongo_error}")
+                logger.warning("MongoDB query failed (using in-memory): %s", mongo_error)
 
         # Fallback to in-memory logs
         sorted_logs = sorted(request_logs, key=lambda x: x.get("timestamp", ""), reverse=True)
@@ -587,11 +833,11 @@ async def get_logs(limit: int = 100):
             try:
                 log_entries.append(LogEntry(**log))
             except Exception as parse_error:
-                print(f"[WARN] Could not parse in-memory log: {parse_error}")
+                logger.warning("Could not parse in-memory log: %s", parse_error)
                 continue
         return log_entries
     except Exception as e:
-        print(f"[ERROR] /logs endpoint error: {e}")
+        logger.error("/logs endpoint error: %s", e)
         import traceback
         traceback.print_exc()
         return []
@@ -623,9 +869,9 @@ async def get_stats():
                 total = await mongo_collection.count_documents({})
                 normal = await mongo_collection.count_documents({"prediction": "Normal"})
                 suspicious = total - normal
-                print(f"[INFO] Stats from MongoDB: total={total}, normal={normal}")
+                logger.debug("Stats from MongoDB: total=%s, normal=%s", total, normal)
             except Exception as mongo_error:
-                print(f"[WARN] MongoDB stats query failed (using in-memory): {mongo_error}")
+                logger.warning("MongoDB stats query failed (using in-memory): %s", mongo_error)
                 # Fall back to in-memory logs - already computed above
 
         return StatsResponse(
@@ -635,7 +881,7 @@ async def get_stats():
             model_status="Ready" if predictor is not None else "Not Loaded",
         )
     except Exception as e:
-        print(f"[ERROR] /stats endpoint error: {e}")
+        logger.error("/stats endpoint error: %s", e)
         import traceback
         traceback.print_exc()
         # Ultimate fallback: return zeros
@@ -647,6 +893,21 @@ async def get_stats():
         )
 
 
+@app.api_route("/metrics", methods=["GET", "HEAD"])
+async def get_metrics():
+    """Prometheus text-format metrics."""
+    return Response(content=metrics.render_metrics(), media_type=metrics.CONTENT_TYPE)
+
+
+@app.api_route("/trace/stages", methods=["GET", "HEAD"])
+async def get_trace_stages():
+    """Per-stage latency histograms for traced /analyze and /predict-url requests."""
+    return {
+        "sample_rate": tracing.TRACE_SAMPLE_RATE,
+        "stages": tracing.stage_histograms(),
+    }
+
+
 @app.post("/predict-url", response_model=ComprehensiveThreatReport)
 async def predict_url(body: PredictURLRequest):
     """Score a URL with all models running in parallel (signal fusion architecture).
@@ -682,9 +943,10 @@ async def predict_url(body: PredictURLRequest):
 
         # ── Step 1: Domain Intelligence Pre-filtering ──────────────────────────────
         try:
-            domain_check = await domain_intelligence.check_domain(body.url, body.raw_request)
+            with span("domain_check"):
+                domain_check = await domain_intelligence.check_domain(body.url, body.raw_request)
         except Exception as e:
-            print(f"[ERROR] Domain check failed: {e}")
+            logger.error("Domain check failed: %s", e)
             # Continue anyway with generic domain check
             domain_check = {
                 "passes_domain_filter": True,
@@ -707,13 +969,14 @@ async def predict_url(body: PredictURLRequest):
         threat_flags = domain_check.get("threat_flags", {})
 
         try:
-            model4_features = extract_model4_features(
-                domain=domain,
-                url=body.url,
-                threat_flags=threat_flags
-            )
+            with span("model4_features"):
+                model4_features = extract_model4_features(
+                    domain=domain,
+                    url=body.url,
+                    threat_flags=threat_flags
+                )
         except Exception as e:
-            print(f"[ERROR] Model 4 feature extraction failed: {e}")
+            logger.error("Model 4 feature extraction failed: %s", e)
             model4_features = {}
 
         # ── Step 3: RUN ALL MODELS IN PARALLEL ─────────────────────────────────────
@@ -728,26 +991,27 @@ async def predict_url(body: PredictURLRequest):
         try:
             if body.raw_request and predictor:
                 model4_result, anomaly_result = await asyncio.gather(
-                    domain_intelligence.call_model4(model4_features),
-                    predictor.predict(body.raw_request),
+                    traced("model4", domain_intelligence.call_model4(model4_features)),
+                    traced("predict", predictor.predict(body.raw_request)),
                     return_exceptions=True,
                 )
             else:
-                model4_result = await domain_intelligence.call_model4(model4_features)
+                with span("model4"):
+                    model4_result = await domain_intelligence.call_model4(model4_features)
 
             # Handle exceptions returned by gather
             if isinstance(model4_result, Exception):
-                print(f"[ERROR] Model 4 prediction failed: {model4_result}")
+                logger.error("Model 4 prediction failed: %s", model4_result)
                 model4_result = None
             if isinstance(anomaly_result, Exception):
-                print(f"[ERROR] Anomaly prediction failed: {anomaly_result}")
+                logger.error("Anomaly prediction failed: %s", anomaly_result)
                 anomaly_result = None
 
             if model4_result is None:
                 model4_result = {"classification": "unknown"}
 
         except Exception as e:
-            print(f"[ERROR] Parallel model execution failed: {e}")
+            logger.error("Parallel model execution failed: %s", e)
             import traceback
             traceback.print_exc()
             model4_result = {"classification": "unknown"}
@@ -760,15 +1024,16 @@ async def predict_url(body: PredictURLRequest):
 
         # ── Step 5: Generate comprehensive signal-fusion report ─────────────────────
         try:
-            report = await threat_engine.generate_report(
-                url=body.url,
-                domain_check=domain_check,
-                model4_result=model4_result,
-                anomaly_result=anomaly_result,
-                is_api_request=is_api_request
-            )
+            with span("report"):
+                report = await threat_engine.generate_report(
+                    url=body.url,
+                    domain_check=domain_check,
+                    model4_result=model4_result,
+                    anomaly_result=anomaly_result,
+                    is_api_request=is_api_request
+                )
         except Exception as e:
-            print(f"[ERROR] Report generation failed: {e}")
+            logger.error("Report generation failed: %s", e)
             import traceback
             traceback.print_exc()
             # Fallback: create minimal report
@@ -805,23 +1070,26 @@ async def predict_url(body: PredictURLRequest):
         # ── Step 6: Cache Model 4 result ────────────────────────────────────────────
         try:
             if model4_result and isinstance(model4_result, dict):
-                await domain_intelligence.cache_classification(
-                    domain,
-                    model4_result.get("classification", "unknown"),
-                    model4_result.get("raw_prediction_encoded", -1)
-                )
+                with span("cache_write"):
+                    await domain_intelligence.cache_classification(
+                        domain,
+                        model4_result.get("classification", "unknown"),
+                        model4_result.get("raw_prediction_encoded", -1),
+                        model4_result.get("confidence"),
+                    )
         except Exception as e:
-            print(f"[WARN] Model 4 cache failed: {e}")
+            logger.warning("Model 4 cache failed: %s", e)
 
         # ── Step 7: Log final decision ──────────────────────────────────────────────
         try:
-            await save_log(
-                body.raw_request or "",
-                report.threat_scores.overall_threat_score,
-                "Normal" if report.overall_verdict in ("Safe", "Caution") else "Suspicious",
-            )
+            with span("save_log"):
+                await save_log(
+                    body.raw_request or "",
+                    report.threat_scores.overall_threat_score,
+                    "Normal" if report.overall_verdict in ("Safe", "Caution") else "Suspicious",
+                )
         except Exception as e:
-            print(f"[WARN] Logging failed: {e}")
+            logger.warning("Logging failed: %s", e)
 
         return report
 
@@ -829,7 +1097,7 @@ async def predict_url(body: PredictURLRequest):
         # Re-raise HTTP exceptions (like 503)
         raise
     except Exception as e:
-        print(f"[ERROR] /predict-url endpoint failed unexpectedly: {e}")
+        logger.error("/predict-url endpoint failed unexpectedly: %s", e)
         import traceback
         traceback.print_exc()
         # Return generic error response instead of 500
@@ -843,6 +1111,41 @@ async def predict_url(body: PredictURLRequest):
 # Unified /analyze endpoint — replaces /predict + /predict-url
 # ────────────────────────────────────────────────────────────────────────────
 
+# Latency budget for /analyze: when it expires, fusion runs on the signals that
+# have arrived and the remaining model calls finish in the background.
+ANALYZE_LATENCY_BUDGET_MS = float(os.getenv("ANALYZE_LATENCY_BUDGET_MS", "0"))
+# Slack for the predictor to assemble its partial result after the deadline
+_DEADLINE_GRACE = 0.010
+
+
+def _latency_budget(request: Request) -> Optional[float]:
+    """Budget in seconds from X-Latency-Budget-Ms or config; None = wait for every model."""
+    budget_ms = ANALYZE_LATENCY_BUDGET_MS
+    header = request.headers.get("x-latency-budget-ms")
+    if header:
+        try:
+            budget_ms = float(header)
+        except ValueError:
+            pass
+    return budget_ms / 1000.0 if budget_ms > 0 else None
+
+
+def _cache_late_model4(domain: str, task: "asyncio.Future") -> None:
+    """Done-callback for a Model 4 call that missed the deadline: cache its result."""
+    if task.cancelled() or task.exception() is not None or domain_intelligence is None:
+        return
+    result = task.result()
+    if result.get("classification", "unknown") == "unknown":
+        # Failed or unlabelled calls are not worth remembering
+        return
+    detach_late(asyncio.ensure_future(domain_intelligence.cache_classification(
+        domain,
+        result.get("classification", "unknown"),
+        result.get("raw_prediction_encoded", -1),
+        result.get("confidence"),
+    )))
+
+
 @app.post("/analyze", response_model=ComprehensiveThreatReport)
 async def analyze(body: AnalyzeRequest, request: Request, background_tasks: BackgroundTasks):
     """Unified threat analysis endpoint.
@@ -852,8 +1155,15 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
       - raw_request only → extract URL from Host header, run all models
       - Both → full pipeline with all 5 signals
 
+    With a latency budget (ANALYZE_LATENCY_BUDGET_MS or X-Latency-Budget-Ms),
+    models still running when it expires are left out of fusion and listed in
+    deadline_skipped.
+
     Returns ComprehensiveThreatReport with per-model scores and 4-tier verdict.
     """
+    loop = asyncio.get_running_loop()
+    budget = _latency_budget(request)
+    deadline = loop.time() + budget if budget is not None else None
     try:
         if predictor is None and domain_intelligence is None:
             raise HTTPException(
@@ -881,14 +1191,12 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
                 detail="Provide at least one of 'url' or 'raw_request'."
             )
 
+        # One parse shared by the payload scan, feature extraction and rule checks
+        parsed_request = ParsedRequest(raw_request) if raw_request else None
+
         # If only raw_request, try to extract URL from Host header
-        if not url and raw_request:
-            for line in raw_request.split("\n"):
-                line_stripped = line.strip()
-                if line_stripped.lower().startswith("host:"):
-                    host = line_stripped.split(":", 1)[1].strip()
-                    url = f"https://{host}"
-                    break
+        if not url and parsed_request is not None and parsed_request.host:
+            url = f"https://{parsed_request.host}"
 
         # If only URL, generate a synthetic GET request for Models 2-3
         if url and not raw_request:
@@ -899,26 +1207,42 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
                 raw_request = f"GET {path} HTTP/1.1\nHost: {host}\nUser-Agent: Mozilla/5.0"
             except Exception:
                 raw_request = f"GET / HTTP/1.1\nHost: {url}\nUser-Agent: Mozilla/5.0"
+            parsed_request = ParsedRequest(raw_request)
 
         has_url = bool(url)
-        is_api = MultiModelPredictor._is_api_request(raw_request) if raw_request else False
+        is_api = parsed_request.is_api if parsed_request is not None else False
+        flow_features = session_flow_features(parsed_request) if parsed_request is not None else None
 
         # ── Pre-gate payload scan ────────────────────────────────────────────
         # Run BEFORE any early exits so a malicious payload on a 'safe' domain
         # is never silently allowed through (Fix #2).
         payload_findings: List[str] = []
         if raw_request:
-            _, payload_findings = scan_payload(raw_request)
+            with span("payload_scan"):
+                _, payload_findings = scan_payload(parsed_request)
             if payload_findings:
-                print(f"[PAYLOAD SCAN] Dangerous payload detected: {payload_findings}")
+                logger.info("Dangerous payload detected: %s", payload_findings)
 
         # ── Step 2: Domain Intelligence (parallel with feature extraction) ──
         domain_check = None
+        domain_skipped = False
         if has_url and domain_intelligence is not None:
             try:
-                domain_check = await domain_intelligence.check_domain(url, raw_request)
+                with span("domain_check"):
+                    if deadline is None:
+                        domain_check = await domain_intelligence.check_domain(url, raw_request)
+                    else:
+                        domain_task = asyncio.ensure_future(domain_intelligence.check_domain(url, raw_request))
+                        await asyncio.wait((domain_task,), timeout=max(0.0, deadline - loop.time()))
+                        if domain_task.done():
+                            domain_check = domain_task.result()
+                        else:
+                            # Continue without it; finishing still warms the DNS and verdict caches
+                            metrics.DEADLINE_SKIPS.labels("domain").inc()
+                            detach_late(domain_task)
+                            domain_skipped = True
             except Exception as e:
-                print(f"[WARN] Domain check failed: {e}")
+                logger.warning("Domain check failed: %s", e)
 
         # Provide a default domain_check if none
         if domain_check is None:
@@ -930,6 +1254,7 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
                 "blocked_reason": None,
                 "threat_flags": {},
                 "from_cache": False,
+                "deadline_skipped": domain_skipped,
             }
 
         # Early exit if domain is blocked
@@ -951,32 +1276,63 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
         model4_features = None
         if has_url:
             try:
-                model4_features = extract_model4_features(
-                    domain=domain, url=url, threat_flags=threat_flags
-                )
+                with span("model4_features"):
+                    model4_features = extract_model4_features(
+                        domain=domain, url=url, threat_flags=threat_flags
+                    )
             except Exception as e:
-                print(f"[WARN] Model 4 feature extraction failed: {e}")
+                logger.warning("Model 4 feature extraction failed: %s", e)
 
         # Build parallel tasks
         async def run_model4():
             if model4_features is not None and domain_intelligence is not None:
-                return await domain_intelligence.call_model4(model4_features)
+                with span("model4"):
+                    return await domain_intelligence.call_model4(model4_features)
             return {"classification": "unknown", "confidence": 0.0}
 
         async def run_anomaly():
             if raw_request and predictor is not None:
-                return await predictor.predict(raw_request)
+                with span("predict"):
+                    return await predictor.predict(
+                        parsed_request, flow_features, deadline=deadline, session_flows=True,
+                    )
             return None
 
-        model4_result, anomaly_result = await asyncio.gather(
-            run_model4(), run_anomaly(), return_exceptions=True
-        )
+        if deadline is None:
+            model4_result, anomaly_result = await asyncio.gather(
+                run_model4(), run_anomaly(), return_exceptions=True
+            )
+        else:
+            model4_task = asyncio.ensure_future(run_model4())
+            anomaly_task = asyncio.ensure_future(run_anomaly())
+            await asyncio.wait(
+                (model4_task, anomaly_task),
+                timeout=max(0.0, deadline - loop.time()) + _DEADLINE_GRACE,
+            )
+            if model4_task.done():
+                model4_result = model4_task.exception() or model4_task.result()
+            else:
+                # Fuse without Model 4; its result still lands in the domain cache
+                model4_result = {"classification": "unknown", "confidence": 0.0, "model4_ran": False}
+                metrics.DEADLINE_SKIPS.labels("model4").inc()
+                if has_url:
+                    model4_task.add_done_callback(functools.partial(_cache_late_model4, domain))
+                detach_late(model4_task)
+            if anomaly_task.done():
+                anomaly_result = anomaly_task.exception() or anomaly_task.result()
+            else:
+                anomaly_result = {
+                    "model1_ran": False, "model2_ran": False, "model3_ran": False,
+                    "deadline_skipped": ["anomaly"],
+                }
+                metrics.DEADLINE_SKIPS.labels("anomaly").inc()
+                detach_late(anomaly_task)
 
         if isinstance(model4_result, Exception):
-            print(f"[WARN] Model 4 failed: {model4_result}")
+            logger.warning("Model 4 failed: %s", model4_result)
             model4_result = {"classification": "unknown", "confidence": 0.0}
         if isinstance(anomaly_result, Exception):
-            print(f"[WARN] Anomaly models failed: {anomaly_result}")
+            logger.warning("Anomaly models failed: %s", anomaly_result)
             anomaly_result = None
 
         # Override is_api from anomaly result if available
@@ -1018,55 +1374,64 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
             elif isinstance(anomaly_result, dict):
                 anomaly_result["bot_detected"] = True
                 anomaly_result["bot_confidence"] = combined_bot_confidence
-            print(
-                f"[BOT] Multi-factor — IP={client_ip} "
-                f"m2={m2_score:.2f} behavior={combined_behavior:.2f} "
-                f"combined={combined_bot_confidence:.2f}"
+            logger.info(
+                "Bot multi-factor — IP=%s m2=%.2f behavior=%.2f combined=%.2f",
+                client_ip, m2_score, combined_behavior, combined_bot_confidence,
             )
 
         # ── Step 4: Signal fusion → comprehensive report ────────────────────
-        report = await threat_engine.generate_report(
-            url=url or "unknown",
-            domain_check=domain_check,
-            model4_result=model4_result,
-            anomaly_result=anomaly_result,
-            is_api_request=is_api,
-            payload_findings=payload_findings or None,
-        )
+        with span("report"):
+            report = await threat_engine.generate_report(
+                url=url or "unknown",
+                domain_check=domain_check,
+                model4_result=model4_result,
+                anomaly_result=anomaly_result,
+                is_api_request=is_api,
+                payload_findings=payload_findings or None,
+            )
 
         # ── Step 5: Update risk memory with verdict ─────────────────────────
-        domain_for_memory = domain_check.get("domain") if domain_check else None
-        risk_memory.record_verdict(client_ip, domain_for_memory, report.overall_verdict)
-        if payload_findings:
-            for finding in payload_findings:
-                risk_memory.record_attack_pattern(finding)
+        with span("risk_memory"):
+            domain_for_memory = domain_check.get("domain") if domain_check else None
+            risk_memory.record_verdict(client_ip, domain_for_memory, report.overall_verdict)
+            if payload_findings:
+                for finding in payload_findings:
+                    risk_memory.record_attack_pattern(finding)
 
         # ── Step 6: Cache + log (non-blocking) ─────────────────────────────
         try:
-            if has_url and domain_intelligence is not None and isinstance(model4_result, dict):
-                await domain_intelligence.cache_classification(
-                    domain,
-                    model4_result.get("classification", "unknown"),
-                    model4_result.get("raw_prediction_encoded", -1),
-                )
+            if (
+                has_url
+                and domain_intelligence is not None
+                and isinstance(model4_result, dict)
+                and model4_result.get("model4_ran", True)
+            ):
+                with span("cache_write"):
+                    await domain_intelligence.cache_classification(
+                        domain,
+                        model4_result.get("classification", "unknown"),
+                        model4_result.get("raw_prediction_encoded", -1),
+                        model4_result.get("confidence"),
+                    )
         except Exception as e:
-            print(f"[WARN] Cache failed: {e}")
+            logger.warning("Cache failed: %s", e)
 
         try:
-            await save_log(
-                raw_request[:500],
-                report.threat_scores.overall_threat_score,
-                "Normal" if report.overall_verdict in ("Safe", "Caution") else "Suspicious",
-            )
+            with span("save_log"):
+                await save_log(
+                    raw_request[:500],
+                    report.threat_scores.overall_threat_score,
+                    "Normal" if report.overall_verdict in ("Safe", "Caution") else "Suspicious",
+                )
         except Exception as e:
-            print(f"[WARN] Log failed: {e}")
+            logger.warning("Log failed: %s", e)
 
         return report
 
     except HTTPException:
         raise
     except Exception as e:
-        print(f"[ERROR] /analyze endpoint failed: {e}")
+        logger.error("/analyze endpoint failed: %s", e)
         import traceback
         traceback.print_exc()
         raise HTTPException(
@@ -1079,7 +1444,12 @@ async def analyze(body: AnalyzeRequest, request: Request, background_tasks: Back
 # /bot-analysis — Standalone Model 2 (bot/botnet detection) endpoint
 # ────────────────────────────────────────────────────────────────────────────
 
-from src.bot_feature_builder import generate_flow_features, BOT_FEATURE_COUNT
+from src.bot_feature_builder import (
+    BOT_FEATURE_COUNT,
+    REQUIRED_FLOW_COLUMNS,
+    flow_features_from_csv,
+    generate_flow_features,
+)
 
 
 class BotFlowResult(BaseModel):
@@ -1096,17 +1466,43 @@ class BotAnalysisResponse(BaseModel):
 
 
 @app.post("/bot-analysis", response_model=BotAnalysisResponse)
-async def bot_analysis(file: UploadFile = File(...)):
+async def bot_analysis(file: UploadFile = File(...), stream: bool = False):
     """Standalone bot/botnet detection using Model 2.
 
     Upload a CSV with columns: timestamp, ip, url
     Server groups by IP, engineers 14 flow features per session, and runs Model 2.
 
+    With ?stream=true the (disk-spooled) upload is read in chunks and
+    partitioned by IP into temporary bucket files, which are featurized one
+    at a time (see flow_features_from_csv), so multi-gigabyte logs fit in
+    memory. Results are the same, in the same order (ties aside).
+
     This endpoint is completely independent of /analyze.
     """
     if predictor is None:
         raise HTTPException(status_code=503, detail="Model pipeline not loaded.")
 
+    if stream:
+        required = set(REQUIRED_FLOW_COLUMNS)
+        try:
+            columns = list(pd.read_csv(file.file, nrows=0).columns)
+            file.file.seek(0)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
+        if not required.issubset(columns):
+            raise HTTPException(
+                status_code=400,
+                detail=f"CSV must contain columns: {required}. Got: {columns}"
+            )
+        loop = asyncio.get_running_loop()
+        try:
+            ip_labels, features_batch = await loop.run_in_executor(None, flow_features_from_csv, file.file)
+        except (UnicodeDecodeError, pd.errors.ParserError) as e:
+            raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
+        except Exception as e:
+            raise HTTPException(status_code=422, detail=f"Feature engineering failed: {e}")
+        return await _bot_flow_response(ip_labels, features_batch)
+
     try:
         content = await file.read()
         text = content.decode("utf-8")
@@ -1125,7 +1521,11 @@ async def bot_analysis(file: UploadFile = File(...)):
         ip_labels, features_batch = generate_flow_features(df)
     except Exception as e:
         raise HTTPException(status_code=422, detail=f"Feature engineering failed: {e}")
+    return await _bot_flow_response(ip_labels, features_batch)
+
 
+async def _bot_flow_response(ip_labels: List[str], features_batch: np.ndarray) -> BotAnalysisResponse:
+    """Score the flow vectors with Model 2 and build the /bot-analysis response."""
     if len(features_batch) == 0:
         raise HTTPException(status_code=422, detail="No sessions could be extracted from the CSV.")
 
@@ -1176,9 +1576,9 @@ async def submit_feedback(body: FeedbackRequest):
             fb_collection = mongo_collection.database["feedback"]
             await fb_collection.insert_one(entry.copy())
         except Exception as e:
-            print(f"[WARN] Feedback MongoDB insert failed: {e}")
+            logger.warning("Feedback MongoDB insert failed: %s", e)
 
-    print(f"[FEEDBACK] id={body.request_id} type={body.feedback_type} correct={body.verdict_correct}")
+    logger.info("Feedback id=%s type=%s correct=%s", body.request_id, body.feedback_type, body.verdict_correct)
     return {
         "status": "recorded",
         "feedback_type": body.feedback_type,
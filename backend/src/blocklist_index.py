@@ -0,0 +1,252 @@
+"""
+CyHub — Blocklist Index
+
+check_blocklist() cost a MongoDB find_one on blocked_domains for every
+domain not seen before, so the common case, a clean domain, always paid a
+database round trip. BlocklistIndex holds the whole blocklist in memory:
+
+  bloom filter   k bit probes per domain (double hashing of its 64-bit
+                 hash); rejects almost every clean domain
+  hashes         sorted uint64 blake2b-64 hashes of the blocked domains,
+                 binary-searched when the filter passes
+  categories / sources / confidence
+                 per-hash record: codes into small string tables, float32
+
+An index is built in one pass over the collection (BlocklistIndexBuilder)
+and saved as a snapshot file: a fixed header, the string tables as JSON and
+the arrays, 8-byte aligned. open() maps the file read-only and reads the
+arrays in place, so every worker process shares one copy through the page
+cache. save() writes a temporary file and renames it over the old one; a
+process holding the old map keeps a consistent view until it reopens.
+
+Exact domains only (no parent-domain matching), like the lookup it replaces.
+Two domains can only be confused through a 64-bit hash collision.
+"""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import math
+import mmap
+import os
+import struct
+import tempfile
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+_MAGIC = b"CYBLIDX1"
+# magic, entries, bloom bits, bloom probes, tables JSON length
+_HEADER = struct.Struct("<8sQQII")
+
+DEFAULT_FALSE_POSITIVE_RATE = 0.01
+
+
+def domain_hash(domain: str) -> int:
+    """64-bit hash of a (normalized) domain."""
+    return int.from_bytes(hashlib.blake2b(domain.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _bloom_size(n: int, false_positive_rate: float) -> Tuple[int, int]:
+    """(bits, probes) of a Bloom filter for n entries (bits a multiple of 64)."""
+    n = max(1, n)
+    bits = math.ceil(-n * math.log(false_positive_rate) / math.log(2) ** 2)
+    bits = max(64, (bits + 63) // 64 * 64)
+    probes = max(1, round(bits / n * math.log(2)))
+    return bits, probes
+
+
+def _padding(offset: int) -> int:
+    return -offset % 8
+
+
+class BlocklistIndexBuilder:
+    """Collects blocked domains one at a time (compactly) for a BlocklistIndex."""
+
+    def __init__(self):
+        self._hashes: List[int] = []
+        self._categories = bytearray()
+        self._sources = bytearray()
+        self._confidence: List[float] = []
+        self._category_codes: Dict[str, int] = {}
+        self._source_codes: Dict[str, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._hashes)
+
+    @staticmethod
+    def _code(table: Dict[str, int], name: str) -> int:
+        code = table.get(name)
+        if code is None:
+            if len(table) == 256:
+                raise ValueError("BlocklistIndex supports at most 256 categories and 256 sources")
+            code = table[name] = len(table)
+        return code
+
+    def add(self, domain: str, category: str = "unknown", source: str = "local", confidence: float = 0.9) -> None:
+        self._hashes.append(domain_hash(domain))
+        self._categories.append(self._code(self._category_codes, category))
+        self._sources.append(self._code(self._source_codes, source))
+        self._confidence.append(confidence)
+
+    def add_record(self, record: Dict) -> None:
+        """Add a blocked_domains document; records without a domain are skipped."""
+        domain = record.get("domain")
+        if isinstance(domain, str) and domain:
+            self.add(
+                domain,
+                str(record.get("category") or "unknown"),
+                str(record.get("source") or "local"),
+                float(record.get("confidence", 0.9)),
+            )
+
+    def build(self, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE) -> "BlocklistIndex":
+        """The index; a domain added more than once keeps its first record."""
+        unique, first = np.unique(np.array(self._hashes, dtype=np.uint64), return_index=True)
+        bits, probes = _bloom_size(len(unique), false_positive_rate)
+        bloom = np.zeros(bits // 64, dtype=np.uint64)
+        bloom_bytes = bloom.view(np.uint8)
+        for position in _probe_positions(unique, probes, bits):
+            np.bitwise_or.at(bloom_bytes, position >> 3, (1 << (position & 7)).astype(np.uint8))
+        return BlocklistIndex(
+            unique,
+            np.frombuffer(bytes(self._categories), dtype=np.uint8)[first],
+            np.frombuffer(bytes(self._sources), dtype=np.uint8)[first],
+            np.array(self._confidence, dtype=np.float32)[first],
+            bloom, probes, list(self._category_codes), list(self._source_codes),
+        )
+
+
+def _probe_positions(hashes: np.ndarray, probes: int, bits: int):
+    """Bit positions probed for each hash, one array per probe (as in BlocklistIndex._may_contain)."""
+    h1 = hashes & np.uint64(0xFFFFFFFF)
+    h2 = (hashes >> np.uint64(32)) | np.uint64(1)
+    for i in range(probes):
+        yield ((h1 + np.uint64(i) * h2) % np.uint64(bits)).astype(np.int64)
+
+
+class BlocklistIndex:
+    """Bloom-filtered sorted-hash index of blocked domains."""
+
+    def __init__(
+        self,
+        hashes: np.ndarray,
+        categories: np.ndarray,
+        sources: np.ndarray,
+        confidence: np.ndarray,
+        bloom: np.ndarray,
+        probes: int,
+        category_names: List[str],
+        source_names: List[str],
+        mapped: Optional[mmap.mmap] = None,
+    ):
+        self.hashes = hashes
+        self.categories = categories
+        self.sources = sources
+        self.confidence = confidence
+        self.bloom = bloom
+        self.probes = probes
+        self.category_names = category_names
+        self.source_names = source_names
+        self._bloom_bytes = memoryview(bloom).cast("B")
+        self._bloom_bits = len(bloom) * 64
+        self._mapped = mapped
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    @classmethod
+    def from_records(
+        cls,
+        records: Iterable[Dict],
+        false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+    ) -> "BlocklistIndex":
+        """Index blocked_domains-style records ({domain, category, source, confidence})."""
+        builder = BlocklistIndexBuilder()
+        for record in records:
+            builder.add_record(record)
+        return builder.build(false_positive_rate)
+
+    # ── Lookup ───────────────────────────────────────────────────────────────
+
+    def _may_contain(self, h: int) -> bool:
+        bits = self._bloom_bytes
+        h1 = h & 0xFFFFFFFF
+        h2 = (h >> 32) | 1
+        for i in range(self.probes):
+            position = ((h1 + i * h2) & 0xFFFFFFFFFFFFFFFF) % self._bloom_bits
+            if not bits[position >> 3] >> (position & 7) & 1:
+                return False
+        return True
+
+    def lookup(self, domain: str) -> Optional[Dict]:
+        """{category, source, confidence} of a blocked domain, else None."""
+        h = domain_hash(domain)
+        if not self._may_contain(h):
+            return None
+        i = int(np.searchsorted(self.hashes, np.uint64(h)))
+        if i == len(self.hashes) or int(self.hashes[i]) != h:
+            return None
+        return {
+            "category": self.category_names[self.categories[i]],
+            "source": self.source_names[self.sources[i]],
+            "confidence": round(float(self.confidence[i]), 4),
+        }
+
+    def __contains__(self, domain: str) -> bool:
+        return self.lookup(domain) is not None
+
+    # ── Snapshots ────────────────────────────────────────────────────────────
+
+    def save(self, path: str) -> None:
+        """Write a snapshot to `path`, atomically replacing any previous one."""
+        tables = json.dumps({"categories": self.category_names, "sources": self.source_names}).encode("utf-8")
+        n = len(self.hashes)
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(prefix=".blocklist-", dir=directory)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(_HEADER.pack(_MAGIC, n, len(self.bloom) * 64, self.probes, len(tables)))
+                f.write(tables)
+                offset = _HEADER.size + len(tables)
+                for array in (
+                    self.bloom.astype("<u8"), self.hashes.astype("<u8"),
+                    self.confidence.astype("<f4"), self.categories, self.sources,
+                ):
+                    f.write(b"\0" * _padding(offset))
+                    offset += _padding(offset)
+                    f.write(array.tobytes())
+                    offset += array.nbytes
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+
+    @classmethod
+    def open(cls, path: str) -> "BlocklistIndex":
+        """Map a snapshot read-only; the arrays are views of the mapped file."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n, bits, probes, tables_len = _HEADER.unpack_from(mapped, 0)
+        if magic != _MAGIC:
+            mapped.close()
+            raise ValueError(f"{path} is not a blocklist index snapshot")
+        offset = _HEADER.size
+        tables = json.loads(bytes(mapped[offset:offset + tables_len]).decode("utf-8"))
+        offset += tables_len
+
+        arrays = []
+        for dtype, count in (("<u8", bits // 64), ("<u8", n), ("<f4", n), ("u1", n), ("u1", n)):
+            offset += _padding(offset)
+            arrays.append(np.frombuffer(mapped, dtype=dtype, count=count, offset=offset))
+            offset += arrays[-1].nbytes
+        bloom, hashes, confidence, categories, sources = arrays
+        return cls(
+            hashes, categories, sources, confidence, bloom, probes,
+            tables["categories"], tables["sources"], mapped=mapped,
+        )
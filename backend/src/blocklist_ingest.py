@@ -0,0 +1,256 @@
+"""
+CyHub — Blocklist Ingestion
+
+Feeds were downloaded whole into response.text and written with one
+update_one(upsert=True) per line (a million round trips for a million-line
+feed), one source after another, and re-downloaded on every start.
+
+ingest_source() streams a feed line by line (HTTP via the shared gateway,
+or a local file: file:///path or a plain path, e.g. for tests) and:
+
+  - sends If-None-Match / If-Modified-Since from the previous load (for a
+    local file: its size and mtime) and stops at "not modified"
+  - diffs the feed against the domains the source loaded last time
+    (blocked_domains where source = name): only new domains are upserted,
+    domains gone from the feed are deleted, the rest are left alone
+  - keeps one document per (domain, source): a domain listed by several
+    feeds stays blocked until every one of them drops it (BlocklistIndex
+    keeps one record per domain)
+  - writes in bulk_write batches of BLOCKLIST_BATCH_SIZE operations
+
+Per-source validators and counts live in the blocklist_sources collection.
+Progress is exported as cyhub_blocklist_* metrics.
+
+Environment:
+  BLOCKLIST_BATCH_SIZE         operations per bulk_write (default 1000)
+  BLOCKLIST_FETCH_CONCURRENCY  feeds fetched at once (default 3)
+  BLOCKLIST_FETCH_TIMEOUT      seconds per feed read (default 60)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from typing import AsyncIterator, Callable, Dict, List, Optional, Set
+from urllib.parse import urlsplit
+from urllib.request import url2pathname
+
+from pymongo import DeleteMany, UpdateOne
+
+from src import metrics
+from src.http_gateway import get_gateway
+
+logger = logging.getLogger(__name__)
+
+BATCH_SIZE = int(os.getenv("BLOCKLIST_BATCH_SIZE", "1000"))
+FETCH_CONCURRENCY = int(os.getenv("BLOCKLIST_FETCH_CONCURRENCY", "3"))
+FETCH_TIMEOUT = float(os.getenv("BLOCKLIST_FETCH_TIMEOUT", "60"))
+
+# Lines read from a local file per executor call
+_FILE_READ_HINT = 1 << 20
+
+_LINES = metrics.counter(
+    "cyhub_blocklist_lines_total", "Blocklist feed lines read", ["source"],
+)
+_CHANGES = metrics.counter(
+    "cyhub_blocklist_domains_total",
+    "Blocklist domains per load by change (added / removed / unchanged)",
+    ["source", "change"],
+)
+_LOADS = metrics.counter(
+    "cyhub_blocklist_loads_total",
+    "Blocklist feed loads by result (loaded / not_modified / error)",
+    ["source", "result"],
+)
+_LOAD_SECONDS = metrics.histogram(
+    "cyhub_blocklist_load_duration_seconds", "Time to fetch and apply one blocklist feed", ["source"],
+    buckets=(0.1, 0.5, 1.0, 5.0, 15.0, 30.0, 60.0, 120.0, 300.0, 600.0),
+)
+
+LineParser = Callable[[str, str], Optional[str]]
+Categorizer = Callable[[str], str]
+
+
+class NotModified(Exception):
+    """The feed has not changed since its validators were recorded."""
+
+
+def _local_path(url: str) -> Optional[str]:
+    """Filesystem path of a file:// URL or scheme-less path, else None."""
+    parts = urlsplit(url)
+    if parts.scheme == "file":
+        return url2pathname(parts.path)
+    if not parts.scheme:
+        return url
+    return None
+
+
+async def _file_lines(path: str, previous: Dict, validators: Dict) -> AsyncIterator[str]:
+    st = os.stat(path)
+    validators["etag"] = f'"{st.st_size:x}-{st.st_mtime_ns:x}"'
+    if previous.get("etag") == validators["etag"]:
+        raise NotModified()
+    loop = asyncio.get_running_loop()
+    with open(path, "r", encoding="utf-8", errors="replace") as f:
+        while True:
+            lines = await loop.run_in_executor(None, f.readlines, _FILE_READ_HINT)
+            if not lines:
+                return
+            for line in lines:
+                yield line
+
+
+async def _http_lines(url: str, previous: Dict, validators: Dict) -> AsyncIterator[str]:
+    headers = {}
+    if previous.get("etag"):
+        headers["If-None-Match"] = previous["etag"]
+    if previous.get("last_modified"):
+        headers["If-Modified-Since"] = previous["last_modified"]
+    client = get_gateway().client_for(url)
+    async with client.stream("GET", url, headers=headers, timeout=FETCH_TIMEOUT) as response:
+        if response.status_code == 304:
+            raise NotModified()
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}")
+        validators["etag"] = response.headers.get("etag")
+        validators["last_modified"] = response.headers.get("last-modified")
+        async for line in response.aiter_lines():
+            yield line
+
+
+def feed_lines(url: str, previous: Dict, validators: Dict) -> AsyncIterator[str]:
+    """Lines of a feed; fills `validators` and raises NotModified if
+    `previous` validators still match."""
+    path = _local_path(url)
+    if path is not None:
+        return _file_lines(path, previous, validators)
+    return _http_lines(url, previous, validators)
+
+
+async def ingest_source(
+    db,
+    name: str,
+    url: str,
+    parse_line: LineParser,
+    categorize: Categorizer,
+    batch_size: int = BATCH_SIZE,
+    force: bool = False,
+) -> Dict:
+    """Fetch one feed and apply it to blocked_domains as a delta.
+
+    Returns {source, status, lines, added, removed, unchanged}; status is
+    "loaded", "not_modified" or "error" (nothing is recorded on error, so
+    the next load starts from the same previous state).
+    """
+    result = {"source": name, "status": "loaded", "lines": 0, "added": 0, "removed": 0, "unchanged": 0}
+    state_collection = db["blocklist_sources"]
+    blocked = db["blocked_domains"]
+    start = time.perf_counter()
+    try:
+        previous_state = await state_collection.find_one({"source": name}) or {}
+        if force or previous_state.get("url") != url:
+            previous_state = {}
+
+        # Domains this source contributed last time (the previous snapshot)
+        previous: Set[str] = set()
+        async for record in blocked.find({"source": name}, {"domain": 1, "_id": 0}):
+            if isinstance(record.get("domain"), str):
+                previous.add(record["domain"])
+
+        validators: Dict = {}
+        current: Set[str] = set()
+        ops: List = []
+        now = datetime.now(timezone.utc)
+        lines_reported = 0
+        async for line in feed_lines(url, previous_state, validators):
+            result["lines"] += 1
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            domain = parse_line(line, name)
+            if not domain or domain in current:
+                continue
+            current.add(domain)
+            if domain in previous:
+                continue
+            ops.append(UpdateOne(
+                {"domain": domain, "source": name},
+                {"$set": {
+                    "category": categorize(domain),
+                    "confidence": 0.9,
+                    "last_updated": now,
+                }},
+                upsert=True,
+            ))
+            if len(ops) >= batch_size:
+                await blocked.bulk_write(ops, ordered=False)
+                result["added"] += len(ops)
+                ops = []
+                _LINES.labels(name).inc(result["lines"] - lines_reported)
+                lines_reported = result["lines"]
+        if ops:
+            await blocked.bulk_write(ops, ordered=False)
+            result["added"] += len(ops)
+        _LINES.labels(name).inc(result["lines"] - lines_reported)
+
+        removed = sorted(previous - current)
+        for i in range(0, len(removed), batch_size):
+            chunk = removed[i:i + batch_size]
+            await blocked.bulk_write([DeleteMany({"source": name, "domain": {"$in": chunk}})], ordered=False)
+        result["removed"] = len(removed)
+        result["unchanged"] = len(current) - result["added"]
+
+        await state_collection.update_one(
+            {"source": name},
+            {"$set": {
+                "url": url,
+                "etag": validators.get("etag"),
+                "last_modified": validators.get("last_modified"),
+                "domains": len(current),
+                "loaded_at": now,
+            }},
+            upsert=True,
+        )
+        for change in ("added", "removed", "unchanged"):
+            _CHANGES.labels(name, change).inc(result[change])
+        logger.info(
+            "Loaded %s blocklist: %d domains (+%d / -%d)",
+            name, len(current), result["added"], result["removed"],
+        )
+    except NotModified:
+        result["status"] = "not_modified"
+        logger.info("%s blocklist not modified since last load", name)
+    except Exception as e:
+        result["status"] = "error"
+        logger.error("Error loading %s blocklist: %s", name, e)
+    finally:
+        _LOADS.labels(name, result["status"]).inc()
+        _LOAD_SECONDS.labels(name).observe(time.perf_counter() - start)
+    return result
+
+
+async def ingest_sources(
+    db,
+    sources: List[tuple],
+    parse_line: LineParser,
+    categorize: Categorizer,
+    concurrency: int = FETCH_CONCURRENCY,
+    force: bool = False,
+) -> List[Dict]:
+    """ingest_source() for every (name, url), at most `concurrency` at once."""
+    try:
+        await db["blocked_domains"].create_index("domain")
+        await db["blocked_domains"].create_index([("source", 1), ("domain", 1)])
+    except Exception as e:
+        logger.warning("Could not ensure blocked_domains indexes: %s", e)
+
+    semaphore = asyncio.Semaphore(max(1, concurrency))
+
+    async def _one(name: str, url: str) -> Dict:
+        async with semaphore:
+            return await ingest_source(db, name, url, parse_line, categorize, force=force)
+
+    return await asyncio.gather(*(_one(name, url) for name, url in sources))
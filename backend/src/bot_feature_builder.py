@@ -19,22 +19,48 @@ The 14 features match the training schema of Model 2 (bot/botnet detection):
  11  hour_of_day            hour (0-23) of first request
  12  url_entropy            Shannon entropy of URL distribution
  13  session_depth_mean     mean URL path depth (number of "/" segments)
+
+flow_features_from_csv() builds the same features from a CSV too large to
+load at once: rows are read in chunks, hash-partitioned by IP into on-disk
+buckets, and each bucket is loaded and featurized on its own, so peak memory
+follows the largest bucket rather than the file.
+
+Environment (flow_features_from_csv):
+  BOT_SPOOL_PARTITIONS   IP buckets (default 64)
+  BOT_SPOOL_CHUNK_ROWS   CSV rows read per chunk (default 200000)
+  BOT_SPOOL_DIR          directory for the bucket files (default: system temp)
 """
 
 from __future__ import annotations
 
-import math
-from typing import List, Tuple
+import logging
+import os
+import pickle
+import tempfile
+from typing import BinaryIO, Dict, Iterator, List, Tuple, Union
 
 import numpy as np
 import pandas as pd
 
+from src.entropy import entropy_from_count_groups, entropy_from_counts
+
+logger = logging.getLogger(__name__)
+
 BOT_FEATURE_COUNT = 14
 
+# CSV columns read by the flow builder (user_agent is optional)
+FLOW_COLUMNS = ("timestamp", "ip", "url", "user_agent")
+REQUIRED_FLOW_COLUMNS = ("timestamp", "ip", "url")
+
+SPOOL_PARTITIONS = int(os.getenv("BOT_SPOOL_PARTITIONS", "64"))
+SPOOL_CHUNK_ROWS = int(os.getenv("BOT_SPOOL_CHUNK_ROWS", "200000"))
+SPOOL_DIR = os.getenv("BOT_SPOOL_DIR") or None
+
 
 def _shannon_entropy(values: pd.Series) -> float:
-    counts = values.value_counts(normalize=True)
-    return float(-sum(p * math.log2(p) for p in counts if p > 0))
+    # Counts summed in ascending order, so ties in value_counts() can't
+    # change the float (generate_flow_features sums them the same way)
+    return entropy_from_counts(sorted(values.value_counts().tolist()))
 
 
 def _url_depth(url: str) -> int:
@@ -42,10 +68,63 @@ def _url_depth(url: str) -> int:
     return len([s for s in path.split("/") if s])
 
 
+def _segment_sums(values: np.ndarray, starts: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """np.add.reduce() of every segment values[start:start + length], bit for bit.
+
+    numpy sums a float64 array pairwise: fewer than 8 values one by one, up
+    to 128 in 8 interleaved partial sums, longer ones by recursive halving.
+    The first two cases are reproduced across all segments at once; longer
+    segments (long sessions, rare) are reduced one by one.
+    """
+    out = np.zeros(len(starts))
+
+    small = np.flatnonzero(lengths < 8)
+    for t in range(7):
+        sel = small[lengths[small] > t]
+        out[sel] += values[starts[sel] + t]
+
+    mid = np.flatnonzero((lengths >= 8) & (lengths <= 128))
+    if len(mid):
+        first, n = starts[mid], lengths[mid]
+        lanes = np.arange(8)
+        partial = values[first[:, None] + lanes]
+        blocked = n - n % 8
+        for i in range(8, 128, 8):
+            sel = np.flatnonzero(blocked > i)
+            if not len(sel):
+                break
+            partial[sel] += values[first[sel, None] + i + lanes]
+        p = partial.T
+        total = ((p[0] + p[1]) + (p[2] + p[3])) + ((p[4] + p[5]) + (p[6] + p[7]))
+        for t in range(7):
+            sel = np.flatnonzero(n - blocked > t)
+            total[sel] += values[first[sel] + blocked[sel] + t]
+        out[mid] = total
+
+    for i in np.flatnonzero(lengths > 128):
+        out[i] = np.add.reduce(values[starts[i]:starts[i] + lengths[i]])
+    return out
+
+
+def _pair_counts(groups: np.ndarray, codes: np.ndarray, n_groups: int) -> Tuple[np.ndarray, np.ndarray]:
+    """(group, count) of every distinct (group, code) pair, codes < 0 ignored,
+    ordered by group then ascending count."""
+    valid = codes >= 0
+    width = int(codes.max()) + 1 if valid.any() else 1
+    pairs, counts = np.unique(groups[valid] * width + codes[valid], return_counts=True)
+    pair_groups = pairs // width
+    order = np.lexsort((counts, pair_groups))
+    return pair_groups[order], counts[order]
+
+
 def generate_flow_features(df: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
     """
     Group the DataFrame by IP, engineer 14 flow features per session.
 
+    Rows are sorted once by (ip, timestamp) and every feature is a segment
+    reduction over that order, so the cost does not grow with the number of
+    IPs. The result matches the former per-IP loop (see test_bot_features.py).
+
     Args:
         df: DataFrame with columns [timestamp, ip, url]
             timestamp can be any pandas-parseable format.
@@ -55,81 +134,169 @@ def generate_flow_features(df: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
         ip_labels — list of IP strings (one per row of feature_matrix)
         feature_matrix — np.ndarray of shape (n_sessions, 14), dtype float64
     """
-    df = df.copy()
-    df["timestamp"] = pd.to_datetime(df["timestamp"], format="mixed")
-    df = df.sort_values("timestamp")
-
-    has_ua = "user_agent" in df.columns
-
-    ip_labels: List[str] = []
-    rows: List[List[float]] = []
-
-    for ip, session in df.groupby("ip", sort=False):
-        session = session.sort_values("timestamp")
-        ts = session["timestamp"]
-        urls = session["url"]
-
-        # 0 — flow duration in seconds
-        duration = float((ts.max() - ts.min()).total_seconds())
-
-        # 1 — packet count
-        n = len(session)
-
-        # 2 — unique URLs
-        unique_urls = float(urls.nunique())
-
-        # 3 — request rate (requests/second; avoid div-by-zero)
-        rate = n / max(duration, 1.0)
-
-        # 4 — URL repetition ratio (most common URL / total)
-        top_url_count = int(urls.value_counts().iloc[0])
-        repetition_ratio = top_url_count / n
-
-        # 5 — unique user-agents (0 if column not present)
-        unique_uas = float(session["user_agent"].nunique()) if has_ua else 0.0
-
-        # 6-9 — inter-arrival times
-        ts_sec = ts.astype(np.int64) / 1e9
-        iats = np.diff(ts_sec.values)
-        if len(iats) > 0:
-            iat_mean = float(np.mean(iats))
-            iat_std  = float(np.std(iats))
-            iat_min  = float(np.min(iats))
-            iat_max  = float(np.max(iats))
-        else:
-            iat_mean = iat_std = iat_min = iat_max = 0.0
-
-        # 10 — burst ratio (fraction of requests occurring in the busiest 10% of seconds)
-        if duration > 0:
-            ts_floored = ts.dt.floor("s")
-            counts_per_sec = ts_floored.value_counts()
-            top_n = max(1, int(len(counts_per_sec) * 0.10))
-            burst_count = int(counts_per_sec.nlargest(top_n).sum())
-            burst_ratio = burst_count / n
-        else:
-            burst_ratio = 1.0
-
-        # 11 — hour of first request
-        hour = float(ts.iloc[0].hour)
-
-        # 12 — URL entropy
-        url_entropy = _shannon_entropy(urls)
-
-        # 13 — mean URL path depth
-        depth_mean = float(urls.apply(_url_depth).mean())
-
-        rows.append([
-            duration, float(n), unique_urls, rate,
-            repetition_ratio, unique_uas,
-            iat_mean, iat_std, iat_min, iat_max,
-            burst_ratio, hour,
-            url_entropy, depth_mean,
-        ])
-        ip_labels.append(str(ip))
-        print(f"[DEBUG] IP {ip}: duration={duration:.1f}s, packets={n}, rate={rate:.2f}/s, "
-              f"repetition={repetition_ratio:.2f}, iat_mean={iat_mean:.2f}, iat_std={iat_std:.2f}")
-
-    feature_matrix = np.array(rows, dtype=np.float64)
+    ip_labels, feature_matrix, _, _ = _session_flow_features(df)
+    return ip_labels, feature_matrix
+
+
+def _session_flow_features(df: pd.DataFrame) -> Tuple[List[str], np.ndarray, np.ndarray, np.ndarray]:
+    """generate_flow_features(), plus the position in `df` and the timestamp
+    (ns) of every session's first request."""
+    timestamps = pd.to_datetime(df["timestamp"], format="mixed").reset_index(drop=True)
+    # Sessions are numbered by first appearance in timestamp order; rows
+    # without a timestamp (NaT) are dropped, like rows without an IP below
+    by_time = timestamps.dropna().sort_values().index.to_numpy()
+    ip_codes, ips = pd.factorize(df["ip"].to_numpy()[by_time])
+    in_session = ip_codes >= 0
+    within = np.argsort(ip_codes[in_session], kind="stable")
+    rows = by_time[in_session][within]
+    groups = ip_codes[in_session][within]
+    n_groups = len(ips)
+    if not n_groups:
+        empty = np.empty(0, dtype=np.int64)
+        return [], np.empty((0, BOT_FEATURE_COUNT)), empty, empty
+
+    n = np.bincount(groups, minlength=n_groups)
+    starts = np.cumsum(n) - n
+    ends = starts + n - 1
+    ts = timestamps.iloc[rows]
+    ts_ns = ts.dt.as_unit("ns").astype(np.int64).to_numpy()
+
+    # 0 — flow duration in seconds (Timedelta.total_seconds: whole microseconds)
+    span = ts_ns[ends] - ts_ns[starts]
+    duration = (span // 1000) / 1e6
+
+    # 2 / 4 / 12 — distinct URLs, most repeated URL count, URL entropy
+    url_codes, url_uniques = pd.factorize(df["url"].to_numpy()[rows])
+    pair_groups, pair_counts = _pair_counts(groups, url_codes, n_groups)
+    unique_urls = np.bincount(pair_groups, minlength=n_groups).astype(np.float64)
+    top_url_count = np.zeros(n_groups, dtype=np.int64)
+    np.maximum.at(top_url_count, pair_groups, pair_counts)
+    url_entropy = entropy_from_count_groups(pair_counts, pair_groups, n_groups)
+
+    # 5 — unique user-agents (0 if column not present)
+    unique_uas = np.zeros(n_groups)
+    if "user_agent" in df.columns:
+        ua_codes, _ = pd.factorize(df["user_agent"].to_numpy()[rows])
+        unique_uas = np.bincount(_pair_counts(groups, ua_codes, n_groups)[0], minlength=n_groups).astype(np.float64)
+
+    # 6-9 — inter-arrival times (differences of float seconds, as before)
+    ts_sec = (ts.astype(np.int64) / 1e9).to_numpy()
+    iats = np.diff(ts_sec)[groups[1:] == groups[:-1]]
+    iat_counts = n - 1
+    iat_starts = np.cumsum(iat_counts) - iat_counts
+    has_iats = iat_counts > 0
+    iat_mean = np.zeros(n_groups)
+    iat_std = np.zeros(n_groups)
+    iat_min = np.zeros(n_groups)
+    iat_max = np.zeros(n_groups)
+    if len(iats):
+        mean = _segment_sums(iats, iat_starts, iat_counts)[has_iats] / iat_counts[has_iats]
+        deviation = iats - np.repeat(mean, iat_counts[has_iats])
+        square_sums = _segment_sums(deviation * deviation, iat_starts, iat_counts)[has_iats]
+        iat_mean[has_iats] = mean
+        iat_std[has_iats] = np.sqrt(square_sums / iat_counts[has_iats])
+        iat_min[has_iats] = np.minimum.reduceat(iats, iat_starts[has_iats])
+        iat_max[has_iats] = np.maximum.reduceat(iats, iat_starts[has_iats])
+
+    # 10 — burst ratio (fraction of requests occurring in the busiest 10% of seconds)
+    second = ts_ns // 1_000_000_000
+    run_start = np.flatnonzero(np.r_[True, (groups[1:] != groups[:-1]) | (second[1:] != second[:-1])])
+    run_groups = groups[run_start]
+    run_counts = np.diff(np.r_[run_start, len(groups)])
+    runs_per_group = np.bincount(run_groups, minlength=n_groups)
+    top_n = np.maximum(1, (runs_per_group * 0.10).astype(np.int64))
+    order = np.lexsort((-run_counts, run_groups))
+    rank = np.arange(len(order)) - np.repeat(np.cumsum(runs_per_group) - runs_per_group, runs_per_group)
+    busiest = order[rank < top_n[run_groups[order]]]
+    burst_count = np.bincount(run_groups[busiest], weights=run_counts[busiest], minlength=n_groups)
+    burst_ratio = np.where(duration > 0, burst_count / n, 1.0)
+
+    # 11 — hour of first request
+    hour = ts.dt.hour.to_numpy()[starts].astype(np.float64)
+
+    # 13 — mean URL path depth
+    has_url = url_codes >= 0
+    url_depths = np.array([_url_depth(url) for url in url_uniques], dtype=np.float64)
+    depth_sums = np.bincount(groups[has_url], weights=url_depths[url_codes[has_url]], minlength=n_groups)
+    depth_mean = depth_sums / np.bincount(groups[has_url], minlength=n_groups)
+
+    feature_matrix = np.column_stack([
+        duration, n.astype(np.float64), unique_urls, n / np.maximum(duration, 1.0),
+        top_url_count / n, unique_uas,
+        iat_mean, iat_std, iat_min, iat_max,
+        burst_ratio, hour,
+        url_entropy, depth_mean,
+    ])
+    logger.debug("Flow features: %d rows → %d sessions", len(rows), n_groups)
     # Replace any NaN/Inf that crept in with 0
     feature_matrix = np.where(np.isfinite(feature_matrix), feature_matrix, 0.0)
-    return ip_labels, feature_matrix
+    return [str(ip) for ip in ips], feature_matrix, rows[starts], ts_ns[starts]
+
+
+def _load_frames(path: str) -> Iterator[pd.DataFrame]:
+    with open(path, "rb") as f:
+        while True:
+            try:
+                yield pickle.load(f)
+            except EOFError:
+                return
+
+
+def flow_features_from_csv(
+    source: Union[str, BinaryIO],
+    partitions: int = SPOOL_PARTITIONS,
+    chunk_rows: int = SPOOL_CHUNK_ROWS,
+    spool_dir: Union[str, None] = SPOOL_DIR,
+) -> Tuple[List[str], np.ndarray]:
+    """generate_flow_features() of a CSV file, out of core.
+
+    The CSV is read `chunk_rows` at a time and its rows are appended, by a
+    hash of their IP, to one of `partitions` bucket files in a temporary
+    directory. Every IP's rows land in a single bucket, so featurizing the
+    buckets one by one yields every session whole. Sessions are returned in
+    the order of their first request (ties: first row in the file), as
+    generate_flow_features() orders them.
+
+    Raises ValueError if a required column is missing.
+    """
+    reader = pd.read_csv(
+        source, chunksize=chunk_rows, usecols=lambda c: c in FLOW_COLUMNS,
+        dtype={"ip": str, "url": str, "user_agent": str},
+    )
+    labels: List[str] = []
+    matrices, first_ns, first_rows = [], [], []
+    with tempfile.TemporaryDirectory(prefix="cyhub-flows-", dir=spool_dir) as tmp:
+        buckets: Dict[int, BinaryIO] = {}
+        offset = 0
+        try:
+            for chunk in reader:
+                missing = [c for c in REQUIRED_FLOW_COLUMNS if c not in chunk.columns]
+                if missing:
+                    raise ValueError(f"CSV must contain columns: {list(REQUIRED_FLOW_COLUMNS)}. Missing: {missing}")
+                chunk["_row"] = np.arange(offset, offset + len(chunk))
+                offset += len(chunk)
+                chunk = chunk[chunk["ip"].notna()]
+                bucket_ids = pd.util.hash_array(chunk["ip"].to_numpy(dtype=object)) % partitions
+                for bucket, part in chunk.groupby(bucket_ids, sort=False):
+                    f = buckets.get(bucket)
+                    if f is None:
+                        f = buckets[bucket] = open(os.path.join(tmp, f"{bucket}.pkl"), "wb")
+                    pickle.dump(part, f, protocol=pickle.HIGHEST_PROTOCOL)
+        finally:
+            for f in buckets.values():
+                f.close()
+        logger.debug("Spooled %d rows into %d IP buckets", offset, len(buckets))
+
+        for bucket in sorted(buckets):
+            df = pd.concat(_load_frames(os.path.join(tmp, f"{bucket}.pkl")), ignore_index=True)
+            ips, matrix, first_pos, ts = _session_flow_features(df)
+            labels.extend(ips)
+            matrices.append(matrix)
+            first_ns.append(ts)
+            first_rows.append(df["_row"].to_numpy()[first_pos])
+            del df
+
+    if not labels:
+        return [], np.empty((0, BOT_FEATURE_COUNT))
+    order = np.lexsort((np.concatenate(first_rows), np.concatenate(first_ns)))
+    return [labels[i] for i in order], np.concatenate(matrices)[order]
@@ -0,0 +1,138 @@
+"""
+CyHub — CPU Executor
+
+Keeps CPU-bound scoring (feature extraction, scaler/IsolationForest calls,
+rule detection over large batches) off the asyncio event loop.
+
+Two lanes so a large CSV batch can never starve interactive traffic:
+
+  interactive  single-request scoring from /analyze, /predict, /predict-url
+               always a thread pool — tasks are short and the model objects
+               are shared in-process, so nothing needs to be pickled
+  batch        chunked /predict/batch scoring
+               COMPUTE_BATCH_POOL=process (default) runs chunks in separate
+               processes so pure-Python extraction never holds the loop's GIL;
+               =thread keeps everything in-process
+
+Each lane has a bounded submission queue (COMPUTE_*_MAX_PENDING). When it is
+full, callers wait on the semaphore instead of growing an unbounded backlog.
+
+Environment:
+  COMPUTE_INTERACTIVE_WORKERS   default 4
+  COMPUTE_INTERACTIVE_MAX_PENDING default 256
+  COMPUTE_BATCH_POOL            process | thread (default process)
+  COMPUTE_BATCH_WORKERS         default: CPU count - 1 (min 1)
+  COMPUTE_BATCH_MAX_PENDING     default: 2 × batch workers
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import multiprocessing
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class _Lane:
+    """One executor plus the semaphore that bounds its submission queue."""
+
+    def __init__(self, name: str, kind: str, workers: int, max_pending: int):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.pending = 0
+        self._executor: Optional[Executor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                try:
+                    # spawn: forking a server process that already owns threads
+                    # (motor, httpx, thread pools) is not safe
+                    self._executor = ProcessPoolExecutor(
+                        max_workers=self.workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                    )
+                except (OSError, ValueError) as e:
+                    logger.warning(f"{self.name} process pool unavailable ({e}) — using threads")
+                    self.kind = "thread"
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.workers,
+                    thread_name_prefix=f"compute-{self.name}",
+                )
+        return self._executor
+
+    async def run(self, fn: Callable[..., Any], *args: Any) -> Any:
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_pending)
+        async with self._semaphore:
+            self.pending += 1
+            try:
+                loop = asyncio.get_running_loop()
+                return await loop.run_in_executor(self._get_executor(), fn, *args)
+            finally:
+                self.pending -= 1
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+class ComputePool:
+    """Interactive + batch CPU lanes shared by the whole backend."""
+
+    def __init__(self) -> None:
+        cpus = os.cpu_count() or 2
+        batch_workers = int(os.getenv("COMPUTE_BATCH_WORKERS", str(max(1, cpus - 1))))
+        self.interactive = _Lane(
+            "interactive",
+            "thread",
+            int(os.getenv("COMPUTE_INTERACTIVE_WORKERS", "4")),
+            int(os.getenv("COMPUTE_INTERACTIVE_MAX_PENDING", "256")),
+        )
+        self.batch = _Lane(
+            "batch",
+            os.getenv("COMPUTE_BATCH_POOL", "process").strip().lower(),
+            batch_workers,
+            int(os.getenv("COMPUTE_BATCH_MAX_PENDING", str(2 * batch_workers))),
+        )
+
+    async def run_interactive(self, fn: Callable[..., Any], *args: Any) -> Any:
+        return await self.interactive.run(fn, *args)
+
+    async def run_batch(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Run a batch chunk. In process mode `fn` and `args` must be picklable."""
+        return await self.batch.run(fn, *args)
+
+    def queue_depths(self) -> Dict[str, int]:
+        return {"interactive": self.interactive.pending, "batch": self.batch.pending}
+
+    def shutdown(self) -> None:
+        self.interactive.shutdown()
+        self.batch.shutdown()
+
+
+_compute_pool: Optional[ComputePool] = None
+
+
+def get_compute_pool() -> ComputePool:
+    """Get or create the process-wide compute pool."""
+    global _compute_pool
+    if _compute_pool is None:
+        _compute_pool = ComputePool()
+    return _compute_pool
+
+
+def shutdown_compute_pool() -> None:
+    global _compute_pool
+    if _compute_pool is not None:
+        _compute_pool.shutdown()
+        _compute_pool = None
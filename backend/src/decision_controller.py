@@ -23,7 +23,9 @@ from __future__ import annotations
 import re
 import time
 from collections import defaultdict
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, List, Optional, Tuple, Union
+
+from src.request_parser import ParsedRequest
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -65,7 +67,7 @@ _TRAVERSAL_RE = re.compile(
 )
 
 
-def scan_payload(raw_request: str) -> Tuple[bool, List[str]]:
+def scan_payload(raw_request: Union[str, ParsedRequest]) -> Tuple[bool, List[str]]:
     """Quick payload scan to detect malicious content before early exits.
 
     Called BEFORE domain-based early exits so a 'safe' domain carrying
@@ -74,6 +76,8 @@ def scan_payload(raw_request: str) -> Tuple[bool, List[str]]:
     Returns:
         (is_dangerous, list_of_findings)
     """
+    if isinstance(raw_request, ParsedRequest):
+        raw_request = raw_request.raw
     findings: List[str] = []
     if _SQL_RE.search(raw_request):
         findings.append("SQL injection keywords detected")
@@ -178,6 +182,7 @@ def get_dynamic_weights(
     domain_suspicious: bool = False,
     model1_ran: bool = True,
     model3_ran: bool = True,
+    model4_ran: bool = True,
 ) -> Dict[str, float]:
     """Compute context-adaptive fusion weights.
 
@@ -212,6 +217,8 @@ def get_dynamic_weights(
         w_traffic = 0.0
     if not model1_ran:
         w_payload = 0.0
+    if not model4_ran:
+        w_url = 0.0
 
     total = w_url + w_traffic + w_payload + w_di
     if total <= 0:
@@ -339,6 +346,14 @@ class RiskMemory:
 
     # ── read methods ──────────────────────────────────────────────────────
 
+    def sizes(self) -> Dict[str, int]:
+        """Entry counts per internal table (for /metrics)."""
+        return {
+            "ip_scores": len(self._ip_scores),
+            "domains": len(self._domain_history),
+            "patterns": len(self._pattern_counts),
+        }
+
     def get_ip_reputation(self, ip: str) -> float:
         """Return rolling threat score for IP (0.0 = clean, 1.0 = highly suspicious)."""
         return self._ip_scores.get(ip, 0.0)
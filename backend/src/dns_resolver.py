@@ -0,0 +1,205 @@
+"""
+CyHub — Caching DNS Resolver
+
+validate_dns() handed socket.gethostbyname to the default executor for every
+domain and cached nothing: a repeated domain was resolved again, and an
+unresolvable one cost the full timeout every time.
+
+CachingResolver sits in front of a blocking lookup function:
+
+  - answers are cached per name: addresses for DNS_CACHE_TTL seconds,
+    NXDOMAIN for DNS_NEGATIVE_TTL, timeouts and other failures for the
+    shorter DNS_FAILURE_TTL (they may be transient)
+  - concurrent lookups of one name share a single resolution
+  - lookups run on a dedicated, bounded thread pool (DNS_RESOLVER_WORKERS),
+    so a slow resolver cannot starve the default executor
+  - a lookup is only started when a thread is free, so the timeout measures
+    the lookup, not time spent queued; with every thread busy the answer is
+    an uncached "busy" (the name was not checked)
+  - the lookup function is a constructor argument, so tests inject a fake
+    (DomainIntelligence takes the resolver itself; get_resolver() otherwise)
+
+The cache holds at most DNS_CACHE_SIZE names (least recently used dropped).
+
+Environment:
+  DNS_VALIDATION_TIMEOUT  seconds per lookup (default 5.0)
+  DNS_CACHE_TTL           seconds an address is reused (default 300)
+  DNS_NEGATIVE_TTL        seconds an NXDOMAIN is reused (default 300)
+  DNS_FAILURE_TTL         seconds a timeout / error is reused (default 30)
+  DNS_CACHE_SIZE          names cached (default 50000)
+  DNS_RESOLVER_WORKERS    lookup threads (default 8)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, NamedTuple, Optional, Tuple
+
+from src import metrics
+from src.metrics import CACHE_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+_REJECTED = metrics.counter(
+    "cyhub_dns_lookups_rejected_total", "DNS lookups not started because every resolver thread was busy",
+)
+
+
+class DnsAnswer(NamedTuple):
+    """Outcome of a lookup: status is "ok", "nxdomain", "timeout", "error",
+    or "busy" (not looked up: every resolver thread was busy)."""
+
+    address: Optional[str]
+    status: str
+    cached: bool = False
+
+    @property
+    def ok(self) -> bool:
+        return self.status == "ok"
+
+
+class CachingResolver:
+    """TTL-cached, de-duplicated async front for a blocking name lookup."""
+
+    def __init__(
+        self,
+        lookup: Callable[[str], str] = socket.gethostbyname,
+        timeout: Optional[float] = None,
+        ttl: Optional[float] = None,
+        negative_ttl: Optional[float] = None,
+        failure_ttl: Optional[float] = None,
+        max_entries: Optional[int] = None,
+        workers: Optional[int] = None,
+    ):
+        self.lookup = lookup
+        self.timeout = float(os.getenv("DNS_VALIDATION_TIMEOUT", 5.0)) if timeout is None else timeout
+        self.ttl = float(os.getenv("DNS_CACHE_TTL", 300)) if ttl is None else ttl
+        self.negative_ttl = float(os.getenv("DNS_NEGATIVE_TTL", 300)) if negative_ttl is None else negative_ttl
+        self.failure_ttl = float(os.getenv("DNS_FAILURE_TTL", 30)) if failure_ttl is None else failure_ttl
+        self.max_entries = int(os.getenv("DNS_CACHE_SIZE", 50000)) if max_entries is None else max_entries
+        self.workers = max(1, int(os.getenv("DNS_RESOLVER_WORKERS", 8)) if workers is None else workers)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        # One slot per thread, released by the thread when its lookup ends
+        self._slots = threading.BoundedSemaphore(self.workers)
+        # name → (expiry on the monotonic clock, answer)
+        self._cache: "OrderedDict[str, Tuple[float, DnsAnswer]]" = OrderedDict()
+        self._pending: Dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._cache)
+
+    def cached(self, name: str) -> Optional[DnsAnswer]:
+        """The cached answer for `name` if still fresh."""
+        entry = self._cache.get(name)
+        if entry is None:
+            return None
+        expires, answer = entry
+        if time.monotonic() >= expires:
+            del self._cache[name]
+            return None
+        self._cache.move_to_end(name)
+        return answer._replace(cached=True)
+
+    def invalidate(self, name: Optional[str] = None) -> None:
+        """Forget one name, or every name."""
+        if name is None:
+            self._cache.clear()
+        else:
+            self._cache.pop(name, None)
+
+    async def resolve(self, name: str) -> DnsAnswer:
+        """Resolve `name`, from the cache when possible."""
+        answer = self.cached(name)
+        if answer is not None:
+            CACHE_REQUESTS.labels("dns", "hit").inc()
+            return answer
+        CACHE_REQUESTS.labels("dns", "miss").inc()
+
+        pending = self._pending.get(name)
+        if pending is None:
+            pending = self._pending[name] = asyncio.ensure_future(self._resolve_and_cache(name))
+            pending.add_done_callback(lambda _: self._pending.pop(name, None))
+        # shield: a cancelled caller does not cancel the lookup others await
+        return await asyncio.shield(pending)
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="dns")
+        return self._executor
+
+    def _run_lookup(self, name: str) -> str:
+        try:
+            return self.lookup(name)
+        finally:
+            self._slots.release()
+
+    async def _resolve_and_cache(self, name: str) -> DnsAnswer:
+        if not self._slots.acquire(blocking=False):
+            # Queued behind busy threads the timeout would expire before the
+            # lookup starts; the name itself tells us nothing, so nothing is cached
+            logger.warning("DNS resolver threads busy, not resolving '%s'", name)
+            _REJECTED.inc()
+            return DnsAnswer(None, "busy")
+        loop = asyncio.get_running_loop()
+        try:
+            lookup = loop.run_in_executor(self._get_executor(), self._run_lookup, name)
+        except Exception:
+            self._slots.release()
+            raise
+        # A timed-out lookup keeps its thread (and slot) until it returns
+        lookup.add_done_callback(lambda f: f.cancelled() or f.exception())
+        try:
+            address = await asyncio.wait_for(asyncio.shield(lookup), timeout=self.timeout)
+            logger.debug("DNS validation passed for '%s' → %s", name, address)
+            answer, ttl = DnsAnswer(address, "ok"), self.ttl
+        except asyncio.TimeoutError:
+            logger.warning("DNS timeout for '%s' (timeout: %ss)", name, self.timeout)
+            answer, ttl = DnsAnswer(None, "timeout"), self.failure_ttl
+        except socket.gaierror as e:
+            if e.errno == socket.EAI_AGAIN:
+                logger.warning("DNS temporary failure for '%s': %s", name, e)
+                answer, ttl = DnsAnswer(None, "error"), self.failure_ttl
+            else:
+                logger.warning("DNS resolution failed for '%s' (non-existent)", name)
+                answer, ttl = DnsAnswer(None, "nxdomain"), self.negative_ttl
+        except Exception as e:
+            logger.warning("DNS validation error for '%s': %s", name, e)
+            answer, ttl = DnsAnswer(None, "error"), self.failure_ttl
+
+        if ttl > 0:
+            self._cache[name] = (time.monotonic() + ttl, answer)
+            self._cache.move_to_end(name)
+            while len(self._cache) > self.max_entries:
+                self._cache.popitem(last=False)
+        return answer
+
+    def shutdown(self) -> None:
+        """Stop the lookup threads (queued lookups are abandoned)."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+_resolver: Optional[CachingResolver] = None
+
+
+def get_resolver() -> CachingResolver:
+    """Get or create the process-wide resolver."""
+    global _resolver
+    if _resolver is None:
+        _resolver = CachingResolver()
+    return _resolver
+
+
+def shutdown_resolver() -> None:
+    global _resolver
+    if _resolver is not None:
+        _resolver.shutdown()
+        _resolver = None
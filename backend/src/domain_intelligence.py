@@ -6,6 +6,30 @@ Implements blocklist checking, DNS validation, heuristics, and Model 4 integrati
 
 MongoDB-optional: works with in-memory cache when DB is unavailable.
 
+The whitelist (WHITELIST_DOMAINS, MAJOR_DOMAINS_WHITELIST and MongoDB's
+whitelisted_domains) is compiled into one DomainSuffixTrie, so an entry
+also covers its subdomains. The MongoDB entries are loaded in bulk by
+refresh_whitelist() at startup and then every WHITELIST_REFRESH_SECONDS.
+
+Blocklist checks read a BlocklistIndex of the whole blocked_domains
+collection (Bloom filter + sorted hashes), memory-mapped from the snapshot
+at BLOCKLIST_SNAPSHOT_PATH that all workers share. refresh_blocklist_index()
+rebuilds it in one cursor pass when the snapshot is older than
+BLOCKLIST_REFRESH_SECONDS (or after new blocklists are loaded) and otherwise
+maps a snapshot another worker wrote; MongoDB is queried per domain only
+until the first index is available.
+
+DNS validation goes through a CachingResolver (src/dns_resolver.py), which
+caches addresses, NXDOMAIN answers and timeouts per name.
+
+check_domain() first looks for a verdict record of the normalized domain:
+the outcome of every stage (whitelist, blocklist entry, DNS, heuristic,
+Model 4 classification and confidence) from its last full run. A fresh
+record answers without running the stages again. Records live for
+DOMAIN_VERDICT_TTL seconds (DNS failures only for DNS_FAILURE_TTL), at most
+DOMAIN_VERDICT_CACHE_SIZE of them, and are dropped whenever the blocklist
+index or the whitelist changes.
+
 Architecture:
   URL Input → Extract Domain → Normalize → Whitelist → Blocklist → DNS Validation
     → Heuristics → Extract Model 4 Features → Call Model 4 → Cache Result
@@ -14,13 +38,20 @@ Architecture:
 from __future__ import annotations
 
 import os
-import socket
 import asyncio
 import logging
+import time
+from collections import OrderedDict
 from typing import Dict, Optional, Tuple, List
 from urllib.parse import urlparse
 from datetime import datetime, timedelta, timezone
-import httpx
+from src.blocklist_index import BlocklistIndex, BlocklistIndexBuilder
+from src.blocklist_ingest import ingest_sources
+from src.dns_resolver import CachingResolver, get_resolver
+from src.domain_trie import DomainSuffixTrie
+from src.http_gateway import get_gateway
+from src.metrics import CACHE_REQUESTS, MODEL_ERRORS, MODEL_LATENCY
+from src.tracing import span
 
 logger = logging.getLogger(__name__)
 
@@ -51,23 +82,55 @@ class DomainIntelligence:
         "netflix.com", "slack.com", "discord.com", "twitch.tv"
     }
 
-    def __init__(self, db=None):
+    def __init__(self, db=None, resolver: Optional[CachingResolver] = None):
         """Initialize with optional MongoDB database connection.
 
         Args:
             db: motor.motor_asyncio.AsyncIOMotorDatabase or None.
                 If None, uses in-memory caches only.
+            resolver: DNS resolver for validate_dns(); the process-wide
+                caching resolver by default.
         """
         self.db = db
-        self.dns_timeout = float(os.getenv("DNS_VALIDATION_TIMEOUT", 5.0))
+        self.resolver = resolver if resolver is not None else get_resolver()
         self.cache_ttl = int(os.getenv("DOMAIN_CACHE_TTL", 2592000))  # 30 days
+        self.verdict_ttl = float(os.getenv("DOMAIN_VERDICT_TTL", 600))
+        self.verdict_cache_size = int(os.getenv("DOMAIN_VERDICT_CACHE_SIZE", 100000))
         self.hf_model4_url = os.getenv("HF_MODEL4_URL", "https://bhavyasoni21-model4.hf.space/predict")
         self.hf_model4_timeout = float(os.getenv("HF_MODEL4_TIMEOUT", 8.0))
 
+        self.whitelist_refresh_interval = float(os.getenv("WHITELIST_REFRESH_SECONDS", 300))
+        self.blocklist_snapshot_path = os.getenv("BLOCKLIST_SNAPSHOT_PATH", "data/blocklist.idx")
+        self.blocklist_refresh_interval = float(os.getenv("BLOCKLIST_REFRESH_SECONDS", 3600))
+        self.blocklist_bloom_fp_rate = float(os.getenv("BLOCKLIST_BLOOM_FP_RATE", 0.01))
+
         # In-memory caches (used when MongoDB is unavailable)
         self._mem_cache: Dict[str, Dict] = {}  # domain → {classification, cached_at}
         self._mem_blocklist: Dict[str, Dict] = {}  # domain → {category, source, confidence}
 
+        # domain → (expiry on the monotonic clock, verdict record), see check_domain()
+        self._verdicts: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+
+        # Env + hardcoded entries now; MongoDB entries once refresh_whitelist() runs
+        self._whitelist = self._compile_whitelist([])
+        self._whitelist_extra: frozenset = frozenset()
+
+        # Full blocklist index (None until a snapshot is mapped or built)
+        self._blocklist_index: Optional[BlocklistIndex] = None
+        self._blocklist_snapshot_id: Optional[Tuple[int, int]] = None
+        self._open_blocklist_snapshot()
+
+    def cache_sizes(self) -> Dict[str, int]:
+        """In-memory cache entry counts (for /metrics)."""
+        return {
+            "classification": len(self._mem_cache),
+            "blocklist": len(self._mem_blocklist),
+            "whitelist": len(self._whitelist),
+            "blocklist_index": len(self._blocklist_index) if self._blocklist_index is not None else 0,
+            "dns": len(self.resolver),
+            "verdicts": len(self._verdicts),
+        }
+
     # ===== DOMAIN EXTRACTION & NORMALIZATION =====
 
     @staticmethod
@@ -79,7 +142,7 @@ class DomainIntelligence:
             parsed = urlparse(url)
             return parsed.netloc.lower() if parsed.netloc else None
         except Exception as e:
-            logger.warning(f"Failed to extract domain from URL '{url}': {e}")
+            logger.warning("Failed to extract domain from URL '%s': %s", url, e)
             return None
 
     @staticmethod
@@ -93,44 +156,139 @@ class DomainIntelligence:
 
     # ===== WHITELIST CHECKING =====
 
-    async def check_whitelist(self, domain: str) -> bool:
-        """Check if domain is whitelisted (fast-track to 'normal')."""
-        # Check environment variable whitelist
+    def _compile_whitelist(self, extra: List[str]) -> DomainSuffixTrie:
+        """Trie of the env, hardcoded and `extra` whitelist entries."""
         env_whitelist = os.getenv("WHITELIST_DOMAINS", "")
-        if env_whitelist:
-            whitelist_domains = set(d.strip() for d in env_whitelist.split(","))
-            if domain in whitelist_domains:
-                return True
+        domains = [d for d in env_whitelist.split(",") if d.strip()]
+        domains.extend(self.MAJOR_DOMAINS_WHITELIST)
+        domains.extend(extra)
+        return DomainSuffixTrie(self.normalize_domain(d) for d in domains)
 
-        # Check hardcoded whitelist
-        if domain in self.MAJOR_DOMAINS_WHITELIST:
-            return True
+    async def refresh_whitelist(self) -> int:
+        """Reload the whitelist, MongoDB entries included; returns its size.
 
-        # Check MongoDB whitelist collection (if available)
+        The new trie replaces the old one only once fully built, so checks
+        never see a partial list; on a MongoDB error the old one is kept.
+        """
+        extra: List[str] = []
         if self.db is not None:
             try:
-                whitelist_record = await self.db["whitelisted_domains"].find_one({"domain": domain})
-                if whitelist_record:
-                    return True
+                cursor = self.db["whitelisted_domains"].find({}, {"domain": 1, "_id": 0})
+                async for record in cursor:
+                    if isinstance(record.get("domain"), str):
+                        extra.append(record["domain"])
             except Exception as e:
-                logger.warning(f"Error checking whitelist for '{domain}': {e}")
+                logger.warning("Error loading whitelist from MongoDB: %s", e)
+                return len(self._whitelist)
+        self._whitelist = self._compile_whitelist(extra)
+        if frozenset(extra) != self._whitelist_extra:
+            self._whitelist_extra = frozenset(extra)
+            self.invalidate_verdicts()
+        logger.debug("Whitelist compiled: %d domains (%d from MongoDB)", len(self._whitelist), len(extra))
+        return len(self._whitelist)
+
+    async def run_whitelist_refresh(self) -> None:
+        """Background loop: refresh_whitelist() every WHITELIST_REFRESH_SECONDS."""
+        while True:
+            await self.refresh_whitelist()
+            await asyncio.sleep(self.whitelist_refresh_interval)
 
-        return False
+    async def check_whitelist(self, domain: str) -> bool:
+        """Check if domain (or a parent domain) is whitelisted (fast-track to 'normal')."""
+        return domain in self._whitelist
 
     # ===== BLOCKLIST CHECKING =====
 
+    def _snapshot_id(self) -> Optional[Tuple[int, int]]:
+        """(inode, mtime) of the blocklist snapshot, None if there is none."""
+        try:
+            st = os.stat(self.blocklist_snapshot_path)
+        except OSError:
+            return None
+        return st.st_ino, st.st_mtime_ns
+
+    def _open_blocklist_snapshot(self) -> bool:
+        """Map the snapshot if it changed since it was last mapped."""
+        snapshot_id = self._snapshot_id()
+        if snapshot_id is None or snapshot_id == self._blocklist_snapshot_id:
+            return False
+        try:
+            index = BlocklistIndex.open(self.blocklist_snapshot_path)
+        except Exception as e:
+            logger.warning("Could not open blocklist snapshot %s: %s", self.blocklist_snapshot_path, e)
+            return False
+        self._blocklist_index, self._blocklist_snapshot_id = index, snapshot_id
+        self.invalidate_verdicts()
+        logger.info("Blocklist index mapped from %s (%d domains)", self.blocklist_snapshot_path, len(index))
+        return True
+
+    async def refresh_blocklist_index(self, rebuild: bool = False) -> int:
+        """Bring the blocklist index up to date; returns its size.
+
+        Rebuilds it from MongoDB (and rewrites the snapshot) when `rebuild`
+        is set or the snapshot is missing or older than
+        BLOCKLIST_REFRESH_SECONDS; otherwise maps the snapshot if another
+        process replaced it.
+        """
+        snapshot_id = self._snapshot_id()
+        stale = snapshot_id is None or time.time() - snapshot_id[1] / 1e9 > self.blocklist_refresh_interval
+        if self.db is None or not (rebuild or stale):
+            self._open_blocklist_snapshot()
+            return len(self._blocklist_index) if self._blocklist_index is not None else 0
+
+        builder = BlocklistIndexBuilder()
+        try:
+            cursor = self.db["blocked_domains"].find(
+                {}, {"domain": 1, "category": 1, "source": 1, "confidence": 1, "_id": 0}
+            )
+            async for record in cursor:
+                builder.add_record(record)
+        except Exception as e:
+            logger.warning("Error loading blocklist from MongoDB: %s", e)
+            self._open_blocklist_snapshot()
+            return len(self._blocklist_index) if self._blocklist_index is not None else 0
+
+        loop = asyncio.get_running_loop()
+        index = await loop.run_in_executor(None, builder.build, self.blocklist_bloom_fp_rate)
+        try:
+            await loop.run_in_executor(None, index.save, self.blocklist_snapshot_path)
+            self._blocklist_snapshot_id = self._snapshot_id()
+        except OSError as e:
+            logger.warning("Could not write blocklist snapshot %s: %s", self.blocklist_snapshot_path, e)
+        # One reference swap: a check sees the old index or the new one
+        self._blocklist_index = index
+        # Entries cached from per-domain queries are covered by the index now
+        self._mem_blocklist.clear()
+        self.invalidate_verdicts()
+        logger.info("Blocklist index rebuilt: %d domains", len(index))
+        return len(index)
+
+    async def run_blocklist_refresh(self) -> None:
+        """Background loop: refresh_blocklist_index() every BLOCKLIST_REFRESH_SECONDS.
+
+        Checks at least once a minute for a snapshot written by another worker.
+        """
+        while True:
+            await self.refresh_blocklist_index()
+            await asyncio.sleep(min(60.0, self.blocklist_refresh_interval))
+
     async def check_blocklist(self, domain: str) -> Optional[Dict]:
         """Check if domain is blocked."""
         # Check in-memory blocklist first
         if domain in self._mem_blocklist:
             return self._mem_blocklist[domain]
 
+        # The full index answers for every domain, without I/O
+        index = self._blocklist_index
+        if index is not None:
+            return index.lookup(domain)
+
         # Check MongoDB (if available)
         if self.db is not None:
             try:
                 blocked = await self.db["blocked_domains"].find_one({"domain": domain})
                 if blocked:
-                    logger.warning(f"Domain '{domain}' found in blocklist: {blocked.get('category')}")
+                    logger.warning("Domain '%s' found in blocklist: %s", domain, blocked.get("category"))
                     result = {
                         "category": blocked.get("category", "unknown"),
                         "source": blocked.get("source", "local"),
@@ -139,31 +297,23 @@ class DomainIntelligence:
                     self._mem_blocklist[domain] = result
                     return result
             except Exception as e:
-                logger.warning(f"Error checking blocklist for '{domain}': {e}")
+                logger.warning("Error checking blocklist for '%s': %s", domain, e)
 
         return None
 
     # ===== DNS VALIDATION =====
 
-    async def validate_dns(self, domain: str) -> bool:
-        """Validate domain exists via DNS resolution."""
-        try:
-            loop = asyncio.get_event_loop()
-            result = await asyncio.wait_for(
-                loop.run_in_executor(None, socket.gethostbyname, domain),
-                timeout=self.dns_timeout
-            )
-            logger.info(f"DNS validation passed for '{domain}' → {result}")
-            return True
-        except asyncio.TimeoutError:
-            logger.warning(f"DNS timeout for '{domain}' (timeout: {self.dns_timeout}s)")
-            return False
-        except socket.gaierror:
-            logger.warning(f"DNS resolution failed for '{domain}' (non-existent)")
-            return False
-        except Exception as e:
-            logger.warning(f"DNS validation error for '{domain}': {e}")
-            return False
+    async def validate_dns(self, domain: str) -> Optional[bool]:
+        """Validate domain exists via DNS resolution (answers, NXDOMAIN and
+        timeouts are cached by the resolver).
+
+        None when the domain could not be checked because every resolver
+        thread was busy: that says nothing about the domain.
+        """
+        answer = await self.resolver.resolve(domain)
+        if answer.status == "busy":
+            return None
+        return answer.ok
 
     # ===== HEURISTIC CHECKS =====
 
@@ -236,49 +386,56 @@ class DomainIntelligence:
         """
         payload = {"features": features}
 
+        start = time.perf_counter()
         try:
-            async with httpx.AsyncClient(timeout=self.hf_model4_timeout) as client:
-                response = await client.post(self.hf_model4_url, json=payload)
-                if response.status_code == 200:
-                    result = response.json()
-                    logger.debug(f"Model 4 raw response keys: {list(result.keys()) if isinstance(result, dict) else type(result)}")
-                    # FIX: Normalize key — M4 returns 'predicted_label',
-                    # threat_engine expects 'classification'
-                    predicted_label = result.get("predicted_label", "unknown")
-                    # Try multiple common confidence key names used by HF endpoints
-                    raw_confidence = None
-                    for key in ("confidence", "score", "probability", "confidence_score", "prob"):
-                        if key in result:
-                            raw_confidence = result[key]
-                            break
-                    if raw_confidence is None:
-                        # HF Model 4 may not return a confidence key.
-                        # If a valid prediction was made, assign a reasonable default
-                        # confidence so the score is not silently zeroed.
-                        if predicted_label and predicted_label != "unknown":
-                            raw_confidence = 0.85
-                            logger.info(f"Model 4 response has no confidence key; using default {raw_confidence} for label '{predicted_label}'")
-                        else:
-                            logger.warning(f"Model 4 response missing confidence key. Keys: {list(result.keys())}. Defaulting to 0.0")
-                            raw_confidence = 0.0
-                    # Normalize confidence to 0.0–1.0 — HF endpoint may return 0–100 scale
-                    if isinstance(raw_confidence, (int, float)) and raw_confidence > 1.0:
-                        raw_confidence = raw_confidence / 100.0
-                    return {
-                        "classification": predicted_label,
-                        "confidence": round(float(raw_confidence), 4),
-                        "raw_prediction_encoded": result.get("raw_prediction_encoded", -1),
-                    }
-                else:
-                    error_msg = f"Model 4 HTTP {response.status_code}"
-                    logger.error(error_msg)
-                    return {"classification": "unknown", "confidence": 0.0}
+            response = await get_gateway().post(
+                self.hf_model4_url, json=payload, timeout=self.hf_model4_timeout
+            )
+            if response.status_code == 200:
+                result = response.json()
+                logger.debug("Model 4 raw response keys: %s", list(result.keys()) if isinstance(result, dict) else type(result))
+                # FIX: Normalize key — M4 returns 'predicted_label',
+                # threat_engine expects 'classification'
+                predicted_label = result.get("predicted_label", "unknown")
+                # Try multiple common confidence key names used by HF endpoints
+                raw_confidence = None
+                for key in ("confidence", "score", "probability", "confidence_score", "prob"):
+                    if key in result:
+                        raw_confidence = result[key]
+                        break
+                if raw_confidence is None:
+                    # HF Model 4 may not return a confidence key.
+                    # If a valid prediction was made, assign a reasonable default
+                    # confidence so the score is not silently zeroed.
+                    if predicted_label and predicted_label != "unknown":
+                        raw_confidence = 0.85
+                        logger.debug("Model 4 response has no confidence key; using default %s for label '%s'", raw_confidence, predicted_label)
+                    else:
+                        logger.warning("Model 4 response missing confidence key. Keys: %s. Defaulting to 0.0", list(result.keys()))
+                        raw_confidence = 0.0
+                # Normalize confidence to 0.0–1.0 — HF endpoint may return 0–100 scale
+                if isinstance(raw_confidence, (int, float)) and raw_confidence > 1.0:
+                    raw_confidence = raw_confidence / 100.0
+                return {
+                    "classification": predicted_label,
+                    "confidence": round(float(raw_confidence), 4),
+                    "raw_prediction_encoded": result.get("raw_prediction_encoded", -1),
+                }
+            else:
+                error_msg = f"Model 4 HTTP {response.status_code}"
+                logger.error(error_msg)
+                MODEL_ERRORS.labels("model4").inc()
+                return {"classification": "unknown", "confidence": 0.0}
         except asyncio.TimeoutError:
-            logger.error(f"Model 4 timeout ({self.hf_model4_timeout}s)")
+            logger.error("Model 4 timeout (%ss)", self.hf_model4_timeout)
+            MODEL_ERRORS.labels("model4").inc()
             return {"classification": "unknown", "confidence": 0.0}
         except Exception as e:
-            logger.error(f"Model 4 error: {str(e)}")
+            logger.error("Model 4 error: %s", e)
+            MODEL_ERRORS.labels("model4").inc()
             return {"classification": "unknown", "confidence": 0.0}
+        finally:
+            MODEL_LATENCY.labels("model4").observe(time.perf_counter() - start)
 
     # ===== DOMAIN CACHE MANAGEMENT =====
 
@@ -289,6 +446,7 @@ class DomainIntelligence:
             entry = self._mem_cache[domain]
             age = (datetime.now(timezone.utc) - entry["cached_at"]).total_seconds()
             if age < self.cache_ttl:
+                CACHE_REQUESTS.labels("domain", "hit").inc()
                 return {
                     "classification": entry["classification"],
                     "from_cache": True,
@@ -296,6 +454,8 @@ class DomainIntelligence:
                 }
             else:
                 del self._mem_cache[domain]
+        # Each layer counts its own hits and misses
+        CACHE_REQUESTS.labels("domain", "miss").inc()
 
         # Check MongoDB cache (if available)
         if self.db is not None:
@@ -310,6 +470,7 @@ class DomainIntelligence:
                             "classification": cache_entry.get("classification"),
                             "cached_at": cached_at,
                         }
+                        CACHE_REQUESTS.labels("domain_mongo", "hit").inc()
                         return {
                             "classification": cache_entry.get("classification"),
                             "from_cache": True,
@@ -318,14 +479,23 @@ class DomainIntelligence:
                     else:
                         await self.db["domain_cache"].delete_one({"domain": domain})
             except Exception as e:
-                logger.warning(f"Error retrieving cache for '{domain}': {e}")
+                logger.warning("Error retrieving cache for '%s': %s", domain, e)
+            CACHE_REQUESTS.labels("domain_mongo", "miss").inc()
 
         return None
 
-    async def cache_classification(self, domain: str, classification: str, raw_score: int = 0) -> None:
+    async def cache_classification(
+        self, domain: str, classification: str, raw_score: int = 0, confidence: Optional[float] = None,
+    ) -> None:
         """Store Model 4 classification in cache (MongoDB + in-memory)."""
         now = datetime.now(timezone.utc)
 
+        # Complete the domain's verdict record, if it has one
+        entry = self._verdicts.get(domain)
+        if entry is not None:
+            entry[1]["model4_classification"] = classification
+            entry[1]["model4_confidence"] = confidence
+
         # Always update in-memory cache
         self._mem_cache[domain] = {
             "classification": classification,
@@ -347,15 +517,19 @@ class DomainIntelligence:
                     upsert=True,
                 )
             except Exception as e:
-                logger.warning(f"Error caching classification for '{domain}': {e}")
+                logger.warning("Error caching classification for '%s': %s", domain, e)
 
     # ===== BLOCKLIST LOADING =====
 
-    async def load_blocklists_from_sources(self) -> None:
-        """Fetch and load blocklists from public sources."""
+    async def load_blocklists_from_sources(self, force: bool = False) -> List[Dict]:
+        """Fetch the public blocklists concurrently and apply them as deltas.
+
+        Unchanged feeds (ETag / Last-Modified) are skipped unless `force`;
+        the blocklist index is rebuilt when any domain was added or removed.
+        """
         if self.db is None:
             logger.warning("Skipping blocklist loading — no MongoDB configured")
-            return
+            return []
 
         sources = [
             ("urlhaus", os.getenv("URLHAUS_API_URL", "https://urlhaus.abuse.ch/downloads/csv_recent/")),
@@ -363,54 +537,12 @@ class DomainIntelligence:
             ("spamhaus", os.getenv("SPAMHAUS_API_URL", "https://www.spamhaus.org/drop/drop.txt")),
         ]
 
-        for source_name, source_url in sources:
-            try:
-                await self._fetch_and_load_blocklist(source_name, source_url)
-            except Exception as e:
-                logger.error(f"Failed to load {source_name} blocklist: {e}")
-
-    async def _fetch_and_load_blocklist(self, source_name: str, source_url: str) -> None:
-        """Fetch and parse a blocklist from a source."""
-        logger.info(f"Loading {source_name} blocklist from {source_url}")
-
-        try:
-            async with httpx.AsyncClient(timeout=30.0) as client:
-                response = await client.get(source_url)
-                if response.status_code != 200:
-                    logger.error(f"Failed to fetch {source_name}: HTTP {response.status_code}")
-                    return
-
-                content = response.text
-                domains_added = 0
-
-                for line in content.split("\n"):
-                    line = line.strip()
-                    if not line or line.startswith("#"):
-                        continue
-
-                    domain = self._parse_blocklist_line(line, source_name)
-                    if domain:
-                        try:
-                            await self.db["blocked_domains"].update_one(
-                                {"domain": domain},
-                                {
-                                    "$set": {
-                                        "category": self._categorize_threat(domain),
-                                        "source": source_name,
-                                        "confidence": 0.9,
-                                        "last_updated": datetime.now(timezone.utc)
-                                    }
-                                },
-                                upsert=True
-                            )
-                            domains_added += 1
-                        except Exception as e:
-                            logger.debug(f"Error adding domain {domain}: {e}")
-
-                logger.info(f"Loaded {domains_added} domains from {source_name}")
-
-        except Exception as e:
-            logger.error(f"Error fetching {source_name} blocklist: {e}")
+        results = await ingest_sources(
+            self.db, sources, self._parse_blocklist_line, self._categorize_threat, force=force,
+        )
+        if any(r["added"] or r["removed"] for r in results):
+            await self.refresh_blocklist_index(rebuild=True)
+        return results
 
     @staticmethod
     def _parse_blocklist_line(line: str, source_name: str) -> Optional[str]:
@@ -451,6 +583,87 @@ class DomainIntelligence:
 
         return "unknown"
 
+    # ===== VERDICT RECORDS =====
+
+    def _get_verdict(self, domain: str) -> Optional[Dict]:
+        """The domain's verdict record if still fresh."""
+        entry = self._verdicts.get(domain)
+        if entry is not None:
+            expires, record = entry
+            if time.monotonic() < expires:
+                self._verdicts.move_to_end(domain)
+                CACHE_REQUESTS.labels("domain_verdict", "hit").inc()
+                return record
+            del self._verdicts[domain]
+        CACHE_REQUESTS.labels("domain_verdict", "miss").inc()
+        return None
+
+    def _store_verdict(self, domain: str, record: Dict) -> None:
+        ttl = self.verdict_ttl
+        if record["dns_ok"] is False:
+            # Often transient: keep no longer than the resolver keeps the failure
+            ttl = min(ttl, self.resolver.failure_ttl)
+        elif record["dns_ok"] is None and not (record["whitelisted"] or record["blocklist"]):
+            # DNS was reached but not checked (resolver busy): check it next time
+            return
+        if ttl <= 0:
+            return
+        self._verdicts[domain] = (time.monotonic() + ttl, record)
+        self._verdicts.move_to_end(domain)
+        while len(self._verdicts) > self.verdict_cache_size:
+            self._verdicts.popitem(last=False)
+
+    def invalidate_verdicts(self, domain: Optional[str] = None) -> None:
+        """Forget one domain's verdict record, or every record."""
+        if domain is None:
+            self._verdicts.clear()
+        else:
+            self._verdicts.pop(domain, None)
+
+    async def _evaluate_domain(self, domain: str) -> Dict:
+        """Run the filter stages in order, stopping at the first that decides."""
+        record = {
+            "whitelisted": False,
+            "blocklist": None,
+            "dns_ok": None,
+            "heuristic": None,
+            "threat_flags": {"type_defacement": 0.0, "type_malware": 0.0, "type_phishing": 0.0},
+            "model4_classification": None,
+            "model4_confidence": None,
+        }
+
+        # Whitelist (fast-track)
+        with span("domain.whitelist"):
+            record["whitelisted"] = await self.check_whitelist(domain)
+        if record["whitelisted"]:
+            return record
+
+        # Blocklist
+        with span("domain.blocklist"):
+            record["blocklist"] = await self.check_blocklist(domain)
+        if record["blocklist"]:
+            record["threat_flags"] = self.extract_threat_flags(domain, record["blocklist"])
+            return record
+
+        # DNS
+        with span("domain.dns"):
+            record["dns_ok"] = await self.validate_dns(domain)
+        if record["dns_ok"] is False:
+            return record
+
+        # Heuristics
+        is_suspicious, record["heuristic"] = self.heuristic_check(domain)
+        if is_suspicious:
+            record["threat_flags"] = self.extract_threat_flags(domain)
+        return record
+
+    @staticmethod
+    def _awaits_model4(record: Dict) -> bool:
+        """True when every filter passed, so Model 4 has the final say."""
+        return not (
+            record["whitelisted"] or record["blocklist"] or record["dns_ok"] is False or record["heuristic"]
+        )
+
     # ===== MAIN INTELLIGENCE CHECK =====
 
     async def check_domain(self, url: str, raw_request: str = "") -> Dict:
@@ -478,42 +691,37 @@ class DomainIntelligence:
         domain = self.normalize_domain(domain)
         result["domain"] = domain
 
-        # 2. Check whitelist (fast-track)
-        if await self.check_whitelist(domain):
+        # 2. Verdict record; else whitelist → blocklist → DNS → heuristics
+        record = self._get_verdict(domain)
+        if record is None:
+            record = await self._evaluate_domain(domain)
+            self._store_verdict(domain, record)
+
+        # 3. Check cache for Model 4 classification
+        if self._awaits_model4(record) and record["model4_classification"] is None:
+            with span("domain.cache"):
+                cached = await self.get_cached_classification(domain)
+            if cached:
+                record["model4_classification"] = cached["classification"]
+
+        result["threat_flags"] = dict(record["threat_flags"])
+        if record["whitelisted"]:
             result["passes_domain_filter"] = True
             result["classification"] = "normal"
-            return result
-
-        # 3. Check blocklist
-        blocklist_info = await self.check_blocklist(domain)
-        if blocklist_info:
-            result["blocked_reason"] = blocklist_info.get("category")
-            result["classification"] = blocklist_info.get("category")
-            result["threat_flags"] = self.extract_threat_flags(domain, blocklist_info)
-            return result
-
-        # 4. Validate DNS
-        if not await self.validate_dns(domain):
+        elif record["blocklist"]:
+            result["blocked_reason"] = record["blocklist"].get("category")
+            result["classification"] = record["blocklist"].get("category")
+        elif record["dns_ok"] is False:
             result["blocked_reason"] = "dns_failed"
             result["classification"] = "non_existent_domain"
-            return result
-
-        # 5. Heuristic checks
-        is_suspicious, reason = self.heuristic_check(domain)
-        if is_suspicious:
-            result["blocked_reason"] = reason
+        elif record["heuristic"]:
+            result["blocked_reason"] = record["heuristic"]
             result["classification"] = "suspicious"
-            result["threat_flags"] = self.extract_threat_flags(domain)
-            return result
-
-        # 6. Check cache for Model 4 classification
-        cached = await self.get_cached_classification(domain)
-        if cached:
-            result["passes_domain_filter"] = cached["classification"] == "normal"
-            result["classification"] = cached["classification"]
+        elif record["model4_classification"] is not None:
+            result["passes_domain_filter"] = record["model4_classification"] == "normal"
+            result["classification"] = record["model4_classification"]
             result["from_cache"] = True
-            return result
-
-        # 7. Passed all filters, awaiting Model 4
-        result["passes_domain_filter"] = True
+        else:
+            # 4. Passed all filters, awaiting Model 4
+            result["passes_domain_filter"] = True
         return result
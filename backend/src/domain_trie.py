@@ -0,0 +1,61 @@
+"""
+CyHub — Domain Suffix Trie
+
+Domain lists (the whitelist) were matched by exact string, so an entry for
+github.com did not cover api.github.com, and every list was rebuilt or
+queried per request. DomainSuffixTrie compiles a list once into a trie over
+reversed labels (com → github → api): a lookup walks the queried domain's
+labels from the right and stops at the first entry it passes, so it costs
+one dict step per label whatever the size of the list, and matches an entry
+and all of its subdomains. Matching is on whole labels: github.com does not
+cover evilgithub.com.
+"""
+
+from __future__ import annotations
+
+from typing import Dict, Iterable, Optional
+
+# Key marking "an entry ends at this node" (no label is empty)
+_END = ""
+
+
+class DomainSuffixTrie:
+    """Set of domains, each matching itself and its subdomains."""
+
+    __slots__ = ("_root", "_size")
+
+    def __init__(self, domains: Iterable[str] = ()):
+        self._root: Dict[str, Dict] = {}
+        self._size = 0
+        for domain in domains:
+            self.add(domain)
+
+    def __len__(self) -> int:
+        return self._size
+
+    def add(self, domain: str) -> None:
+        """Add a domain (lowercase, no leading/trailing dots); blanks are ignored."""
+        labels = [label for label in domain.split(".") if label]
+        if not labels:
+            return
+        node = self._root
+        for label in reversed(labels):
+            node = node.setdefault(label, {})
+        if _END not in node:
+            node[_END] = {}
+            self._size += 1
+
+    def match(self, domain: str) -> Optional[str]:
+        """The shortest entry equal to `domain` or one of its parent domains, or None."""
+        labels = domain.split(".")
+        node = self._root
+        for depth, label in enumerate(reversed(labels), 1):
+            node = node.get(label) if label else None
+            if node is None:
+                return None
+            if _END in node:
+                return ".".join(labels[-depth:])
+        return None
+
+    def __contains__(self, domain: str) -> bool:
+        return self.match(domain) is not None
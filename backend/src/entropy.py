@@ -0,0 +1,256 @@
+"""
+CyHub — Shannon Entropy Kernel
+
+Entropy was computed by three separate pure-Python loops (a Counter in
+feature_engineering, a hand-rolled dict in model4_features, a pandas
+value_counts in bot_feature_builder), several times per request and once
+per row in batches. They now all share this kernel.
+
+Every histogram is reduced the same way,
+
+    H = log2(n) - Σ c·log2(c) / n
+
+with log2 of small counts read from a table built once, and the c·log2(c)
+terms added one by one in ascending symbol order. A character's histogram
+therefore gives the same float whichever path computes it:
+
+  shannon_entropy()        str.count() per distinct char for short strings;
+                           for longer ones a numpy bincount over the bytes
+                           (ASCII text) or the sorted code points
+  char_entropy()           a precomputed Counter / character histogram
+  entropy_from_count_groups()  many count histograms (e.g. per session)
+  entropy_term() / entropy_from_terms()
+                           a histogram updated one count at a time, from a
+                           running Σ c·log2(c) (not bit-identical: the sum
+                           is kept in arrival order)
+  shannon_entropy_batch()  byte-sized alphabets: one (rows × chars) bincount
+                           per block, accumulated column by column; wider
+                           ones: the sorted non-zero (row, char) cells, summed
+                           rank by rank across rows (rows with many distinct
+                           chars, and long rows, one by one)
+
+Entropy is over characters (code points), as the models were trained on;
+for ASCII text that is the byte histogram.
+"""
+
+from __future__ import annotations
+
+import math
+from typing import Iterable, Mapping, Optional, Sequence, Tuple
+
+import numpy as np
+
+# log2(0..LOG2_TABLE_SIZE-1); log2(0) is stored as 0 so that an empty
+# histogram cell contributes 0·log2(0) = 0
+LOG2_TABLE_SIZE = 1 << 16
+_LOG2 = [0.0] + [math.log2(c) for c in range(1, LOG2_TABLE_SIZE)]
+_LOG2_ARRAY = np.array(_LOG2)
+
+# Below this length, str.count() per distinct char beats the numpy setup cost
+SHORT_TEXT_CHARS = 32
+
+# Batch rows at least this long are counted one at a time (a per-row
+# bincount is cheaper than their share of the rows × chars histogram)
+LONG_TEXT_CHARS = 1024
+
+# Histogram cells (rows × distinct chars) per dense batch pass
+_MAX_BATCH_CELLS = 1 << 22
+
+# Batch rows with more distinct chars than this are reduced one at a time
+WIDE_ROW_CODES = 128
+
+
+def _log2(c: int) -> float:
+    return _LOG2[c] if c < LOG2_TABLE_SIZE else math.log2(c)
+
+
+def _log2_array(values: np.ndarray) -> np.ndarray:
+    """Elementwise _log2() of non-negative integers (same floats)."""
+    out = _LOG2_ARRAY[np.minimum(values, LOG2_TABLE_SIZE - 1)]
+    large = values >= LOG2_TABLE_SIZE
+    if large.any():
+        out[large] = [math.log2(c) for c in values[large].tolist()]
+    return out
+
+
+def entropy_from_counts(counts: Iterable[int], total: Optional[int] = None) -> float:
+    """Shannon entropy (bits) of a histogram, given its counts in order.
+
+    `total` defaults to the sum of the counts. Zero counts are ignored.
+    """
+    counts = [c for c in counts if c > 0]
+    n = sum(counts) if total is None else total
+    if len(counts) < 2 or not n:
+        return 0.0
+    terms = 0.0
+    for c in counts:
+        terms += c * _log2(c)
+    return max(0.0, _log2(n) - terms / n)
+
+
+def entropy_from_count_groups(counts: np.ndarray, groups: np.ndarray, n_groups: int) -> np.ndarray:
+    """entropy_from_counts() of many histograms at once (same floats).
+
+    `counts` holds every histogram's positive counts back to back, each in
+    summation order; `groups` (non-decreasing) names the histogram of each.
+    """
+    entropy = np.zeros(n_groups)
+    if not len(counts):
+        return entropy
+    sizes = np.bincount(groups, minlength=n_groups)
+    rank = np.arange(len(counts)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    by_rank = np.argsort(rank, kind="stable")
+    rank_bounds = np.concatenate(([0], np.cumsum(np.bincount(rank))))
+
+    # Term k of every histogram is added in one step (a group appears once per
+    # rank), so each histogram is summed in order, as in the loop above
+    terms = counts * _log2_array(counts)
+    acc = np.zeros(n_groups)
+    for r in range(len(rank_bounds) - 1):
+        sel = by_rank[rank_bounds[r]:rank_bounds[r + 1]]
+        acc[groups[sel]] += terms[sel]
+
+    totals = np.bincount(groups, weights=counts, minlength=n_groups).astype(np.int64)
+    multi = sizes > 1
+    entropy[multi] = np.maximum(0.0, _log2_array(totals[multi]) - acc[multi] / totals[multi])
+    return entropy
+
+
+def entropy_term(c: int) -> float:
+    """c·log2(c), the share of one histogram cell in Σ c·log2(c)."""
+    return c * _log2(c)
+
+
+def entropy_from_terms(terms: float, total: int, distinct: int) -> float:
+    """Shannon entropy of a histogram of `distinct` cells from its running
+    Σ c·log2(c) (see entropy_term()) and its total count."""
+    if distinct < 2 or not total:
+        return 0.0
+    return max(0.0, _log2(total) - terms / total)
+
+
+def char_entropy(counts: Mapping[str, int], length: int) -> float:
+    """Shannon entropy from a precomputed character histogram (e.g. a Counter)."""
+    if len(counts) < 2 or not length:
+        return 0.0
+    if length >= LOG2_TABLE_SIZE:
+        return entropy_from_counts([counts[ch] for ch in sorted(counts)], length)
+    log2 = _LOG2
+    terms = 0.0
+    for _, c in sorted(counts.items()):
+        terms += c * log2[c]
+    return max(0.0, log2[length] - terms / length)
+
+
+def shannon_entropy(text: str) -> float:
+    """Shannon entropy (bits per character) of a string.
+
+    Higher entropy → more randomness / unpredictability, which may
+    indicate obfuscated or encoded payloads.
+    """
+    n = len(text)
+    if n < SHORT_TEXT_CHARS:
+        chars = sorted(set(text))
+        if len(chars) < 2:
+            return 0.0
+        log2 = _LOG2
+        terms = 0.0
+        for ch in chars:
+            c = text.count(ch)
+            terms += c * log2[c]
+        return max(0.0, log2[n] - terms / n)
+    if text.isascii():
+        counts = np.bincount(np.frombuffer(text.encode("ascii"), dtype=np.uint8))
+        counts = counts[counts.nonzero()]
+    else:
+        _, counts = np.unique(char_codes([text])[0], return_counts=True)
+    if len(counts) < 2:
+        return 0.0
+    logs = _LOG2_ARRAY[counts] if n < LOG2_TABLE_SIZE else _log2_array(counts)
+    # cumsum adds the terms one by one, like the loops above
+    terms = float(np.cumsum(counts * logs)[-1])
+    return max(0.0, _log2(n) - terms / n)
+
+
+def char_codes(texts: Sequence[str]) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(code points of the concatenated texts, row of each code point, text lengths)."""
+    lengths = np.fromiter(map(len, texts), dtype=np.int64, count=len(texts))
+    joined = "".join(texts)
+    if joined.isascii():
+        codes = np.frombuffer(joined.encode("ascii"), dtype=np.uint8)
+    else:
+        codes = np.frombuffer(joined.encode("utf-32-le", "surrogatepass"), dtype=np.uint32)
+    return codes, np.repeat(np.arange(len(texts)), lengths), lengths
+
+
+def code_point_entropies(codes: np.ndarray, row_ids: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    """Per-row Shannon entropy from char_codes() output (same floats as shannon_entropy())."""
+    n = len(lengths)
+    entropy = np.zeros(n)
+    if not len(codes):
+        return entropy
+    if codes.dtype == np.uint8:
+        # Byte-sized alphabet: a dense (rows × codes) histogram, accumulated
+        # column by column (absent codes add 0.0), in passes of bounded size
+        return _dense_code_entropies(codes, row_ids, lengths)
+
+    # Non-zero (row, code) cells in row-major order: each row's histogram,
+    # in ascending code order (code points fit in 21 bits)
+    cells, counts = np.unique((row_ids << 21) | codes, return_counts=True)
+    groups = cells >> 21
+    sizes = np.bincount(groups, minlength=n)
+
+    # Narrow rows are summed together, one histogram rank per step; a wide
+    # row on its own, so the steps never exceed WIDE_ROW_CODES
+    wide = np.flatnonzero(sizes > WIDE_ROW_CODES)
+    if not len(wide):
+        return entropy_from_count_groups(counts, groups, n)
+    narrow = sizes[groups] <= WIDE_ROW_CODES
+    entropy = entropy_from_count_groups(counts[narrow], groups[narrow], n)
+    # cumsum adds a row's terms one by one, as shannon_entropy() does
+    terms = counts * _log2_array(counts)
+    ends = np.cumsum(sizes)
+    starts = ends - sizes
+    wide_terms = np.array([np.cumsum(terms[starts[row]:ends[row]])[-1] for row in wide.tolist()])
+    wide_lengths = lengths[wide]
+    entropy[wide] = np.maximum(0.0, _log2_array(wide_lengths) - wide_terms / wide_lengths)
+    return entropy
+
+
+def _dense_code_entropies(codes: np.ndarray, row_ids: np.ndarray, lengths: np.ndarray) -> np.ndarray:
+    n = len(lengths)
+    entropy = np.zeros(n)
+    n_codes = int(codes.max()) + 1
+    rows_per_pass = max(1, _MAX_BATCH_CELLS // n_codes)
+    bounds = np.concatenate(([0], np.cumsum(lengths)))
+    for first in range(0, n, rows_per_pass):
+        last = min(n, first + rows_per_pass)
+        span = slice(bounds[first], bounds[last])
+        block_key = (row_ids[span] - first) * n_codes + codes[span]
+        counts = np.bincount(block_key, minlength=(last - first) * n_codes).reshape(last - first, n_codes)
+        present = counts.any(axis=0)
+
+        block_lengths = lengths[first:last]
+        # Counts never exceed the row length, so small rows read the table directly
+        log2 = (lambda c: _LOG2_ARRAY[c]) if block_lengths.max() < LOG2_TABLE_SIZE else _log2_array
+        terms = np.zeros(last - first)
+        for column in counts.T[present]:
+            terms += column * log2(column)
+        distinct = np.count_nonzero(counts, axis=1)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            block = _log2_array(block_lengths) - terms / block_lengths
+        entropy[first:last] = np.where(distinct > 1, np.maximum(block, 0.0), 0.0)
+    return entropy
+
+
+def shannon_entropy_batch(texts: Sequence[str]) -> np.ndarray:
+    """shannon_entropy() of every string, as a float64 array."""
+    texts = list(texts)
+    long_rows = [i for i, text in enumerate(texts) if len(text) >= LONG_TEXT_CHARS]
+    if not long_rows:
+        return code_point_entropies(*char_codes(texts))
+    entropy = np.empty(len(texts))
+    entropy[long_rows] = [shannon_entropy(texts[i]) for i in long_rows]
+    short_rows = sorted(set(range(len(texts))).difference(long_rows))
+    entropy[short_rows] = code_point_entropies(*char_codes([texts[i] for i in short_rows]))
+    return entropy
@@ -16,29 +16,54 @@ Features:
 
 from __future__ import annotations
 
-import math
 import re
 from collections import Counter
-from typing import Dict, List
+from typing import Dict, List, Optional, Sequence, Union
 
 import numpy as np
 import pandas as pd
 
+from src.entropy import (
+    char_codes,
+    char_entropy,
+    code_point_entropies,
+    shannon_entropy,
+    shannon_entropy_batch,
+)
+from src.pattern_matcher import MultiPatternMatcher, RULE_PATTERNS, scan_rules
+from src.request_parser import ParsedRequest
+
 SPECIAL_CHARS = set("'\";<>=%(")
 
 SQL_KEYWORDS = ["SELECT", "DROP", "UNION", "INSERT", "DELETE", "UPDATE", "OR", "AND", "EXEC", "EXECUTE"]
 
-SCRIPT_PATTERNS = [
-    r"<script",
-    r"</script",
-    r"onerror",
-    r"onload",
-    r"javascript:",
-    r"eval\(",
-    r"alert\(",
-    r"document\.",
-    r"window\.",
-]
+# Literal substrings, matched together by a MultiPatternMatcher
+SCRIPT_PATTERNS = RULE_PATTERNS["script"]
+_SCRIPT_MATCHER = MultiPatternMatcher({"script": SCRIPT_PATTERNS})
+
+
+def _keyword_regex(keywords: List[str], separator: Optional[str] = None) -> "re.Pattern":
+    """`\\b(KW|...)\\b`, with the leading boundary checked after the first letter.
+
+    `(?<!\\w.)` right after the first letter is the same test as a `\\b`
+    before it, but alternatives that start with a literal let the regex
+    engine skip straight to candidate first letters. A `separator` is
+    matched as one more alternative (see MultiPatternMatcher).
+    """
+    by_first: Dict[str, List[str]] = {}
+    for keyword in keywords:
+        by_first.setdefault(keyword[0], []).append(keyword[1:])
+    branches = [re.escape(separator)] if separator is not None else []
+    branches += [
+        re.escape(first) + r"(?<!\w.)(?:"
+        + "|".join(sorted(map(re.escape, rests), key=len, reverse=True)) + r")\b"
+        for first, rests in sorted(by_first.items())
+    ]
+    return re.compile("(" + "|".join(branches) + ")")
+
+
+# Each match is a whole word, so one findall sees every keyword present
+_SQL_KEYWORD_RE = _keyword_regex(SQL_KEYWORDS)
 
 
 # Matches standard UUID/GUID: 8-4-4-4-12 hex chars (case-insensitive)
@@ -60,21 +85,12 @@ def _strip_uuids(s: str) -> str:
 
 
 def compute_shannon_entropy(s: str) -> float:
-    """Compute the Shannon entropy of a string.
+    """Compute the Shannon entropy of a string (see src.entropy).
     
     Higher entropy → more randomness / unpredictability,
     which may indicate obfuscated or encoded payloads.
     """
-    if not s:
-        return 0.0
-    counts = Counter(s)
-    length = len(s)
-    entropy = 0.0
-    for count in counts.values():
-        p = count / length
-        if p > 0:
-            entropy -= p * math.log2(p)
-    return entropy
+    return shannon_entropy(s)
 
 
 def count_special_chars(s: str) -> int:
@@ -82,50 +98,64 @@ def count_special_chars(s: str) -> int:
     return sum(1 for c in s if c in SPECIAL_CHARS)
 
 
-def compute_sql_keyword_score(s: str) -> int:
+def special_chars_from_counts(counts: Counter) -> int:
+    """count_special_chars() from a precomputed character histogram."""
+    return sum(counts[c] for c in SPECIAL_CHARS if c in counts)
+
+
+def compute_sql_keyword_score(s: str, upper: Optional[str] = None) -> int:
     """Score the presence of SQL keywords in the request string.
     
     Each distinct SQL keyword found adds 1 to the score.
-    Case-insensitive matching.
+    Case-insensitive matching (pass `upper` if s.upper() is already known).
     """
-    upper = s.upper()
-    score = 0
-    for keyword in SQL_KEYWORDS:
-        if re.search(r'\b' + keyword + r'\b', upper):
-            score += 1
-    return score
+    if upper is None:
+        upper = s.upper()
+    return len(set(_SQL_KEYWORD_RE.findall(upper)))
 
 
-def compute_script_tag_score(s: str) -> int:
+def compute_script_tag_score(s: str, lower: Optional[str] = None) -> int:
     """Score the presence of XSS / script injection patterns.
     
     Each distinct pattern found adds 1 to the score.
-    Case-insensitive matching.
+    Case-insensitive matching (pass `lower` if s.lower() is already known).
     """
-    lower = s.lower()
-    score = 0
-    for pattern in SCRIPT_PATTERNS:
-        if re.search(pattern, lower):
-            score += 1
-    return score
+    if lower is None:
+        lower = s.lower()
+    return len(_SCRIPT_MATCHER.scan(lower)["script"])
 
 
-def extract_features(request: str) -> Dict[str, float]:
-    """Extract the full feature vector from a single raw HTTP request string.
+def extract_features(request: Union[str, ParsedRequest]) -> Dict[str, float]:
+    """Extract the full feature vector from a single raw HTTP request.
+
+    Accepts the raw string or a ParsedRequest (whose cached views are reused).
     
     Returns a dict with keys:
         request_length, url_depth, param_count, special_char_count,
         shannon_entropy, sql_keyword_score, script_tag_score
     """
-    return {
-        "request_length": float(len(request)),
-        "url_depth": float(request.count("/")),
-        "param_count": float(request.count("=")),
-        "special_char_count": float(count_special_chars(request)),
-        "shannon_entropy": compute_shannon_entropy(_strip_uuids(request)),
-        "sql_keyword_score": float(compute_sql_keyword_score(request)),
-        "script_tag_score": float(compute_script_tag_score(request)),
+    parsed = ParsedRequest.of(request)
+    cached = parsed.derived.get("features")
+    if cached is not None:
+        return dict(cached)
+    raw = parsed.raw
+    counts = parsed.char_counts
+    stripped = _strip_uuids(raw)
+    entropy = (
+        char_entropy(counts, len(raw)) if len(stripped) == len(raw)
+        else compute_shannon_entropy(stripped)
+    )
+    features = {
+        "request_length": float(len(raw)),
+        "url_depth": float(counts["/"]),
+        "param_count": float(counts["="]),
+        "special_char_count": float(special_chars_from_counts(counts)),
+        "shannon_entropy": entropy,
+        "sql_keyword_score": float(compute_sql_keyword_score(raw, parsed.upper_text)),
+        "script_tag_score": float(len(scan_rules(parsed)["script"])),
     }
+    parsed.derived["features"] = features
+    return dict(features)
 
 
 def extract_features_batch(requests: List[str]) -> pd.DataFrame:
@@ -133,8 +163,7 @@ def extract_features_batch(requests: List[str]) -> pd.DataFrame:
     
     Returns a DataFrame where each row is a feature vector.
     """
-    rows = [extract_features(r) for r in requests]
-    return pd.DataFrame(rows)
+    return pd.DataFrame(extract_features_matrix(requests), columns=FEATURE_COLUMNS)
 
 FEATURE_COLUMNS = [
     "request_length",
@@ -145,3 +174,156 @@ FEATURE_COLUMNS = [
     "sql_keyword_score",
     "script_tag_score",
 ]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Column-wise batch extraction
+# ─────────────────────────────────────────────────────────────────────────────
+
+# Rows per block: bounds the per-block (rows × distinct chars) histograms
+MATRIX_CHUNK_ROWS = 16384
+
+_SPECIAL_CODES = np.array(sorted(ord(c) for c in SPECIAL_CHARS), dtype=np.uint32)
+# Byte → is a SPECIAL_CHARS character (ASCII blocks)
+_SPECIAL_TABLE = np.zeros(256, dtype=bool)
+_SPECIAL_TABLE[_SPECIAL_CODES] = True
+
+
+def _required_bigram(pattern: str) -> str:
+    """A character pair every match of `pattern` contains: the first pair with
+    a non-alphanumeric character (rarer in requests), else the first pair."""
+    pairs = [pattern[i:i + 2] for i in range(len(pattern) - 1)]
+    return next((pair for pair in pairs if not pair.isalnum()), pairs[0])
+
+
+# Byte pair (big-endian uint16) → some script pattern requires it. An ASCII
+# row containing none of them cannot score, so it skips the script pass.
+_SCRIPT_BIGRAMS = np.zeros(1 << 16, dtype=bool)
+for _pattern in SCRIPT_PATTERNS:
+    _pair = _required_bigram(_pattern).encode("ascii")
+    _SCRIPT_BIGRAMS[_pair[0] << 8 | _pair[1]] = True
+
+# Likewise the first two letters of each SQL keyword, at the start of a word
+_KEYWORD_BIGRAMS = np.zeros(1 << 16, dtype=bool)
+for _keyword in SQL_KEYWORDS:
+    _KEYWORD_BIGRAMS[ord(_keyword[0]) << 8 | ord(_keyword[1])] = True
+# Byte → is a \w character
+_WORD_BYTES = np.array([bool(re.match(r"\w", chr(b))) for b in range(256)])
+
+# Separates the rows of a block in one regex pass. It is not a word character
+# and no pattern contains it, so no match can span or change at a row
+# boundary; each pass also matches it, which is how hits are mapped to rows.
+# A block whose requests contain it is scored per row instead.
+_ROW_SEP = "\x00"
+_KEYWORD_ROWS_RE = _keyword_regex(SQL_KEYWORDS, separator=_ROW_SEP)
+_SCRIPT_ROWS_MATCHER = MultiPatternMatcher({"script": SCRIPT_PATTERNS}, separator=_ROW_SEP)
+
+
+def extract_features_matrix(requests: Sequence[str], chunk_rows: int = MATRIX_CHUNK_ROWS) -> np.ndarray:
+    """FEATURE_COLUMNS matrix for a column of raw requests.
+
+    Returns a C-contiguous float64 array of shape (len(requests), 7),
+    bit-identical to stacking extract_features() rows. Each block of rows
+    is processed column-wise: character counts and entropy come from one
+    code-point array of the block, and the keyword / script patterns from
+    regex passes over the whole joined block.
+    """
+    requests = list(requests)
+    out = np.empty((len(requests), len(FEATURE_COLUMNS)), dtype=np.float64)
+    for start in range(0, len(requests), chunk_rows):
+        block = requests[start:start + chunk_rows]
+        _fill_feature_block(block, out[start:start + len(block)])
+    return out
+
+
+def _fill_feature_block(requests: List[str], out: np.ndarray) -> None:
+    n = len(requests)
+    codes, row_ids, lengths = char_codes(requests)
+
+    out[:, 0] = lengths
+    out[:, 1] = np.bincount(row_ids[codes == ord("/")], minlength=n)
+    out[:, 2] = np.bincount(row_ids[codes == ord("=")], minlength=n)
+    special = _SPECIAL_TABLE[codes] if codes.dtype == np.uint8 else np.isin(codes, _SPECIAL_CODES)
+    out[:, 3] = np.bincount(row_ids[special], minlength=n)
+    out[:, 4] = code_point_entropies(codes, row_ids, lengths)
+
+    # UUIDs are stripped before entropy scoring (see _strip_uuids)
+    rows = _uuid_candidate_rows(codes, row_ids)
+    stripped = [_strip_uuids(requests[row]) for row in rows]
+    changed = [i for i, text in enumerate(stripped) if len(text) != lengths[rows[i]]]
+    if changed:
+        out[[rows[i] for i in changed], 4] = shannon_entropy_batch([stripped[i] for i in changed])
+
+    if (codes == ord(_ROW_SEP)).any():
+        out[:, 5] = [compute_sql_keyword_score(r) for r in requests]
+        out[:, 6] = [compute_script_tag_score(r) for r in requests]
+        return
+    # On ASCII blocks only rows holding a required byte pair are scanned
+    joined = _ROW_SEP.join(requests)
+    upper, lower = joined.upper(), joined.lower()
+    keyword_rows = script_rows = np.arange(n)
+    if codes.dtype == np.uint8:
+        keyword_rows = _rows_with_bigrams(upper.encode("ascii"), lengths, _KEYWORD_BIGRAMS, word_start=True)
+        upper = _ROW_SEP.join(requests[row] for row in keyword_rows).upper()
+        script_rows = _rows_with_bigrams(lower.encode("ascii"), lengths, _SCRIPT_BIGRAMS)
+        lower = _ROW_SEP.join(requests[row] for row in script_rows).lower()
+
+    out[:, 5:7] = 0.0
+    out[keyword_rows, 5] = _distinct_hits_per_row(
+        [_KEYWORD_ROWS_RE.findall(upper)], len(keyword_rows), lambda kw: (kw,),
+    )
+    out[script_rows, 6] = _distinct_hits_per_row(
+        _SCRIPT_ROWS_MATCHER.findall(lower), len(script_rows),
+        lambda longest: [pattern for _, pattern in _SCRIPT_ROWS_MATCHER.implied(longest)],
+    )
+
+
+def _rows_with_bigrams(joined: bytes, lengths: np.ndarray, table: np.ndarray, word_start: bool = False) -> np.ndarray:
+    """Rows of a _ROW_SEP-joined ASCII block containing a byte pair marked in
+    `table` (with `word_start`, only a pair that does not follow a \\w byte)."""
+    if len(joined) < 2:
+        return np.zeros(0, dtype=np.int64)
+    # Pair i is the big-endian uint16 at offset i: even offsets, then odd ones
+    pairs = np.empty(len(joined) - 1, dtype=np.uint16)
+    pairs[0::2] = np.frombuffer(joined, dtype=">u2", count=len(pairs[0::2]))
+    pairs[1::2] = np.frombuffer(joined, dtype=">u2", count=len(pairs[1::2]), offset=1)
+    hits = table[pairs]
+    if word_start:
+        # The separator before each row is not a word byte either
+        hits[1:] &= ~_WORD_BYTES[np.frombuffer(joined, dtype=np.uint8, count=len(pairs) - 1)]
+    starts = np.cumsum(lengths + 1) - (lengths + 1)
+    # A pair straddling a separator only adds a candidate, never hides one
+    return np.unique(np.searchsorted(starts, np.flatnonzero(hits), side="right") - 1)
+
+
+def _uuid_candidate_rows(codes: np.ndarray, row_ids: np.ndarray) -> List[int]:
+    """Rows that may contain a UUID (dashes 5, 10 and 15 chars apart)."""
+    if len(codes) < 36:
+        return []
+    dash = codes == ord("-")
+    span = len(codes) - 15
+    hits = dash[:span] & dash[5:span + 5] & dash[10:span + 10] & dash[15:span + 15]
+    return np.unique(row_ids[:span][hits]).tolist()
+
+
+def _distinct_hits_per_row(passes: List[List[str]], n: int, implied) -> np.ndarray:
+    """Distinct patterns per row from findall() passes over a _ROW_SEP-joined block.
+
+    Every pass reports each row separator; any other token is a match
+    standing for the patterns in implied(token).
+    """
+    columns: Dict[str, int] = {}
+    hits = []
+    for tokens in passes:
+        vocabulary = {token: i for i, token in enumerate(set(tokens))}
+        ids = np.fromiter(map(vocabulary.__getitem__, tokens), dtype=np.int64, count=len(tokens))
+        rows = np.cumsum(ids == vocabulary.get(_ROW_SEP, -1))
+        for token, token_id in vocabulary.items():
+            if token != _ROW_SEP:
+                token_rows = rows[ids == token_id]
+                hits.extend((token_rows, columns.setdefault(p, len(columns))) for p in implied(token))
+
+    found = np.zeros((n, len(columns)), dtype=bool)
+    for token_rows, column in hits:
+        found[token_rows, column] = True
+    return found.sum(axis=1)
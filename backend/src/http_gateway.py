@@ -0,0 +1,173 @@
+"""
+CyHub — Outbound HTTP Gateway
+
+One pooled httpx client per remote host, shared by every outbound call in
+the backend (base model / Models 1–4 on HuggingFace Spaces, blocklist feeds).
+Connections are kept alive between requests, so /analyze no longer pays a
+fresh TCP + TLS handshake per remote model call.
+
+  per-host pools   each host gets its own AsyncClient and connection limits,
+                   so a slow blocklist download can't starve model calls
+  HTTP/2           negotiated when the `h2` package is installed (HTTP2=auto)
+  warm-up          warm_up() opens a connection to every configured model
+                   host at startup
+  saturation       in-flight requests per host are tracked and exported as
+                   cyhub_http_pool_in_flight / cyhub_http_pool_saturation
+
+Environment:
+  HTTP_MAX_CONNECTIONS       per host (default 20)
+  HTTP_MAX_KEEPALIVE         idle connections kept per host (default 10)
+  HTTP_KEEPALIVE_EXPIRY      seconds an idle connection is kept (default 60)
+  HTTP_CONNECT_TIMEOUT       default 5.0
+  HTTP_TIMEOUT               default read/write timeout (default 10.0)
+  HTTP2                      auto | true | false (default auto)
+"""
+
+from __future__ import annotations
+
+import asyncio
+import importlib.util
+import logging
+import os
+from typing import Any, Dict, Iterable, Optional
+from urllib.parse import urlsplit
+
+import httpx
+
+from src import metrics
+
+logger = logging.getLogger(__name__)
+
+_IN_FLIGHT = metrics.gauge(
+    "cyhub_http_pool_in_flight", "Outbound requests currently in flight per host", ["host"]
+)
+_SATURATION = metrics.gauge(
+    "cyhub_http_pool_saturation", "In-flight requests / max connections per host", ["host"]
+)
+_OUTBOUND = metrics.counter(
+    "cyhub_http_outbound_requests_total", "Outbound requests per host and outcome", ["host", "outcome"]
+)
+
+
+def _http2_enabled() -> bool:
+    setting = os.getenv("HTTP2", "auto").strip().lower()
+    if setting in ("0", "false", "no"):
+        return False
+    available = importlib.util.find_spec("h2") is not None
+    if setting in ("1", "true", "yes") and not available:
+        logger.warning("HTTP2=true but the 'h2' package is not installed — using HTTP/1.1")
+    return available
+
+
+class _HostPool:
+    """AsyncClient for one origin plus its in-flight counter."""
+
+    def __init__(self, origin: str, limits: httpx.Limits, timeout: httpx.Timeout, http2: bool):
+        self.origin = origin
+        self.max_connections = limits.max_connections or 0
+        self.in_flight = 0
+        self.client = httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+        _IN_FLIGHT.set_function(lambda: self.in_flight, origin)
+        _SATURATION.set_function(
+            lambda: self.in_flight / self.max_connections if self.max_connections else 0.0, origin
+        )
+
+    def saturation(self) -> float:
+        return self.in_flight / self.max_connections if self.max_connections else 0.0
+
+
+class HttpGateway:
+    """Per-host pooled clients shared by all outbound calls."""
+
+    def __init__(self) -> None:
+        self.limits = httpx.Limits(
+            max_connections=int(os.getenv("HTTP_MAX_CONNECTIONS", "20")),
+            max_keepalive_connections=int(os.getenv("HTTP_MAX_KEEPALIVE", "10")),
+            keepalive_expiry=float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60")),
+        )
+        self.timeout = httpx.Timeout(
+            float(os.getenv("HTTP_TIMEOUT", "10.0")),
+            connect=float(os.getenv("HTTP_CONNECT_TIMEOUT", "5.0")),
+        )
+        self.http2 = _http2_enabled()
+        self._pools: Dict[str, _HostPool] = {}
+
+    @staticmethod
+    def _origin(url: str) -> str:
+        parts = urlsplit(url)
+        return f"{parts.scheme}://{parts.netloc}"
+
+    def _pool(self, url: str) -> _HostPool:
+        origin = self._origin(url)
+        pool = self._pools.get(origin)
+        if pool is None or pool.client.is_closed:
+            pool = _HostPool(origin, self.limits, self.timeout, self.http2)
+            self._pools[origin] = pool
+        return pool
+
+    def client_for(self, url: str) -> httpx.AsyncClient:
+        """Pooled client for the URL's host (for streaming or custom calls)."""
+        return self._pool(url).client
+
+    async def request(self, method: str, url: str, **kwargs: Any) -> httpx.Response:
+        pool = self._pool(url)
+        pool.in_flight += 1
+        try:
+            response = await pool.client.request(method, url, **kwargs)
+        except Exception:
+            _OUTBOUND.labels(pool.origin, "error").inc()
+            raise
+        finally:
+            pool.in_flight -= 1
+        _OUTBOUND.labels(pool.origin, str(response.status_code)).inc()
+        return response
+
+    async def get(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("GET", url, **kwargs)
+
+    async def post(self, url: str, **kwargs: Any) -> httpx.Response:
+        return await self.request("POST", url, **kwargs)
+
+    async def warm_up(self, urls: Iterable[str], timeout: float = 5.0) -> None:
+        """Open a pooled connection to each host (errors are logged, not raised)."""
+        origins = {self._origin(u) for u in urls if u}
+
+        async def _touch(origin: str) -> None:
+            try:
+                await self.request("HEAD", origin + "/", timeout=timeout)
+            except Exception as e:
+                logger.info("HTTP warm-up for %s failed: %s", origin, e)
+
+        await asyncio.gather(*[_touch(o) for o in origins])
+        logger.info("HTTP gateway warmed %d host(s) (http2=%s)", len(origins), self.http2)
+
+    def pool_stats(self) -> Dict[str, Dict[str, float]]:
+        return {
+            origin: {"in_flight": pool.in_flight, "saturation": round(pool.saturation(), 3)}
+            for origin, pool in self._pools.items()
+        }
+
+    async def aclose(self) -> None:
+        for pool in self._pools.values():
+            if not pool.client.is_closed:
+                await pool.client.aclose()
+        self._pools.clear()
+
+
+_gateway: Optional[HttpGateway] = None
+
+
+def get_gateway() -> HttpGateway:
+    """Get or create the process-wide HTTP gateway."""
+    global _gateway
+    if _gateway is None:
+        _gateway = HttpGateway()
+    return _gateway
+
+
+async def close_gateway() -> None:
+    """Close every pooled client on shutdown."""
+    global _gateway
+    if _gateway is not None:
+        await _gateway.aclose()
+        _gateway = None
@@ -0,0 +1,147 @@
+"""
+CyHub — Local Inference Engine
+
+In-process backend for Models 1–3 so scoring keeps working when the
+HuggingFace Spaces are slow or unreachable.
+
+Artifacts are joblib pipelines with the same layout as isolation_forest.pkl
+({"model", "scaler", "feature_columns", ...}) and are produced by the
+per-model training scripts:
+
+  models/model1_payload.pkl   ← python src/train_model1.py   (11 payload features)
+  models/model2_bot.pkl       ← python src/train_model2.py   (14 flow features)
+  models/model3_traffic.pkl   ← python src/train_model3.py   (35 traffic features)
+
+Backend selection is per model (MODEL1_BACKEND / MODEL2_BACKEND / MODEL3_BACKEND):
+  remote  HuggingFace Space only (default — previous behaviour)
+  local   in-process artifact only
+  auto    local artifact when present, HuggingFace Space otherwise
+
+Scoring runs on a small worker pool (LOCAL_INFERENCE_POOL=thread|process) so
+sklearn calls never execute on the event loop thread.
+"""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Dict, Optional, Tuple
+
+import joblib
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+LOCAL_MODEL_PATHS: Dict[str, str] = {
+    "model1": os.getenv("MODEL1_LOCAL_PATH", "models/model1_payload.pkl"),
+    "model2": os.getenv("MODEL2_LOCAL_PATH", "models/model2_bot.pkl"),
+    "model3": os.getenv("MODEL3_LOCAL_PATH", "models/model3_traffic.pkl"),
+}
+
+_BACKENDS = ("remote", "local", "auto")
+
+# Loaded pipelines for the current process. In thread mode this is filled by
+# the engine itself; in process mode each worker fills its own copy via
+# _init_worker so models are unpickled once per worker, not per call.
+_LOADED: Dict[str, Dict[str, Any]] = {}
+
+
+def _load_pipelines(paths: Dict[str, str]) -> None:
+    for key, path in paths.items():
+        _LOADED[key] = joblib.load(path)
+
+
+def _init_worker(paths: Dict[str, str]) -> None:
+    """ProcessPoolExecutor initializer — load artifacts inside the worker."""
+    _load_pipelines(paths)
+
+
+def _score(key: str, X: np.ndarray) -> Tuple[bool, float]:
+    """Score one feature row with a loaded pipeline (runs inside the pool)."""
+    pipeline = _LOADED[key]
+    if pipeline.get("scaler") is not None:
+        X = pipeline["scaler"].transform(X)
+    model = pipeline["model"]
+    positive_class = pipeline.get("positive_class", 1)
+    classes = list(model.classes_)
+    if positive_class not in classes:
+        return False, 0.0
+    probability = float(model.predict_proba(X)[0][classes.index(positive_class)])
+    threshold = float(pipeline.get("threshold", 0.5))
+    return probability >= threshold, round(probability, 4)
+
+
+def configured_backend(key: str) -> str:
+    """Return the configured backend ('remote' | 'local' | 'auto') for a model key."""
+    backend = os.getenv(f"{key.upper()}_BACKEND", "remote").strip().lower()
+    if backend not in _BACKENDS:
+        logger.warning(f"Unknown {key.upper()}_BACKEND '{backend}' — using 'remote'")
+        return "remote"
+    return backend
+
+
+class LocalInferenceEngine:
+    """Loads local Model 1–3 artifacts and scores them on a worker pool."""
+
+    def __init__(
+        self,
+        paths: Optional[Dict[str, str]] = None,
+        pool_kind: Optional[str] = None,
+        workers: Optional[int] = None,
+    ):
+        candidate_paths = dict(paths if paths is not None else LOCAL_MODEL_PATHS)
+        self._paths = {k: p for k, p in candidate_paths.items() if p and os.path.exists(p)}
+        self._pool_kind = (pool_kind or os.getenv("LOCAL_INFERENCE_POOL", "thread")).strip().lower()
+        self._workers = workers or int(os.getenv("LOCAL_INFERENCE_WORKERS", "2"))
+        self._executor: Optional[Executor] = None
+
+        if not self._paths:
+            return
+
+        if self._pool_kind == "process":
+            self._executor = ProcessPoolExecutor(
+                max_workers=self._workers,
+                initializer=_init_worker,
+                initargs=(self._paths,),
+            )
+        else:
+            _load_pipelines(self._paths)
+            self._executor = ThreadPoolExecutor(
+                max_workers=self._workers,
+                thread_name_prefix="local-inference",
+            )
+        logger.info(
+            f"Local inference ready for {sorted(self._paths)} "
+            f"({self._pool_kind} pool, {self._workers} workers)"
+        )
+
+    def available(self, key: str) -> bool:
+        return key in self._paths and self._executor is not None
+
+    def resolve_backend(self, key: str) -> str:
+        """Resolve the configured backend to the one that will actually serve `key`."""
+        backend = configured_backend(key)
+        if backend == "remote":
+            return "remote"
+        if self.available(key):
+            return "local"
+        if backend == "local":
+            logger.warning(
+                f"{key.upper()}_BACKEND=local but no artifact at "
+                f"{LOCAL_MODEL_PATHS.get(key)} — falling back to HuggingFace"
+            )
+        return "remote"
+
+    async def predict(self, key: str, X: np.ndarray) -> Tuple[bool, float]:
+        """Return (is_positive, probability) for a single (1, n_features) row."""
+        if not self.available(key):
+            raise RuntimeError(f"No local artifact loaded for {key}")
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._executor, _score, key, X)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
@@ -0,0 +1,208 @@
+"""
+CyHub — Logging Configuration
+
+Structured, leveled logging for the backend. Hot paths (/analyze, the model
+router, bot feature building) log through `logging` instead of print(), so
+under load the request path only pays for an enqueue:
+
+  QueueHandler  records go onto a bounded in-memory queue; when it is full
+                the record is dropped and counted instead of blocking
+  QueueListener a background thread formats and writes to stderr
+
+Two filters keep debug output affordable when it is switched on:
+
+  sampling      only LOG_DEBUG_SAMPLE_RATE of DEBUG records are kept
+  rate limit    each call site (logger + line) emits at most
+                LOG_RATE_LIMIT records per LOG_RATE_WINDOW seconds; the
+                next record after a quiet window reports how many were
+                suppressed. Only records at or below LOG_RATE_LIMIT_LEVEL
+                (DEBUG by default) are limited, so INFO messages such as
+                blocklist loads always get through
+
+Structured fields go in `extra=`; LOG_FORMAT=json renders them as keys.
+
+Environment:
+  LOG_LEVEL               root level (default INFO)
+  LOG_LEVELS              per-module overrides, e.g.
+                          "src.multi_predict=DEBUG,src.bot_feature_builder=WARNING"
+  LOG_FORMAT              text | json (default text)
+  LOG_QUEUE_SIZE          default 10000
+  LOG_DEBUG_SAMPLE_RATE   0.0–1.0 (default 1.0)
+  LOG_RATE_LIMIT          records per call site per window (default 20, 0 = off)
+  LOG_RATE_WINDOW         seconds (default 10)
+  LOG_RATE_LIMIT_LEVEL    highest level rate-limited (default DEBUG)
+"""
+
+from __future__ import annotations
+
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+from typing import Dict, Optional, Tuple
+
+# Attributes every LogRecord has — anything else came from `extra=`
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "asctime"}
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """QueueHandler over a bounded queue that drops (and counts) on overflow."""
+
+    def __init__(self, log_queue: "queue.Queue[logging.LogRecord]"):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+class SamplingFilter(logging.Filter):
+    """Keep a random fraction of DEBUG records; other levels always pass."""
+
+    def __init__(self, rate: float):
+        super().__init__()
+        self.rate = max(0.0, min(1.0, rate))
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+
+class RateLimitFilter(logging.Filter):
+    """Cap records per call site per window; records above `max_level` are never limited."""
+
+    def __init__(self, limit: int, window: float, max_level: int = logging.DEBUG):
+        super().__init__()
+        self.limit = limit
+        self.window = window
+        self.max_level = max_level
+        self._sites: Dict[Tuple[str, int], list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if self.limit <= 0 or record.levelno > self.max_level:
+            return True
+        key = (record.name, record.lineno)
+        now = time.monotonic()
+        with self._lock:
+            state = self._sites.get(key)
+            if state is None or now - state[0] >= self.window:
+                suppressed = state[2] if state else 0
+                self._sites[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+            if state[1] < self.limit:
+                state[1] += 1
+                return True
+            state[2] += 1
+            return False
+
+
+class TextFormatter(logging.Formatter):
+    """`time LEVEL logger: message key=value ...`"""
+
+    def __init__(self) -> None:
+        super().__init__("%(asctime)s %(levelname)-7s %(name)s: %(message)s")
+
+    def format(self, record: logging.LogRecord) -> str:
+        line = super().format(record)
+        extras = {k: v for k, v in vars(record).items() if k not in _RESERVED_ATTRS}
+        if extras:
+            line += " " + " ".join(f"{k}={v}" for k, v in extras.items())
+        return line
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line, with `extra=` fields as top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": round(record.created, 3),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        for key, value in vars(record).items():
+            if key not in _RESERVED_ATTRS:
+                payload[key] = value
+        if record.exc_info:
+            payload["exc"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+# httpx logs every outbound HF call at INFO — keep it quiet unless overridden
+_DEFAULT_LEVELS = {"httpx": logging.WARNING, "httpcore": logging.WARNING}
+
+_handler: Optional[NonBlockingQueueHandler] = None
+_listener: Optional[QueueListener] = None
+
+
+def _parse_levels(spec: str) -> Dict[str, int]:
+    levels = {}
+    for item in spec.split(","):
+        name, _, level = item.partition("=")
+        if name.strip() and level.strip():
+            levels[name.strip()] = logging.getLevelName(level.strip().upper())
+    return levels
+
+
+def configure_logging() -> None:
+    """Install the queue handler on the root logger (idempotent)."""
+    global _handler, _listener
+    if _handler is not None:
+        return
+
+    root = logging.getLogger()
+    root.setLevel(os.getenv("LOG_LEVEL", "INFO").strip().upper())
+    levels = dict(_DEFAULT_LEVELS)
+    levels.update(_parse_levels(os.getenv("LOG_LEVELS", "")))
+    for name, level in levels.items():
+        if isinstance(level, int):
+            logging.getLogger(name).setLevel(level)
+
+    stream = logging.StreamHandler(sys.stderr)
+    stream.setFormatter(
+        JsonFormatter() if os.getenv("LOG_FORMAT", "text").strip().lower() == "json" else TextFormatter()
+    )
+
+    log_queue: "queue.Queue[logging.LogRecord]" = queue.Queue(int(os.getenv("LOG_QUEUE_SIZE", "10000")))
+    _handler = NonBlockingQueueHandler(log_queue)
+    _handler.addFilter(SamplingFilter(float(os.getenv("LOG_DEBUG_SAMPLE_RATE", "1.0"))))
+    rate_limit_level = logging.getLevelName(os.getenv("LOG_RATE_LIMIT_LEVEL", "DEBUG").strip().upper())
+    _handler.addFilter(RateLimitFilter(
+        int(os.getenv("LOG_RATE_LIMIT", "20")),
+        float(os.getenv("LOG_RATE_WINDOW", "10")),
+        rate_limit_level if isinstance(rate_limit_level, int) else logging.DEBUG,
+    ))
+    root.addHandler(_handler)
+
+    _listener = QueueListener(log_queue, stream, respect_handler_level=True)
+    _listener.start()
+
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the listener thread."""
+    global _handler, _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    if _handler is not None:
+        logging.getLogger().removeHandler(_handler)
+        _handler = None
+
+
+def log_queue_stats() -> Dict[str, int]:
+    """Current queue depth and dropped-record count (for /health and metrics)."""
+    if _handler is None:
+        return {"depth": 0, "dropped": 0}
+    return {"depth": _handler.queue.qsize(), "dropped": _handler.dropped}
@@ -0,0 +1,294 @@
+"""
+CyHub — Metrics Registry
+
+In-process counters, gauges and fixed-bucket histograms, rendered at
+/metrics in the Prometheus text exposition format (0.0.4).
+
+Increments are lock-free: every metric keeps one cell per thread, and only
+the owning thread ever writes to its cell, so the hot path is a dict lookup
+plus an in-place add with no lock and no lost updates. A scrape sums the
+cells (a scrape racing an increment may miss that one increment, which is
+fine for monitoring).
+
+Gauges can either be set directly or bound to a callback that is evaluated
+at scrape time — used for structure sizes and queue depths so nothing has to
+be updated on the request path. A counter can be bound to a callback too,
+for a running total that another component already keeps.
+
+Usage:
+    REQUESTS = counter("cyhub_http_requests_total", "HTTP requests", ["endpoint"])
+    REQUESTS.labels("/analyze").inc()
+    LATENCY = histogram("cyhub_http_request_duration_seconds", "Latency", ["endpoint"])
+    LATENCY.labels("/analyze").observe(0.042)
+    gauge("cyhub_request_logs", "Stored log entries", fn=lambda: len(request_logs))
+"""
+
+from __future__ import annotations
+
+import threading
+from bisect import bisect_left
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+# Default latency buckets in seconds (+Inf implied)
+DEFAULT_BUCKETS = (
+    0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+    0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class _ThreadCells:
+    """One float list per thread; each list is written only by its owner."""
+
+    __slots__ = ("_size", "_cells")
+
+    def __init__(self, size: int):
+        self._size = size
+        self._cells: Dict[int, List[float]] = {}
+
+    def local(self) -> List[float]:
+        ident = threading.get_ident()
+        cell = self._cells.get(ident)
+        if cell is None:
+            # dict.setdefault is atomic under the GIL
+            cell = self._cells.setdefault(ident, [0.0] * self._size)
+        return cell
+
+    def total(self) -> List[float]:
+        result = [0.0] * self._size
+        for cell in list(self._cells.values()):
+            for i, value in enumerate(cell):
+                result[i] += value
+        return result
+
+
+class _CounterChild:
+    __slots__ = ("_cells",)
+
+    def __init__(self) -> None:
+        self._cells = _ThreadCells(1)
+
+    def inc(self, amount: float = 1.0) -> None:
+        self._cells.local()[0] += amount
+
+    def value(self) -> float:
+        return self._cells.total()[0]
+
+
+class _GaugeChild:
+    __slots__ = ("_value", "_fn")
+
+    def __init__(self, fn: Optional[Callable[[], float]] = None) -> None:
+        self._value = 0.0
+        self._fn = fn
+
+    def set(self, value: float) -> None:
+        self._value = float(value)
+
+    def value(self) -> float:
+        if self._fn is not None:
+            try:
+                return float(self._fn())
+            except Exception:
+                return float("nan")
+        return self._value
+
+
+class _HistogramChild:
+    __slots__ = ("_bounds", "_cells")
+
+    def __init__(self, bounds: Tuple[float, ...]) -> None:
+        self._bounds = bounds
+        # [bucket_0 .. bucket_n, +Inf bucket, sum]
+        self._cells = _ThreadCells(len(bounds) + 2)
+
+    def observe(self, value: float) -> None:
+        cell = self._cells.local()
+        cell[bisect_left(self._bounds, value)] += 1
+        cell[-1] += value
+
+    def totals(self) -> Tuple[List[float], float]:
+        cells = self._cells.total()
+        return cells[:-1], cells[-1]
+
+
+class _Metric:
+    kind = ""
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.help = help_text
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+
+    def _new_child(self) -> object:
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        key = tuple(str(v) for v in values)
+        child = self._children.get(key)
+        if child is None:
+            if len(key) != len(self.labelnames):
+                raise ValueError(f"{self.name} expects labels {self.labelnames}, got {key}")
+            child = self._children.setdefault(key, self._new_child())
+        return child
+
+    def _label_str(self, key: Tuple[str, ...], extra: str = "") -> str:
+        pairs = [
+            f'{name}="{_escape(value)}"' for name, value in zip(self.labelnames, key)
+        ]
+        if extra:
+            pairs.append(extra)
+        return "{" + ",".join(pairs) + "}" if pairs else ""
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} {self.kind}"]
+        for key, child in sorted(list(self._children.items())):
+            lines.extend(self._render_child(key, child))
+        return lines
+
+    def _render_child(self, key: Tuple[str, ...], child) -> List[str]:
+        return [f"{self.name}{self._label_str(key)} {_fmt(child.value())}"]
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labelnames)
+        if fn is not None:
+            # Read at scrape time; `fn` must only ever increase
+            self._children[()] = _GaugeChild(fn)
+
+    def _new_child(self) -> _CounterChild:
+        return _CounterChild()
+
+    def inc(self, amount: float = 1.0) -> None:
+        self.labels().inc(amount)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], float]] = None):
+        super().__init__(name, help_text, labelnames)
+        if fn is not None:
+            self._children[()] = _GaugeChild(fn)
+
+    def _new_child(self) -> _GaugeChild:
+        return _GaugeChild()
+
+    def set(self, value: float) -> None:
+        self.labels().set(value)
+
+    def set_function(self, fn: Callable[[], float], *label_values: str) -> None:
+        """Bind a label set to a callback evaluated at scrape time."""
+        self._children[tuple(str(v) for v in label_values)] = _GaugeChild(fn)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, help_text: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help_text, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self) -> _HistogramChild:
+        return _HistogramChild(self.buckets)
+
+    def observe(self, value: float) -> None:
+        self.labels().observe(value)
+
+    def _render_child(self, key: Tuple[str, ...], child: _HistogramChild) -> List[str]:
+        counts, total = child.totals()
+        lines = []
+        cumulative = 0.0
+        for bound, count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += count
+            le = 'le="+Inf"' if bound == float("inf") else f'le="{_fmt(bound)}"'
+            lines.append(f"{self.name}_bucket{self._label_str(key, le)} {_fmt(cumulative)}")
+        lines.append(f"{self.name}_sum{self._label_str(key)} {_fmt(total)}")
+        lines.append(f"{self.name}_count{self._label_str(key)} {_fmt(cumulative)}")
+        return lines
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value != value:
+        return "NaN"
+    if value in (float("inf"), float("-inf")):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class Registry:
+    """Named collection of metrics; registering an existing name returns it."""
+
+    def __init__(self) -> None:
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            return self._metrics.setdefault(metric.name, metric)
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in list(self._metrics.values()):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def counter(name: str, help_text: str, labelnames: Sequence[str] = (),
+            fn: Optional[Callable[[], float]] = None) -> Counter:
+    return REGISTRY.register(Counter(name, help_text, labelnames, fn))
+
+
+def gauge(name: str, help_text: str, labelnames: Sequence[str] = (),
+          fn: Optional[Callable[[], float]] = None) -> Gauge:
+    return REGISTRY.register(Gauge(name, help_text, labelnames, fn))
+
+
+def histogram(name: str, help_text: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, help_text, labelnames, buckets))
+
+
+def render_metrics() -> str:
+    return REGISTRY.render()
+
+
+# ── Shared metrics (used from more than one module) ────────────────────────
+
+MODEL_LATENCY = histogram(
+    "cyhub_model_request_duration_seconds",
+    "Remote model (HuggingFace Space) call latency",
+    ["model"],
+)
+MODEL_ERRORS = counter(
+    "cyhub_model_request_errors_total",
+    "Remote model calls that failed (timeout, HTTP error, bad response)",
+    ["model"],
+)
+CACHE_REQUESTS = counter(
+    "cyhub_cache_requests_total",
+    "Cache lookups by cache and result (hit / miss)",
+    ["cache", "result"],
+)
+DEADLINE_SKIPS = counter(
+    "cyhub_deadline_skipped_total",
+    "Model signals left out of fusion because the request latency budget expired",
+    ["model"],
+)
@@ -14,47 +14,13 @@ Features:
 
 from __future__ import annotations
 
-import math
 import logging
 from typing import List, Dict
 from urllib.parse import urlparse
 
-logger = logging.getLogger(__name__)
-
-
-def shannon_entropy(text: str) -> float:
-    """Calculate Shannon entropy of a string.
-
-    Measures randomness/disorder in the text (0-8 bits typically).
-    High entropy suggests encoded/obfuscated data.
-
-    Args:
-        text: String to analyze
+from src.entropy import shannon_entropy
 
-    Returns:
-        Entropy value in bits (0 = uniform, high = random)
-
-    Example:
-        shannon_entropy("aaaa") → 0.0 (no randomness)
-        shannon_entropy("abc") → 1.585 (high randomness)
-    """
-    if not text:
-        return 0.0
-
-    # Count character frequencies
-    char_counts = {}
-    for char in text:
-        char_counts[char] = char_counts.get(char, 0) + 1
-
-    # Calculate entropy: H = -Σ(p_i * log2(p_i))
-    entropy = 0.0
-    text_length = len(text)
-    for count in char_counts.values():
-        probability = count / text_length
-        if probability > 0:
-            entropy -= probability * math.log2(probability)
-
-    return entropy
+logger = logging.getLogger(__name__)
 
 
 def count_parameters(url: str) -> int:
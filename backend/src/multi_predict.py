@@ -7,6 +7,9 @@ Context-aware threat detection pipeline with a model router:
   Model 2  Bot / Botnet Activity      (HuggingFace Space) — only when 14 flow features provided
   Model 3  Network Traffic Anomaly    (HuggingFace Space) — only when 14 flow features provided
 
+Each of Models 1–3 can instead be served in-process from a local artifact
+(MODEL{1,2,3}_BACKEND=local|auto) — see src/local_models.py.
+
 Models are scheduled conditionally:
   has_payload AND is_api  → Model 1 runs
   has_flow_features       → Model 2 + Model 3 run
@@ -18,28 +21,39 @@ as a gatekeeper that blocks other models from running.
 from __future__ import annotations
 
 import asyncio
+import logging
 import math
 import os
+import re
 import time
 import warnings
-from typing import Any, Dict, List, Optional, Tuple
+from collections import Counter, deque
+from typing import Any, AsyncIterator, Deque, Dict, List, Optional, Tuple, Union
 from urllib.parse import parse_qsl, urlsplit
 
 import joblib
 import numpy as np
-import httpx
 
 warnings.filterwarnings("ignore")
 
 # ── helpers imported from existing feature engineering ──────────────────────
 from src.feature_engineering import (
     FEATURE_COLUMNS,
-    compute_script_tag_score,
-    compute_shannon_entropy,
-    compute_sql_keyword_score,
-    count_special_chars,
     extract_features,
+    extract_features_matrix,
+    special_chars_from_counts,
 )
+from src.entropy import char_entropy
+from src.pattern_matcher import scan_rules
+from src.request_parser import ParsedRequest
+from src.local_models import LocalInferenceEngine
+from src.compute_pool import get_compute_pool
+from src.forest_compiler import CompiledForest
+from src.tracing import span, traced
+from src.metrics import CACHE_REQUESTS, DEADLINE_SKIPS, MODEL_ERRORS, MODEL_LATENCY
+from src.http_gateway import get_gateway
+
+logger = logging.getLogger(__name__)
 
 # ── constants ────────────────────────────────────────────────────────────────
 _MODEL1_HF_URL = os.getenv("HF_MODEL1_URL", "https://bhavyasoni21-model1.hf.space/predict")
@@ -51,32 +65,39 @@ _MODEL3_TIMEOUT = float(os.getenv("HF_MODEL3_TIMEOUT", "8.0"))
 
 _HF_API_TOKEN = os.getenv("HF_API_TOKEN", "").strip()
 
+# Rows per CPU-executor task in predict_batch_with_threshold
+_BATCH_CHUNK_ROWS = int(os.getenv("BATCH_CHUNK_ROWS", "2000"))
+
+# Batch deduplication: off | exact (score each distinct request once) |
+# template (also share the base score between requests that differ only in
+# numbers / IDs; every request is still classified on its own text)
+_BATCH_DEDUP = os.getenv("BATCH_DEDUP", "exact").strip().lower()
+if _BATCH_DEDUP not in ("off", "exact", "template"):
+    _BATCH_DEDUP = "exact"
+
+# Score single requests with the flat-array evaluator (src/forest_compiler.py)
+_COMPILED_FOREST = os.getenv("COMPILED_FOREST", "true").strip().lower() in ("1", "true", "yes")
+
 # ── M1 Payload Result Cache (reduces HF calls for repeated/similar payloads) ─
 # Keyed by the Model 1 feature-vector bytes; results expire after TTL seconds.
 _PAYLOAD_CACHE: Dict[bytes, Tuple[Tuple[bool, Optional[float]], float]] = {}
 _PAYLOAD_CACHE_TTL = 60.0       # seconds — short TTL; threats can change
 
-# ── Shared httpx client (connection pooling) ─────────────────────────────────
-_shared_client: Optional[httpx.AsyncClient] = None
+# Model calls that outlived a request's latency budget — held here so they
+# finish (and fill the caches) instead of being garbage-collected mid-flight
+_LATE_TASKS: "set[asyncio.Future]" = set()
 
 
-async def get_shared_client() -> httpx.AsyncClient:
-    """Get or create the shared async HTTP client with connection pooling."""
-    global _shared_client
-    if _shared_client is None or _shared_client.is_closed:
-        _shared_client = httpx.AsyncClient(
-            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10),
-            timeout=httpx.Timeout(10.0, connect=5.0),
-        )
-    return _shared_client
+def detach_late(fut: "asyncio.Future") -> None:
+    """Keep a model call that missed its deadline running until it completes."""
 
+    def _done(f: "asyncio.Future") -> None:
+        _LATE_TASKS.discard(f)
+        if not f.cancelled() and f.exception() is not None:
+            logger.debug("Late model call failed: %s", f.exception())
 
-async def close_shared_client() -> None:
-    """Close the shared client on shutdown."""
-    global _shared_client
-    if _shared_client is not None and not _shared_client.is_closed:
-        await _shared_client.aclose()
-        _shared_client = None
+    _LATE_TASKS.add(fut)
+    fut.add_done_callback(_done)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -86,39 +107,6 @@ async def close_shared_client() -> None:
 _MODEL1_PATH_TRAVERSAL_PATTERNS = ("../", "..\\", "%2e%2e", "..%2f", "%2f", "%5c")
 
 
-def _parse_raw_request(raw_request: str) -> Dict[str, str]:
-    """Split a raw HTTP request into request-line, headers, and body fields."""
-    lines = [line.rstrip("\r") for line in raw_request.splitlines()]
-    request_line = lines[0].strip() if lines else ""
-    parts = request_line.split()
-
-    method = parts[0] if len(parts) >= 1 else ""
-    url = parts[1] if len(parts) >= 2 else ""
-
-    headers: Dict[str, str] = {}
-    body_lines: List[str] = []
-    in_body = False
-
-    for line in lines[1:]:
-        if not in_body:
-            if not line.strip():
-                in_body = True
-                continue
-            if ":" in line:
-                key, value = line.split(":", 1)
-                headers[key.strip().lower()] = value.strip()
-                continue
-        body_lines.append(line)
-
-    return {
-        "method": method,
-        "url": url,
-        "content": "\n".join(body_lines).strip(),
-        "cookie": headers.get("cookie", ""),
-        "user_agent": headers.get("user-agent", ""),
-    }
-
-
 def _safe_url_depth(url: str) -> float:
     path = urlsplit(url).path or url.split("?", 1)[0]
     return float(len([segment for segment in path.split("/") if segment]))
@@ -131,35 +119,52 @@ def _safe_parameter_count(url: str) -> float:
     return float(url.count("="))
 
 
-def _extract_model1_features(raw_request: str) -> np.ndarray:
-    """Build the 11-feature vector expected by Model 1."""
-    parsed = _parse_raw_request(raw_request)
-    method = parsed["method"]
-    url = parsed["url"]
-    content = parsed["content"]
-    cookie = parsed["cookie"]
-    user_agent = parsed["user_agent"]
+def _lowered(request: Union[str, ParsedRequest]) -> str:
+    return request.lower_text if isinstance(request, ParsedRequest) else request.lower()
 
-    request_length = float(len(raw_request))
-    payload_text = "\n".join(filter(None, [method, url, content, cookie, user_agent, raw_request]))
+
+def _extract_model1_features(request: Union[str, ParsedRequest]) -> np.ndarray:
+    """Build the 11-feature vector expected by Model 1.
+
+    The payload text is the request parts joined with the raw request. Every
+    part is a delimited substring of the raw request, so its SQL / script
+    keyword scores equal the base features' scores, and its character
+    histogram is the parts' histogram plus the raw request's (same order, so
+    the entropy is bit-identical to counting the joined text).
+    """
+    parsed = ParsedRequest.of(request)
+    url = parsed.url
+    raw = parsed.raw
+    base = extract_features(parsed)
+
+    parts_text = parsed.parts_text
+    if parts_text:
+        payload_counts = Counter(parts_text + "\n")
+        payload_length = len(parts_text) + 1 + len(raw)
+    else:
+        payload_counts = Counter()
+        payload_length = len(raw)
+    payload_counts.update(parsed.char_counts)
+
+    request_length = float(len(raw))
     digit_ratio = (
-        sum(char.isdigit() for char in payload_text) / max(1, len(payload_text))
+        sum(n for char, n in payload_counts.items() if char.isdigit()) / max(1, payload_length)
     )
-    lower_raw = raw_request.lower()
+    lower_raw = parsed.lower_text
     path_traversal_score = float(any(pattern in lower_raw for pattern in _MODEL1_PATH_TRAVERSAL_PATTERNS))
 
     return np.array([[
         request_length,
         _safe_url_depth(url),
         _safe_parameter_count(url),
-        float(count_special_chars(payload_text)),
+        float(special_chars_from_counts(payload_counts)),
         float(digit_ratio),
-        float(compute_shannon_entropy(payload_text)),
-        float(compute_sql_keyword_score(payload_text)),
-        float(compute_script_tag_score(payload_text)),
+        float(char_entropy(payload_counts, payload_length)),
+        base["sql_keyword_score"],
+        base["script_tag_score"],
         path_traversal_score,
-        float(len(cookie)),
-        float(len(user_agent)),
+        float(len(parsed.cookie)),
+        float(len(parsed.user_agent)),
     ]])
 
 
@@ -341,35 +346,75 @@ _BASE_COLS = [
     "Flow IAT Mean", "Flow IAT Std", "Flow IAT Max",
     "Active Mean", "Active Std", "Idle Mean", "Idle Std", "Idle Max",
 ]
+_BASE_INDEX = {name: i for i, name in enumerate(_BASE_COLS)}
+_LOG_INDEX = [_BASE_INDEX[name] for name in _LOG_COLS]
+# (numerator, denominator) columns of the engineered ratios, in output order
+_RATIO_COLS = [
+    (("Total Fwd Packet",), ("Total Bwd packets",)),
+    (("Total Length of Fwd Packet",), ("Total Length of Bwd Packet",)),
+    (("Total Length of Fwd Packet", "Total Length of Bwd Packet"), ("Total Fwd Packet", "Total Bwd packets")),
+    (("Flow IAT Std",), ("Flow IAT Mean",)),
+    (("Packet Length Std",), ("Packet Length Mean",)),
+    (("Active Mean",), ("Idle Mean",)),
+]
+_RATIO_INDEX = [
+    ([_BASE_INDEX[name] for name in num], [_BASE_INDEX[name] for name in den])
+    for num, den in _RATIO_COLS
+]
+MODEL3_FEATURE_COUNT = len(_BASE_COLS) + len(_LOG_COLS) + len(_RATIO_COLS)
+
 
 def _engineer_model3_features(base_vec: np.ndarray) -> np.ndarray:
     """
     Apply the same feature engineering used during Model 3 training.
-    Returns a 35-element vector.
+    Returns a (1, 35) matrix. Scalar per-request path; train_model3 engineers
+    its whole training set with _engineer_model3_matrix().
     """
-    d = dict(zip(_BASE_COLS, base_vec))
+    values = [float(v) for v in base_vec]
     eps = 1e-9
 
-    log_vals = [math.log1p(max(0.0, d[c])) for c in _LOG_COLS]
+    engineered = [math.log1p(max(0.0, values[i])) for i in _LOG_INDEX]
+    for num, den in _RATIO_INDEX:
+        numerator = values[num[0]] if len(num) == 1 else values[num[0]] + values[num[1]]
+        denominator = values[den[0]] if len(den) == 1 else values[den[0]] + values[den[1]]
+        try:
+            engineered.append(numerator / (denominator + eps))
+        except ZeroDivisionError:
+            engineered.append(0.0)
+    engineered = [v if math.isfinite(v) else 0.0 for v in engineered]
 
-    fwd_bwd_pkt_ratio = d["Total Fwd Packet"] / (d["Total Bwd packets"] + eps)
-    fwd_bwd_len_ratio = d["Total Length of Fwd Packet"] / (d["Total Length of Bwd Packet"] + eps)
-    bytes_per_pkt = (
-        (d["Total Length of Fwd Packet"] + d["Total Length of Bwd Packet"])
-        / (d["Total Fwd Packet"] + d["Total Bwd packets"] + eps)
-    )
-    iat_variability = d["Flow IAT Std"] / (d["Flow IAT Mean"] + eps)
-    pkt_std_to_mean = d["Packet Length Std"] / (d["Packet Length Mean"] + eps)
-    active_idle_ratio = d["Active Mean"] / (d["Idle Mean"] + eps)
+    return np.array([values + engineered])
 
-    engineered = np.array(log_vals + [
-        fwd_bwd_pkt_ratio, fwd_bwd_len_ratio, bytes_per_pkt,
-        iat_variability, pkt_std_to_mean, active_idle_ratio,
-    ])
 
-    engineered = np.where(np.isfinite(engineered), engineered, 0.0)
+def _engineer_model3_matrix(base: np.ndarray) -> np.ndarray:
+    """(N, 18) base vectors → (N, 35) Model 3 features, row-for-row equal to
+    _engineer_model3_features().
+
+    The base block is copied, then the 11 log1p columns and 6 ratios are
+    written in place; non-finite engineered values become 0.
+    """
+    eps = 1e-9
+    n, width = base.shape
+    out = np.empty((n, MODEL3_FEATURE_COUNT))
+    out[:, :width] = base
 
-    return np.concatenate([base_vec, engineered]).reshape(1, -1)
+    logs = out[:, width:width + len(_LOG_INDEX)]
+    np.maximum(base[:, _LOG_INDEX], 0.0, out=logs)
+    # math.log1p, not np.log1p: numpy's SIMD log1p can differ in the last
+    # bit, and Model 3 was trained on these exact values
+    logs[:] = np.fromiter(
+        map(math.log1p, logs.ravel().tolist()), dtype=np.float64, count=logs.size,
+    ).reshape(logs.shape)
+
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        for k, (num, den) in enumerate(_RATIO_INDEX, start=width + len(_LOG_INDEX)):
+            numerator = base[:, num[0]] if len(num) == 1 else base[:, num[0]] + base[:, num[1]]
+            denominator = base[:, den[0]] if len(den) == 1 else base[:, den[0]] + base[:, den[1]]
+            np.divide(numerator, denominator + eps, out=out[:, k])
+
+    engineered = out[:, width:]
+    engineered[~np.isfinite(engineered)] = 0.0
+    return out
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -382,8 +427,8 @@ class MultiModelPredictor:
 
     Model routing:
       Model 1 (payload): runs when raw_request is non-empty AND it's an API request
-      Model 2 (bot):     runs when 14 network flow features are provided
-      Model 3 (traffic): runs when 14 network flow features are provided
+      Model 2 (bot):     runs on live session flow features (/analyze Sessionizer)
+      Model 3 (traffic): runs when 14 network flow features are provided by the caller
 
     No gatekeeper: the base IsolationForest score is one input to the
     fusion engine, not a gate that blocks Models 2 & 3 from running.
@@ -402,12 +447,12 @@ class MultiModelPredictor:
         self._base_remote_url = ""
         if base_model_path.startswith(("http://", "https://")):
             self._base_remote_url = base_model_path
-            print(f"[INFO] Base model configured as remote endpoint: {self._base_remote_url}")
+            logger.info("Base model configured as remote endpoint: %s", self._base_remote_url)
         else:
             env_base_url = os.getenv("HF_BASE_MODEL_URL", "").strip()
             if env_base_url:
                 self._base_remote_url = env_base_url
-                print(f"[INFO] Base model remote endpoint from HF_BASE_MODEL_URL: {self._base_remote_url}")
+                logger.info("Base model remote endpoint from HF_BASE_MODEL_URL: %s", self._base_remote_url)
 
         base_pipeline = None
         if not self._base_remote_url:
@@ -423,19 +468,42 @@ class MultiModelPredictor:
         self._base_scaler = base_pipeline["scaler"] if base_pipeline else None
         self._base_feature_columns = base_pipeline["feature_columns"] if base_pipeline else FEATURE_COLUMNS
 
+        # Compile the forest + scaler into packed node arrays; sklearn stays as fallback
+        self._base_compiled: Optional[CompiledForest] = None
+        if base_pipeline and _COMPILED_FOREST:
+            try:
+                self._base_compiled = CompiledForest.from_pipeline(base_pipeline)
+                logger.info("Base model compiled: %d trees, %d nodes",
+                            self._base_compiled.n_estimators, len(self._base_compiled.value))
+            except Exception as e:
+                logger.warning("Base model compilation failed, using sklearn: %s", e)
+
+        # Local Models 1–3 (optional) — backend chosen per model via MODEL{N}_BACKEND
+        self._local = LocalInferenceEngine()
+        self._model_backends = {
+            key: self._local.resolve_backend(key) for key in ("model1", "model2", "model3")
+        }
+        logger.info("Model backends: %s", self._model_backends)
+
+    def _uses_local(self, key: str) -> bool:
+        return self._model_backends.get(key) == "local"
+
+    def remote_urls(self) -> List[str]:
+        """Endpoints this predictor will call over HTTP (for connection warm-up)."""
+        urls = [self._base_remote_url] if self._base_remote_url else []
+        for key, url in (("model1", _MODEL1_HF_URL), ("model2", _MODEL2_HF_URL), ("model3", _MODEL3_HF_URL)):
+            if not self._uses_local(key):
+                urls.append(url)
+        return urls
+
+    def shutdown(self) -> None:
+        """Release the local inference worker pool."""
+        self._local.shutdown()
+
     @staticmethod
-    def _is_api_request(raw_request: str) -> bool:
+    def _is_api_request(raw_request: Union[str, ParsedRequest]) -> bool:
         """Detect if this is an API call vs browser request."""
-        if not raw_request:
-            return False
-        api_methods = ("POST", "PUT", "DELETE", "PATCH")
-        is_api_method = any(raw_request.startswith(m) for m in api_methods)
-        is_api_content = (
-            "application/json" in raw_request or
-            "application/xml" in raw_request or
-            "application/x-www-form-urlencoded" in raw_request
-        )
-        return is_api_method or is_api_content
+        return ParsedRequest.of(raw_request).is_api
 
     @staticmethod
     def _build_hf_headers() -> Dict[str, str]:
@@ -509,13 +577,15 @@ class MultiModelPredictor:
         return None
 
     @staticmethod
-    async def _post_json_async(url: str, payload: Dict[str, Any], timeout: float) -> Optional[Any]:
-        """Async POST using shared connection-pooled client."""
+    async def _post_json_async(
+        url: str, payload: Dict[str, Any], timeout: float, model: str = "hf"
+    ) -> Optional[Any]:
+        """Async POST through the shared per-host pooled gateway."""
         if not url:
             return None
+        start = time.perf_counter()
         try:
-            client = await get_shared_client()
-            response = await client.post(
+            response = await get_gateway().post(
                 url,
                 json=payload,
                 headers=MultiModelPredictor._build_hf_headers(),
@@ -524,16 +594,28 @@ class MultiModelPredictor:
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"[WARN] HuggingFace async request failed ({url}): {e}")
+            MODEL_ERRORS.labels(model).inc()
+            logger.warning("HuggingFace async request failed (%s): %s", url, e)
             return None
+        finally:
+            MODEL_LATENCY.labels(model).observe(time.perf_counter() - start)
 
     def _predict_base_local(self, features: Dict[str, float]) -> Tuple[float, bool]:
         """Run base IsolationForest locally."""
         feature_values = np.array([[features[col] for col in self._base_feature_columns]])
+        if self._base_compiled is not None:
+            anomaly_score = self._base_compiled.score_one(feature_values)
+            return anomaly_score, anomaly_score < 0
         scaled = self._base_scaler.transform(feature_values)
         anomaly_score = float(self._base_model.decision_function(scaled)[0])
         return anomaly_score, anomaly_score < 0
 
+    def _extract_and_score_local(self, raw_request: Union[str, ParsedRequest]) -> Tuple[Dict[str, float], float]:
+        """Feature extraction + local base score in one executor hop."""
+        features = extract_features(raw_request)
+        anomaly_score, _ = self._predict_base_local(features)
+        return features, anomaly_score
+
     async def _predict_base_remote(self, features: Dict[str, float]) -> Tuple[float, bool]:
         """Run base IsolationForest via remote HF endpoint."""
         feature_values = [features[col] for col in self._base_feature_columns]
@@ -546,6 +628,7 @@ class MultiModelPredictor:
             self._base_remote_url,
             payload,
             float(os.getenv("HF_BASE_MODEL_TIMEOUT", "8.0")),
+            model="base",
         )
         if data is None:
             raise RuntimeError("Base HuggingFace model request failed")
@@ -583,14 +666,18 @@ class MultiModelPredictor:
     # ── individual model predictions ──────────────────────────────────────
 
     async def _predict_traffic(self, request: str, base: Dict[str, float]) -> Tuple[bool, Optional[float]]:
-        """Returns (is_anomalous, confidence) from Model 3 via HuggingFace Space."""
+        """Returns (is_anomalous, confidence) from Model 3 (local artifact or HuggingFace Space)."""
         base_vec = _extract_model3_base(request, base)
         X35 = _engineer_model3_features(base_vec)
 
+        if self._uses_local("model3"):
+            return await self._local.predict("model3", X35)
+
         data = await self._post_json_async(
             _MODEL3_HF_URL,
             {"features": X35.flatten().tolist(), "inputs": X35.flatten().tolist()},
             _MODEL3_TIMEOUT,
+            model="model3",
         )
         if data is None:
             return False, None
@@ -606,31 +693,38 @@ class MultiModelPredictor:
         return False, confidence
 
     async def _predict_bot(self, model2_flow_features: Optional[List[float]]) -> Tuple[bool, Optional[float], str]:
-        """Returns (is_bot, confidence, bot_type) from Model 2 via HuggingFace Space.
+        """Returns (is_bot, confidence, bot_type) from Model 2 (local artifact or HuggingFace Space).
 
         Falls back to local heuristics if HF model is unavailable.
         """
         X14 = _coerce_model2_features(model2_flow_features)
         if X14 is None:
-            print("[DEBUG] Model 2: No flow features provided")
+            logger.debug("Model 2: no flow features provided")
             return False, None, "normal"
 
         features_list = X14.flatten().tolist()
-        print(f"[DEBUG] Model 2: Sending {len(features_list)} features to {_MODEL2_HF_URL}")
+
+        if self._uses_local("model2"):
+            is_bot, confidence = await self._local.predict("model2", X14)
+            _, _, bot_type = _heuristic_bot_score(features_list)
+            return is_bot, confidence, bot_type
+
+        logger.debug("Model 2: sending %d features to %s", len(features_list), _MODEL2_HF_URL)
 
         data = await self._post_json_async(
             _MODEL2_HF_URL,
             {"features": features_list, "inputs": features_list},
             _MODEL2_TIMEOUT,
+            model="model2",
         )
 
         if data is None:
-            print("[DEBUG] Model 2: HF endpoint failed, using heuristic fallback")
             is_bot, score, bot_type = _heuristic_bot_score(features_list)
-            print(f"[DEBUG] Model 2 heuristic: is_bot={is_bot}, score={score:.4f}, type={bot_type}")
+            logger.debug("Model 2: HF endpoint failed, heuristic is_bot=%s score=%.4f type=%s",
+                         is_bot, score, bot_type)
             return is_bot, score, bot_type
 
-        print(f"[DEBUG] Model 2 raw response: {data}")
+        logger.debug("Model 2 raw response: %s", data)
 
         result = self._parse_bool_prediction(
             data,
@@ -642,23 +736,27 @@ class MultiModelPredictor:
         # If HF model returned but confidence is missing, use heuristics
         # (0.0% confidence is meaningless - better to use calculated score)
         if confidence is None:
-            print("[DEBUG] Model 2: No confidence in HF response, using heuristic fallback")
             is_bot, score, bot_type = _heuristic_bot_score(features_list)
-            print(f"[DEBUG] Model 2 heuristic: is_bot={is_bot}, score={score:.4f}, type={bot_type}")
+            logger.debug("Model 2: no confidence in HF response, heuristic is_bot=%s score=%.4f type=%s",
+                         is_bot, score, bot_type)
             return is_bot, score, bot_type
 
         # HF model worked - derive bot_type from heuristics but use HF confidence
         _, _, bot_type = _heuristic_bot_score(features_list)
-        print(f"[DEBUG] Model 2 parsed: is_bot={result}, confidence={confidence}, type={bot_type}")
+        logger.debug("Model 2 parsed: is_bot=%s confidence=%s type=%s", result, confidence, bot_type)
         return bool(result), confidence, bot_type
 
-    async def _predict_payload(self, request: str, base: Dict[str, float]) -> Tuple[bool, Optional[float]]:
-        """Returns (is_attack, confidence) from Model 1 via HuggingFace Space.
+    async def _predict_payload(self, request: Union[str, ParsedRequest], base: Dict[str, float]) -> Tuple[bool, Optional[float]]:
+        """Returns (is_attack, confidence) from Model 1 (local artifact or HuggingFace Space).
 
-        Results are cached by feature-vector bytes for _PAYLOAD_CACHE_TTL seconds
+        Remote results are cached by feature-vector bytes for _PAYLOAD_CACHE_TTL seconds
         to avoid redundant HF calls for repeated or structurally identical payloads.
         """
         X11 = _extract_model1_features(request)
+
+        if self._uses_local("model1"):
+            return await self._local.predict("model1", X11)
+
         cache_key = X11.tobytes()
         now = time.time()
 
@@ -667,12 +765,15 @@ class MultiModelPredictor:
         if cached is not None:
             cached_result, cached_ts = cached
             if now - cached_ts < _PAYLOAD_CACHE_TTL:
+                CACHE_REQUESTS.labels("payload", "hit").inc()
                 return cached_result
+        CACHE_REQUESTS.labels("payload", "miss").inc()
 
         data = await self._post_json_async(
             _MODEL1_HF_URL,
             {"features": X11.flatten().tolist(), "inputs": X11.flatten().tolist()},
             _MODEL1_TIMEOUT,
+            model="model1",
         )
         if data is None:
             return False, None
@@ -696,55 +797,77 @@ class MultiModelPredictor:
 
     # ── main interface ────────────────────────────────────────────────────
 
-    async def predict(self, raw_request: str, model2_flow_features: Optional[List[float]] = None) -> Dict:
+    async def predict(
+        self,
+        request: Union[str, ParsedRequest],
+        model2_flow_features: Optional[List[float]] = None,
+        deadline: Optional[float] = None,
+        session_flows: bool = False,
+    ) -> Dict:
         """
         Score a single HTTP request using only the models applicable to the input.
 
         Model routing:
           Model 1 (payload): runs when raw_request is present AND is an API-style request
-          Model 2 (bot):     runs when 14 flow features are provided
-          Model 3 (traffic): runs when 14 flow features are provided
+          Model 2 (bot):     runs when 14 flow features come from the Sessionizer
+          Model 3 (traffic): runs when 14 flow features are supplied by the caller
+
+        session_flows=True marks the flow features as the Sessionizer's live
+        session (/analyze): they feed Model 2 only. Caller-supplied flows
+        (/predict) feed Model 3 only, as before.
+
+        deadline is an event-loop time (loop.time()); remote models still pending
+        when it passes are reported as not run and left to finish in the
+        background, where Model 1 results still fill _PAYLOAD_CACHE.
+
+        `request` may be a ParsedRequest already built by the caller, so the
+        payload scan, features and rule checks all share one parse.
 
         Returns dict including model_ran flags so the fusion engine can renormalize weights.
         """
-        # 1. Extract base HTTP features
-        features = extract_features(raw_request)
-
-        # 2. Compute base anomaly score (one signal, not a gate)
-        if self._base_model is not None and self._base_scaler is not None:
-            anomaly_score, _ = self._predict_base_local(features)
-        elif self._base_remote_url:
-            anomaly_score, _ = await self._predict_base_remote(features)
-        else:
-            raise RuntimeError("No base model configured (local or HuggingFace remote)")
+        parsed = ParsedRequest.of(request)
+        raw_request = parsed.raw
+
+        # 1–2. Extract base HTTP features + base anomaly score (one signal, not a gate).
+        # Both are CPU-bound, so they run on the interactive compute lane.
+        pool = get_compute_pool()
+        with span("predict.base"):
+            if self._base_model is not None and self._base_scaler is not None:
+                features, anomaly_score = await pool.run_interactive(self._extract_and_score_local, parsed)
+            elif self._base_remote_url:
+                features = await pool.run_interactive(extract_features, parsed)
+                anomaly_score, _ = await self._predict_base_remote(features)
+            else:
+                raise RuntimeError("No base model configured (local or HuggingFace remote)")
 
         # 3. Detect request type + routing flags
-        is_api = self._is_api_request(raw_request)
+        is_api = parsed.is_api
         has_payload = bool(raw_request and raw_request.strip())
         has_flow_features = (
             model2_flow_features is not None
             and len(model2_flow_features) == 14
         )
 
-        print("----- MODEL ROUTER -----")
-        print(f"Payload present: {has_payload}")
-        print(f"Flow features present: {has_flow_features}")
-        print(f"API request: {is_api}")
-
         # 4. Conditional task router — only schedule models with valid input
         tasks: List = []
         task_names: List[str] = []
 
         if has_payload and is_api:
-            tasks.append(self._predict_payload(raw_request, features))
+            tasks.append(traced("predict.model1", self._predict_payload(parsed, features)))
             task_names.append("model1")
 
-        if has_flow_features:
-            # Model 2 (bot) no longer runs in /analyze — it has its own /bot-analysis endpoint
-            tasks.append(self._predict_traffic(raw_request, features))
+        if has_flow_features and session_flows:
+            tasks.append(traced("predict.model2", self._predict_bot(model2_flow_features)))
+            task_names.append("model2")
+        elif has_flow_features:
+            tasks.append(traced("predict.model3", self._predict_traffic(raw_request, features)))
             task_names.append("model3")
 
-        print(f"Models scheduled: {task_names}")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug(
+                "Model router scheduled %s", task_names,
+                extra={"payload": has_payload, "flow_features": has_flow_features, "api": is_api},
+            )
 
         model_outputs: Dict[str, Optional[Tuple]] = {
             "model1": None,
@@ -752,20 +875,36 @@ class MultiModelPredictor:
             "model3": None,
         }
 
-        if tasks:
+        late: List[str] = []
+        if tasks and deadline is None:
             raw_results = await asyncio.gather(*tasks, return_exceptions=True)
             for name, result in zip(task_names, raw_results):
                 if isinstance(result, Exception):
-                    print(f"[WARN] Model {name} failed: {result}")
+                    logger.warning("Model %s failed: %s", name, result)
                 else:
                     model_outputs[name] = result
+        elif tasks:
+            futures = [asyncio.ensure_future(t) for t in tasks]
+            remaining = deadline - asyncio.get_running_loop().time()
+            await asyncio.wait(futures, timeout=max(0.0, remaining))
+            for name, fut in zip(task_names, futures):
+                if not fut.done():
+                    late.append(name)
+                    detach_late(fut)
+                    DEADLINE_SKIPS.labels(name).inc()
+                elif fut.exception() is not None:
+                    logger.warning("Model %s failed: %s", name, fut.exception())
+                else:
+                    model_outputs[name] = fut.result()
+            if late:
+                logger.info("Latency budget expired before %s — fusing without them", late)
 
         # Unpack results — None means the model did not run (no valid input)
         payload_attack, payload_conf = (
             model_outputs["model1"] if model_outputs["model1"] is not None else (False, None)
         )
         bot_detected, bot_conf = (
-            model_outputs["model2"] if model_outputs["model2"] is not None else (False, None)
+            model_outputs["model2"][:2] if model_outputs["model2"] is not None else (False, None)
         )
         traffic_anomaly, traffic_conf = (
             model_outputs["model3"] if model_outputs["model3"] is not None else (False, None)
@@ -776,10 +915,11 @@ class MultiModelPredictor:
 
         sql_attack = features["sql_keyword_score"] > 0
         xss_attack = features["script_tag_score"] > 0
+        lower_raw = parsed.lower_text
         traversal = (
             "../" in raw_request
-            or "%2e%2e" in raw_request.lower()
-            or "..%2f" in raw_request.lower()
+            or "%2e%2e" in lower_raw
+            or "..%2f" in lower_raw
         )
 
         if traffic_anomaly:
@@ -813,9 +953,10 @@ class MultiModelPredictor:
             "payload_confidence": payload_conf,
             "is_api_request": is_api,
             "bot_flow_features_supplied": model2_flow_features is not None,
-            "model1_ran": "model1" in task_names,
-            "model2_ran": "model2" in task_names,
-            "model3_ran": "model3" in task_names,
+            "model1_ran": "model1" in task_names and "model1" not in late,
+            "model2_ran": "model2" in task_names and "model2" not in late,
+            "model3_ran": "model3" in task_names and "model3" not in late,
+            "deadline_skipped": late,
             "features": features,
         }
 
@@ -826,10 +967,9 @@ class MultiModelPredictor:
 
         Called exclusively from /bot-analysis — never from /analyze.
         """
-        print(f"[DEBUG] predict_bot_flows: Processing {len(features_batch)} sessions")
+        logger.debug("predict_bot_flows: processing %d sessions", len(features_batch))
         results = []
-        for i, features in enumerate(features_batch):
-            print(f"[DEBUG] Session {i} features: {features[:5]}... (first 5 of 14)")
+        for features in features_batch:
             is_bot, confidence, bot_type = await self._predict_bot(features)
             results.append({
                 "prediction": int(is_bot),
@@ -856,70 +996,34 @@ class MultiModelPredictor:
     UNKNOWN_ATTACK_THRESHOLD = 0.08
 
     @staticmethod
-    def _detect_sqli(request: str) -> bool:
+    def _detect_sqli(request: Union[str, ParsedRequest]) -> bool:
         """Detect SQL injection patterns using high-confidence indicators
         and multi-keyword correlation to reduce false positives."""
-        lower_req = request.lower()
-
-        # High-confidence single patterns (rarely appear in legitimate traffic)
-        strong_patterns = [
-            "' or '1'='1", "' or 1=1--", "' or ''='", "admin'--",
-            "union select", "drop table", "insert into",
-            "1=1", "1'='1", ";--", "exec(", "execute(",
-            "' or ", "' and ",
-        ]
-        if any(p in lower_req for p in strong_patterns):
-            return True
-
-        # Weak patterns: only flag when 2+ co-occur (e.g. "select ... from")
-        weak_keywords = ["select ", " from ", " where ", "@@", "char(", "--", "/*", "*/"]
-        matches = sum(1 for p in weak_keywords if p in lower_req)
-        return matches >= 2
+        hits = scan_rules(request)
+        # Weak keywords only flag when 2+ co-occur (e.g. "select ... from")
+        return bool(hits["sqli_strong"]) or len(hits["sqli_weak"]) >= 2
 
     @staticmethod
-    def _detect_xss(request: str) -> bool:
+    def _detect_xss(request: Union[str, ParsedRequest]) -> bool:
         """Detect XSS patterns. Bare HTML tags like <img> or <svg> alone
         are not sufficient — they must pair with event handlers or script context."""
-        lower_req = request.lower()
-
-        # High-confidence: always malicious in HTTP request context
-        strong_patterns = [
-            "<script", "</script", "javascript:", "document.cookie",
-            "document.location", "expression(",
-        ]
-        if any(p in lower_req for p in strong_patterns):
-            return True
-
-        # Event handlers are strong signals on their own
-        event_handlers = [
-            "onerror=", "onload=", "onclick=", "onmouseover=", "onfocus=",
-        ]
-        if any(p in lower_req for p in event_handlers):
+        hits = scan_rules(request)
+        # Script context and event handlers are strong signals on their own
+        if hits["xss_strong"] or hits["xss_event"]:
             return True
-
-        # HTML tags only count when combined with event handlers or JS calls
-        html_tags = ["<img", "<iframe", "<svg"]
-        js_calls = ["alert(", "eval(", "prompt(", "confirm("]
-        has_html_tag = any(t in lower_req for t in html_tags)
-        has_js_call = any(j in lower_req for j in js_calls)
-        return has_html_tag and has_js_call
+        # HTML tags only count when combined with JS calls
+        return bool(hits["html_tag"]) and bool(hits["js_call"])
 
     @staticmethod
-    def _detect_path_traversal(request: str) -> bool:
+    def _detect_path_traversal(request: Union[str, ParsedRequest]) -> bool:
         """Detect path traversal patterns. A single '../' is common in
         legitimate relative paths, so require repeated sequences or
         sensitive target files."""
-        lower_req = request.lower()
-
-        # High-confidence: encoded traversal or sensitive file targets
-        strong_patterns = [
-            "%2e%2e", "..%2f", "%2f..", "....//", "..%5c", "%252e",
-            "/etc/passwd", "/etc/shadow", "c:\\windows", "c:/windows",
-        ]
-        if any(p in lower_req for p in strong_patterns):
+        if scan_rules(request)["traversal_strong"]:
             return True
 
         # Plain '../' or '..\' require 2+ occurrences to flag
+        lower_req = _lowered(request)
         plain_count = lower_req.count("../") + lower_req.count("..\\")
         return plain_count >= 2
 
@@ -951,7 +1055,10 @@ class MultiModelPredictor:
         """
         Batch analysis with threshold-based anomaly detection using base IsolationForest.
 
-        Pipeline:
+        Distinct requests (BATCH_DEDUP=exact, or per template) are scored once;
+        see _scatter_results() for what a repeated request reuses.
+
+        Pipeline (per BATCH_CHUNK_ROWS chunk, on the batch compute lane):
           1. Extract features from all requests
           2. Send features to base model (IsolationForest) in ONE batch call
           3. Apply threshold: score < -0.05 = anomaly
@@ -968,111 +1075,126 @@ class MultiModelPredictor:
                 "path_traversal": int,
                 "unknown_attack": int,
                 "contamination_rate": float,
+                "deduplication": {"mode", "scored_requests", "reused_results", "saved_rate"},
                 "results": [...]
             }
         """
-        print(f"[BATCH] Processing {len(requests)} requests")
-
-        # Step 1: Extract features for all requests
-        features_list = []
-        for req in requests:
-            features = extract_features(req)
-            feature_values = [features[col] for col in self._base_feature_columns]
-            features_list.append(feature_values)
-
-        print(f"[BATCH] Extracted features for {len(features_list)} requests")
-
-        # Step 2: Send ALL features to base model in ONE batch call
-        scores = await self._batch_predict_model1(features_list)
-        print(f"[BATCH] Received {len(scores)} scores from base model")
-
-        # Safety guard: ensure score count matches request count to prevent IndexError
-        if len(scores) != len(requests):
-            print(f"[WARN] Score count mismatch: got {len(scores)}, expected {len(requests)}. Padding/trimming.")
-            if len(scores) < len(requests):
-                scores = scores + [0.1] * (len(requests) - len(scores))
-            else:
-                scores = scores[:len(requests)]
+        logger.info("Batch: processing %d requests", len(requests))
+
+        # Repeated requests (health checks, static assets, polling) are scored
+        # once; results are scattered back to every original row below. The
+        # dedup is one dict pass, cheaper in-process than shipped to a worker.
+        unique, inverse = requests, []
+        if _BATCH_DEDUP != "off":
+            unique, inverse = _dedup_requests(requests, _BATCH_DEDUP)
+
+        # Feature extraction, scoring and rule detection are CPU-bound: they run
+        # chunk by chunk on the batch compute lane so the event loop stays free
+        # for interactive traffic while a large batch is scoring.
+        chunks = [
+            unique[i:i + _BATCH_CHUNK_ROWS]
+            for i in range(0, len(unique), _BATCH_CHUNK_ROWS)
+        ]
 
-        # Step 3 & 4: Apply threshold and classify + detect threat type
-        results = []
-        counts = {
-            "normal": 0,
-            "sql_injection": 0,
-            "xss": 0,
-            "path_traversal": 0,
-            "unknown_attack": 0,
-        }
+        if self._base_model is not None and self._base_scaler is not None:
+            chunk_outputs = await asyncio.gather(*[self._score_batch_chunk(chunk) for chunk in chunks])
+        else:
+            chunk_outputs = [await self._score_batch_chunk(chunk) for chunk in chunks]
 
-        for i, req in enumerate(requests):
-            score = scores[i]
-            is_anomaly = False  # Default to not anomalous
-            threat_type = "Normal"  # Default threat type
+        results, counts = _merge_chunk_outputs(chunk_outputs)
+        if len(unique) < len(requests):
+            results, counts = await self._scatter_results(requests, results, inverse)
+        counts["scored"] = len(unique)
 
-            # Check 0.05 threshold FIRST: if score >= 0.05, always treat as Normal
-            if score >= self.UNKNOWN_ATTACK_THRESHOLD:
-                threat_type = "Normal"
-                is_anomaly = False
-            else:
-                # Score < 0.05, check for threat patterns
-                is_if_anomaly = score < self.ANOMALY_THRESHOLD
-
-                # Rule detection runs independently of the IF score.
-                # Known attack patterns are caught even when IF says "normal".
-                rule_type: Optional[str] = None
-                if self._detect_sqli(req):
-                    rule_type = "SQL Injection"
-                elif self._detect_xss(req):
-                    rule_type = "XSS Attack"
-                elif self._detect_path_traversal(req):
-                    rule_type = "Path Traversal"
-
-                # Anomaly if EITHER IF flags it OR a rule pattern matches
-                is_anomaly = is_if_anomaly or rule_type is not None
-
-                if rule_type:
-                    threat_type = rule_type
-                elif is_if_anomaly:
-                    threat_type = "Unknown Attack"
-                else:
-                    threat_type = "Normal"
-
-            # Count by threat type
-            if threat_type == "Normal":
-                counts["normal"] += 1
-            elif threat_type == "SQL Injection":
-                counts["sql_injection"] += 1
-            elif threat_type == "XSS Attack":
-                counts["xss"] += 1
-            elif threat_type == "Path Traversal":
-                counts["path_traversal"] += 1
-            else:
-                counts["unknown_attack"] += 1
+        summary = batch_summary(counts, len(requests))
+        logger.info("Batch: contamination rate %.2f%% (%d/%d anomalies)",
+                    summary["contamination_rate"], summary["total_requests"] - summary["normal"],
+                    summary["total_requests"])
 
-            results.append({
-                "raw_request": req,
-                "anomaly_score": score,
-                "is_anomaly": is_anomaly,
-                "threat_type": threat_type,
-            })
+        summary["results"] = results
+        return summary
 
-        # Step 5: Calculate contamination rate
-        total = len(requests)
-        anomaly_count = sum(1 for r in results if r["is_anomaly"])
-        contamination_rate = (anomaly_count / total * 100) if total > 0 else 0.0
+    async def stream_batch_with_threshold(
+        self, chunks: AsyncIterator[List[str]], window: int = 2
+    ) -> AsyncIterator[Tuple[List[Dict], Dict[str, int]]]:
+        """Score an async stream of request chunks, yielding (results, counts) in order.
 
-        print(f"[BATCH] Contamination rate: {contamination_rate:.2f}% ({anomaly_count}/{total} anomalies)")
+        At most `window` chunks are scored concurrently (one for a remote base
+        model), so memory stays bounded however long the input stream is.
+        """
+        if not (self._base_model is not None and self._base_scaler is not None):
+            window = 1
+        pending: Deque["asyncio.Future"] = deque()
+        try:
+            async for chunk in chunks:
+                pending.append(asyncio.ensure_future(self._score_deduplicated_chunk(chunk)))
+                if len(pending) >= window:
+                    yield await pending.popleft()
+            while pending:
+                yield await pending.popleft()
+        finally:
+            for fut in pending:
+                fut.cancel()
+
+    async def _score_deduplicated_chunk(self, chunk: List[str]) -> Tuple[List[Dict], Dict[str, int]]:
+        """_score_batch_chunk() over the chunk's distinct requests (per BATCH_DEDUP).
+
+        The counts also carry "scored": how many rows were actually scored.
+        """
+        unique, inverse = chunk, None
+        if _BATCH_DEDUP != "off":
+            unique, inverse = _dedup_requests(chunk, _BATCH_DEDUP)
+        if len(unique) == len(chunk):
+            results, counts = await self._score_batch_chunk(chunk)
+            counts["scored"] = len(chunk)
+            return results, counts
+        unique_results, _ = await self._score_batch_chunk(unique)
+        results, counts = await self._scatter_results(chunk, unique_results, inverse)
+        counts["scored"] = len(unique)
+        return results, counts
 
-        return {
-            "total_requests": total,
-            "normal": counts["normal"],
-            "sql_injection": counts["sql_injection"],
-            "xss": counts["xss"],
-            "path_traversal": counts["path_traversal"],
-            "unknown_attack": counts["unknown_attack"],
-            "contamination_rate": round(contamination_rate, 2),
-            "results": results,
-        }
+    @staticmethod
+    async def _scatter_results(
+        requests: List[str], unique_results: List[Dict], inverse: List[int]
+    ) -> Tuple[List[Dict], Dict[str, int]]:
+        """Results for every row from those of the distinct requests.
+
+        exact: a repeated request is the same text, so its result is reused
+        as is. template: only the base anomaly score (a function of the shared
+        feature row) is reused; each row is classified on its own text, so a
+        rule hit in a masked part is not lost.
+        """
+        if _BATCH_DEDUP != "template":
+            return _expand_results(requests, unique_results, inverse)
+        scores = [unique_results[index]["anomaly_score"] for index in inverse]
+        pool = get_compute_pool()
+        return _merge_chunk_outputs(await asyncio.gather(*[
+            pool.run_batch(_classify_batch_chunk, requests[i:i + _BATCH_CHUNK_ROWS], scores[i:i + _BATCH_CHUNK_ROWS])
+            for i in range(0, len(requests), _BATCH_CHUNK_ROWS)
+        ]))
+
+    async def _score_batch_chunk(self, chunk: List[str]) -> Tuple[List[Dict], Dict[str, int]]:
+        """Score + classify one chunk on the batch compute lane."""
+        pool = get_compute_pool()
+        if self._base_model is not None and self._base_scaler is not None:
+            return await pool.run_batch(
+                _score_and_classify_chunk,
+                chunk, self._base_model, self._base_scaler, self._base_feature_columns,
+            )
+        if self._base_remote_url:
+            feature_rows = await pool.run_batch(_extract_feature_rows, chunk, self._base_feature_columns)
+            scores = await self._batch_predict_model1(feature_rows)
+
+            # Safety guard: ensure score count matches request count to prevent IndexError
+            if len(scores) != len(chunk):
+                logger.warning("Score count mismatch: got %d, expected %d. Padding/trimming.", len(scores), len(chunk))
+                if len(scores) < len(chunk):
+                    scores = scores + [0.1] * (len(chunk) - len(scores))
+                else:
+                    scores = scores[:len(chunk)]
+
+            return await pool.run_batch(_classify_batch_chunk, chunk, scores)
+        raise RuntimeError("No base model configured (local or HuggingFace remote)")
 
     async def _batch_predict_model1(self, features_batch: List[List[float]]) -> List[float]:
         """
@@ -1083,13 +1205,7 @@ class MultiModelPredictor:
         """
         # If using local model
         if self._base_model is not None and self._base_scaler is not None:
-            scores = []
-            for feature_values in features_batch:
-                X = np.array([feature_values])
-                scaled = self._base_scaler.transform(X)
-                score = float(self._base_model.decision_function(scaled)[0])
-                scores.append(score)
-            return scores
+            return _score_feature_rows(features_batch, self._base_model, self._base_scaler)
 
         # If using remote HuggingFace endpoint
         if self._base_remote_url:
@@ -1102,7 +1218,7 @@ class MultiModelPredictor:
                 chunk_num = (chunk_idx // CHUNK_SIZE) + 1
                 total_chunks = (len(features_batch) + CHUNK_SIZE - 1) // CHUNK_SIZE
 
-                print(f"[BATCH] Processing chunk {chunk_num}/{total_chunks} ({len(chunk)} requests)")
+                logger.debug("Batch: processing chunk %d/%d (%d requests)", chunk_num, total_chunks, len(chunk))
 
                 payload = {
                     "inputs": chunk,
@@ -1113,10 +1229,11 @@ class MultiModelPredictor:
                     self._base_remote_url,
                     payload,
                     float(os.getenv("HF_BASE_MODEL_TIMEOUT", "15.0")),  # longer timeout for batch
+                    model="base_batch",
                 )
 
                 if data is None:
-                    print(f"[WARN] Chunk {chunk_num} HuggingFace request failed, falling back to sequential")
+                    logger.warning("Chunk %d HuggingFace request failed, falling back to sequential", chunk_num)
                     # Fallback: call individually for this chunk
                     chunk_scores = []
                     for features in chunk:
@@ -1129,6 +1246,7 @@ class MultiModelPredictor:
                             self._base_remote_url,
                             single_payload,
                             float(os.getenv("HF_BASE_MODEL_TIMEOUT", "8.0")),
+                            model="base",
                         )
                         if single_data is None:
                             chunk_scores.append(0.1)  # Default to "normal" on failure
@@ -1162,19 +1280,204 @@ class MultiModelPredictor:
                         score = data.get("anomaly_score", data.get("score", 0.1))
                         chunk_scores = [float(score)] * len(chunk)
                 else:
-                    print(f"[WARN] Unexpected chunk response format: {type(data)}")
+                    logger.warning("Unexpected chunk response format: %s", type(data))
                     chunk_scores = [0.1] * len(chunk)
 
                 # Guard: pad/trim chunk_scores to exactly len(chunk)
                 if len(chunk_scores) < len(chunk):
-                    print(f"[WARN] Chunk {chunk_num}: expected {len(chunk)} scores, got {len(chunk_scores)}. Padding with 0.1")
+                    logger.warning("Chunk %d: expected %d scores, got %d. Padding with 0.1", chunk_num, len(chunk), len(chunk_scores))
                     chunk_scores.extend([0.1] * (len(chunk) - len(chunk_scores)))
                 elif len(chunk_scores) > len(chunk):
                     chunk_scores = chunk_scores[:len(chunk)]
 
                 all_scores.extend(chunk_scores)
-                print(f"[BATCH] Chunk {chunk_num} completed: {len(chunk_scores)} scores received")
+                logger.debug("Batch: chunk %d completed, %d scores received", chunk_num, len(chunk_scores))
 
             return all_scores
 
         raise RuntimeError("No base model configured (local or HuggingFace remote)")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+#  Batch chunk workers (module-level so they can run in a process pool)
+# ─────────────────────────────────────────────────────────────────────────────
+
+_BATCH_COUNT_KEYS = ("normal", "sql_injection", "xss", "path_traversal", "unknown_attack")
+_THREAT_COUNT_KEYS = {
+    "Normal": "normal",
+    "SQL Injection": "sql_injection",
+    "XSS Attack": "xss",
+    "Path Traversal": "path_traversal",
+}
+
+
+def batch_summary(counts: Dict[str, int], total: int) -> Dict:
+    """BatchSummaryResponse fields (without results) from accumulated counts.
+
+    counts["scored"], when present, is the number of rows scored after
+    deduplication; the rest were answered from a duplicate's result.
+    """
+    anomaly_count = total - counts["normal"]
+    contamination_rate = (anomaly_count / total * 100) if total > 0 else 0.0
+    scored = counts.get("scored", total)
+    return {
+        "total_requests": total,
+        "normal": counts["normal"],
+        "sql_injection": counts["sql_injection"],
+        "xss": counts["xss"],
+        "path_traversal": counts["path_traversal"],
+        "unknown_attack": counts["unknown_attack"],
+        "contamination_rate": round(contamination_rate, 2),
+        "deduplication": {
+            "mode": _BATCH_DEDUP,
+            "scored_requests": scored,
+            "reused_results": total - scored,
+            "saved_rate": round((total - scored) / total * 100, 2) if total > 0 else 0.0,
+        },
+    }
+
+
+# Masked by _request_template(): UUIDs, long hex tokens (hashes, session /
+# object IDs) and any remaining digit runs
+_TEMPLATE_UUID_RE = re.compile(
+    r"[0-9a-f]{8}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{4}-[0-9a-f]{12}", re.IGNORECASE,
+)
+_TEMPLATE_HEX_RE = re.compile(r"\b(?=[0-9a-f]*\d)[0-9a-f]{16,}\b", re.IGNORECASE)
+_TEMPLATE_DIGITS_RE = re.compile(r"\d+")
+
+
+def _request_template(request: str) -> str:
+    """Request text with IDs and numbers masked (template dedup key)."""
+    request = _TEMPLATE_UUID_RE.sub("{uuid}", request)
+    request = _TEMPLATE_HEX_RE.sub("{hex}", request)
+    return _TEMPLATE_DIGITS_RE.sub("0", request)
+
+
+def _dedup_requests(requests: List[str], mode: str) -> Tuple[List[str], List[int]]:
+    """(distinct requests, index into them for every input row).
+
+    "exact" keys on the request text. "template" keys on _request_template(),
+    so the first request of each template stands in for the others: their
+    base scores are approximated by that representative's.
+    """
+    first: Dict[str, int] = {}
+    unique: List[str] = []
+    inverse: List[int] = []
+    for request in requests:
+        key = _request_template(request) if mode == "template" else request
+        index = first.get(key)
+        if index is None:
+            index = first[key] = len(unique)
+            unique.append(request)
+        inverse.append(index)
+    return unique, inverse
+
+
+def _merge_chunk_outputs(
+    chunk_outputs: List[Tuple[List[Dict], Dict[str, int]]]
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """Concatenate per-chunk (results, counts) in chunk order."""
+    results: List[Dict] = []
+    counts = dict.fromkeys(_BATCH_COUNT_KEYS, 0)
+    for chunk_results, chunk_counts in chunk_outputs:
+        results.extend(chunk_results)
+        for key, value in chunk_counts.items():
+            counts[key] += value
+    return results, counts
+
+
+def _expand_results(
+    requests: List[str], unique_results: List[Dict], inverse: List[int]
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """Scatter per-distinct-request results back to every original row."""
+    results: List[Dict] = []
+    counts = dict.fromkeys(_BATCH_COUNT_KEYS, 0)
+    for request, index in zip(requests, inverse):
+        result = unique_results[index]
+        results.append({**result, "raw_request": request})
+        counts[_THREAT_COUNT_KEYS.get(result["threat_type"], "unknown_attack")] += 1
+    return results, counts
+
+
+def _feature_matrix(requests: List[str], feature_columns: List[str]) -> np.ndarray:
+    """Base feature matrix for a chunk of raw requests, in `feature_columns` order."""
+    matrix = extract_features_matrix(requests)
+    if list(feature_columns) == FEATURE_COLUMNS:
+        return matrix
+    return matrix[:, [FEATURE_COLUMNS.index(col) for col in feature_columns]]
+
+
+def _extract_feature_rows(requests: List[str], feature_columns: List[str]) -> List[List[float]]:
+    """Extract base feature rows for a chunk of requests."""
+    return _feature_matrix(requests, feature_columns).tolist()
+
+
+def _score_feature_rows(
+    feature_rows: Union[List[List[float]], np.ndarray], model: Any, scaler: Any
+) -> List[float]:
+    """Score a chunk of base feature rows in one vectorized IsolationForest call."""
+    if not len(feature_rows):
+        return []
+    scaled = scaler.transform(np.asarray(feature_rows, dtype=np.float64))
+    return [float(score) for score in model.decision_function(scaled)]
+
+
+def _classify_batch_chunk(
+    requests: List[Union[str, ParsedRequest]], scores: List[float]
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """Apply the score thresholds + rule detectors to one scored chunk.
+
+    Returns (results, counts) where counts uses the BatchSummaryResponse keys.
+    """
+    results: List[Dict] = []
+    counts = dict.fromkeys(_BATCH_COUNT_KEYS, 0)
+
+    for request, score in zip(requests, scores):
+        req = ParsedRequest.of(request)
+        # Check UNKNOWN_ATTACK_THRESHOLD FIRST: if score >= it, always treat as Normal
+        if score >= MultiModelPredictor.UNKNOWN_ATTACK_THRESHOLD:
+            threat_type = "Normal"
+            is_anomaly = False
+        else:
+            is_if_anomaly = score < MultiModelPredictor.ANOMALY_THRESHOLD
+
+            # Rule detection runs independently of the IF score.
+            # Known attack patterns are caught even when IF says "normal".
+            rule_type: Optional[str] = None
+            if MultiModelPredictor._detect_sqli(req):
+                rule_type = "SQL Injection"
+            elif MultiModelPredictor._detect_xss(req):
+                rule_type = "XSS Attack"
+            elif MultiModelPredictor._detect_path_traversal(req):
+                rule_type = "Path Traversal"
+
+            # Anomaly if EITHER IF flags it OR a rule pattern matches
+            is_anomaly = is_if_anomaly or rule_type is not None
+
+            if rule_type:
+                threat_type = rule_type
+            elif is_if_anomaly:
+                threat_type = "Unknown Attack"
+            else:
+                threat_type = "Normal"
+
+        counts[_THREAT_COUNT_KEYS.get(threat_type, "unknown_attack")] += 1
+        results.append({
+            "raw_request": req.raw,
+            "anomaly_score": score,
+            "is_anomaly": is_anomaly,
+            "threat_type": threat_type,
+        })
+
+    return results, counts
+
+
+def _score_and_classify_chunk(
+    requests: List[str],
+    model: Any,
+    scaler: Any,
+    feature_columns: List[str],
+) -> Tuple[List[Dict], Dict[str, int]]:
+    """Local base model: extract, score and classify one chunk in a single task."""
+    scores = _score_feature_rows(_feature_matrix(requests, feature_columns), model, scaler)
+    return _classify_batch_chunk(requests, scores)
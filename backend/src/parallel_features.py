@@ -0,0 +1,98 @@
+"""
+CyHub — Parallel Feature Extraction
+
+Offline feature extraction (training, the predict.py CLI) ran on one core,
+so large corpora took minutes. extract_features_parallel() splits the
+request list into contiguous chunks and runs extract_features_matrix() on
+them in a ProcessPoolExecutor. Workers write their rows straight into one
+shared-memory FEATURE_COLUMNS matrix, so only the request strings are
+pickled, never the results.
+
+Every row is computed independently and lands at its original index, so the
+output is identical to the serial extract_features_matrix(), whatever the
+worker count or chunking.
+
+Environment:
+  FEATURE_WORKERS      default: CPU count (1 = serial, in-process)
+  FEATURE_CHUNK_ROWS   rows per worker task (default 50000)
+"""
+
+from __future__ import annotations
+
+import logging
+import math
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+from typing import List, Optional, Sequence
+
+import numpy as np
+
+from src.feature_engineering import FEATURE_COLUMNS, extract_features_matrix
+
+logger = logging.getLogger(__name__)
+
+# Below this many rows, extracting serially beats spawning worker processes
+MIN_PARALLEL_ROWS = 100000
+
+
+def default_workers() -> int:
+    """FEATURE_WORKERS, or the machine's CPU count."""
+    workers = int(os.getenv("FEATURE_WORKERS", "0"))
+    return workers if workers > 0 else (os.cpu_count() or 1)
+
+
+def _extract_into(shm_name: str, total_rows: int, start: int, requests: List[str]) -> int:
+    """Worker task: write the feature rows of requests[...] at `start`."""
+    # Workers share the parent's resource tracker, so attaching does not
+    # transfer ownership; the parent unlinks the segment
+    shm = SharedMemory(name=shm_name)
+    try:
+        out = np.ndarray((total_rows, len(FEATURE_COLUMNS)), dtype=np.float64, buffer=shm.buf)
+        out[start:start + len(requests)] = extract_features_matrix(requests)
+        del out
+    finally:
+        shm.close()
+    return len(requests)
+
+
+def extract_features_parallel(
+    requests: Sequence[str],
+    workers: Optional[int] = None,
+    chunk_rows: Optional[int] = None,
+) -> np.ndarray:
+    """FEATURE_COLUMNS matrix for `requests`, extracted on `workers` processes.
+
+    Same result as extract_features_matrix(requests); falls back to it for
+    one worker or fewer than `MIN_PARALLEL_ROWS` requests.
+    """
+    requests = list(requests)
+    workers = default_workers() if workers is None else max(1, workers)
+    if chunk_rows is None:
+        chunk_rows = int(os.getenv("FEATURE_CHUNK_ROWS", "50000"))
+    # Enough tasks to keep every worker busy, none larger than chunk_rows
+    chunk_rows = max(1, min(chunk_rows, math.ceil(len(requests) / (workers * 4))))
+    if workers == 1 or len(requests) < MIN_PARALLEL_ROWS:
+        return extract_features_matrix(requests)
+
+    shape = (len(requests), len(FEATURE_COLUMNS))
+    shm = SharedMemory(create=True, size=shape[0] * shape[1] * np.dtype(np.float64).itemsize)
+    try:
+        # spawn: same start method as the batch compute lane
+        with ProcessPoolExecutor(
+            max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+        ) as pool:
+            futures = [
+                pool.submit(_extract_into, shm.name, shape[0], start, requests[start:start + chunk_rows])
+                for start in range(0, len(requests), chunk_rows)
+            ]
+            done = sum(future.result() for future in futures)
+        logger.debug("Extracted %d feature rows on %d workers (%d tasks)", done, workers, len(futures))
+        view = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        matrix = view.copy()
+        del view
+        return matrix
+    finally:
+        shm.close()
+        shm.unlink()
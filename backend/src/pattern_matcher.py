@@ -0,0 +1,174 @@
+"""
+CyHub — Multi-Pattern Matcher
+
+The rule detectors (SQLi, XSS, path traversal) and the script-tag feature
+each looked for their own list of substrings, one `in` / `re.search` per
+pattern, so a request was rescanned ~60 times. The SQL keyword score did ten
+`re.search` calls with a freshly built pattern string each.
+
+MultiPatternMatcher compiles the literal patterns, grouped by category, into
+a few regexes built at import time. Each alternation is laid out as a trie
+(`<(?:script|svg|...)`), so the engine skips ahead to candidate first
+characters and then branches on the next character instead of trying every
+pattern. A regex reports the longest pattern starting at each match; any
+shorter pattern starting at the same position is a prefix of it, and is
+added back from a table built with the matcher. Matches are consumed, so the
+patterns are split into groups in which no pattern can start inside another
+("onload" and "document." can share a "d"), one regex per group. The rule
+catalog needs a handful of such passes, still cheaper than one overlapping
+lookahead scan, and together they return a hit set per category.
+
+`scan_rules()` runs the shared rule catalog over a request once and caches
+the hit sets on a ParsedRequest, so every detector reads the same scan.
+"""
+
+from __future__ import annotations
+
+import re
+from typing import Dict, FrozenSet, Iterable, List, Optional, Tuple, Union
+
+from src.request_parser import ParsedRequest
+
+RuleHits = Dict[str, FrozenSet[str]]
+
+# ── Rule catalog (all lowercase; matched against the lowered request) ──────
+RULE_PATTERNS: Dict[str, List[str]] = {
+    # High-confidence single patterns (rarely appear in legitimate traffic)
+    "sqli_strong": [
+        "' or '1'='1", "' or 1=1--", "' or ''='", "admin'--",
+        "union select", "drop table", "insert into",
+        "1=1", "1'='1", ";--", "exec(", "execute(",
+        "' or ", "' and ",
+    ],
+    # Weak patterns: only flag when 2+ co-occur (e.g. "select ... from")
+    "sqli_weak": ["select ", " from ", " where ", "@@", "char(", "--", "/*", "*/"],
+    # High-confidence: always malicious in HTTP request context
+    "xss_strong": [
+        "<script", "</script", "javascript:", "document.cookie",
+        "document.location", "expression(",
+    ],
+    "xss_event": ["onerror=", "onload=", "onclick=", "onmouseover=", "onfocus="],
+    "html_tag": ["<img", "<iframe", "<svg"],
+    "js_call": ["alert(", "eval(", "prompt(", "confirm("],
+    # High-confidence: encoded traversal or sensitive file targets
+    "traversal_strong": [
+        "%2e%2e", "..%2f", "%2f..", "....//", "..%5c", "%252e",
+        "/etc/passwd", "/etc/shadow", "c:\\windows", "c:/windows",
+    ],
+    # XSS / script injection patterns counted by the script_tag_score feature
+    "script": [
+        "<script", "</script", "onerror", "onload", "javascript:",
+        "eval(", "alert(", "document.", "window.",
+    ],
+}
+
+
+def _trie_alternatives(patterns: Iterable[str]) -> List[str]:
+    """Top-level regex alternatives for `patterns`, factored as a prefix trie.
+
+    Alternatives at a node start with distinct characters and an optional
+    tail is tried before ending, so the match is the longest pattern.
+    """
+    trie: Dict = {}
+    for pattern in patterns:
+        node = trie
+        for ch in pattern:
+            node = node.setdefault(ch, {})
+        node[""] = {}
+
+    def build(node: Dict) -> str:
+        branches = [re.escape(ch) + build(child) for ch, child in sorted(node.items()) if ch]
+        if not branches:
+            return ""
+        body = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+        return "(?:" + body + ")?" if "" in node else body
+
+    return [re.escape(ch) + build(child) for ch, child in sorted(trie.items())]
+
+
+def _overlap_free(patterns: List[str]) -> bool:
+    """True if no pattern can start strictly inside a match of another."""
+    for pattern in patterns:
+        for k in range(1, len(pattern)):
+            tail = pattern[k:]
+            if any(other.startswith(tail) or tail.startswith(other) for other in patterns):
+                return False
+    return True
+
+
+def _overlap_free_groups(patterns: Iterable[str]) -> List[List[str]]:
+    """Split patterns (longest first, greedily) into overlap-free groups."""
+    groups: List[List[str]] = []
+    for pattern in sorted(patterns, key=len, reverse=True):
+        for group in groups:
+            if _overlap_free(group + [pattern]):
+                group.append(pattern)
+                break
+        else:
+            groups.append([pattern])
+    return groups
+
+
+class MultiPatternMatcher:
+    """Find every literal pattern of every category in a few regex passes.
+
+    With a `separator`, each pass also matches that literal (reported as
+    itself), so one scan over separator-joined texts can tell them apart.
+    """
+
+    def __init__(self, categories: Dict[str, Iterable[str]], separator: Optional[str] = None):
+        self.categories = {name: tuple(patterns) for name, patterns in categories.items()}
+        owners: Dict[str, List[str]] = {}
+        for name, patterns in self.categories.items():
+            for pattern in patterns:
+                if not pattern:
+                    raise ValueError(f"Empty pattern in category {name!r}")
+                owners.setdefault(pattern, []).append(name)
+        if separator is not None and any(separator in pattern for pattern in owners):
+            raise ValueError(f"Separator {separator!r} occurs in a pattern")
+
+        extra = [re.escape(separator)] if separator is not None else []
+        # Group 1 of each match is the longest pattern of its group starting there
+        self.regexes = [
+            re.compile("(" + "|".join(extra + _trie_alternatives(group)) + ")")
+            for group in _overlap_free_groups(owners)
+        ]
+        # Longest pattern at a position → every (category, pattern) it implies
+        self._expand: Dict[str, Tuple[Tuple[str, str], ...]] = {
+            longest: tuple(
+                (name, pattern)
+                for pattern, names in owners.items() if longest.startswith(pattern)
+                for name in names
+            )
+            for longest in owners
+        }
+
+    def findall(self, text: str) -> List[List[str]]:
+        """Longest pattern (or separator) of every match, one list per pass."""
+        return [regex.findall(text) for regex in self.regexes]
+
+    def implied(self, longest: str) -> Tuple[Tuple[str, str], ...]:
+        """Every (category, pattern) found where `longest` matched."""
+        return self._expand[longest]
+
+    def scan(self, text: str) -> RuleHits:
+        """Patterns found in `text`, per category (every category present)."""
+        hits: Dict[str, set] = {name: set() for name in self.categories}
+        for regex in self.regexes:
+            for longest in set(regex.findall(text)):
+                for name, pattern in self._expand[longest]:
+                    hits[name].add(pattern)
+        return {name: frozenset(found) for name, found in hits.items()}
+
+
+RULE_MATCHER = MultiPatternMatcher(RULE_PATTERNS)
+
+
+def scan_rules(request: Union[str, ParsedRequest]) -> RuleHits:
+    """RULE_PATTERNS hits in a request (cached on a ParsedRequest)."""
+    if not isinstance(request, ParsedRequest):
+        return RULE_MATCHER.scan(request.lower())
+    hits = request.derived.get("rule_hits")
+    if hits is None:
+        hits = request.derived["rule_hits"] = RULE_MATCHER.scan(request.lower_text)
+    return hits
@@ -4,8 +4,12 @@ CyHub — Prediction Module
 Loads the trained Isolation Forest model and scores new HTTP requests.
 Provides both single-request and batch prediction capabilities.
 
+Batch results are columnar (BatchPrediction): score, label and feature
+arrays, with the per-request dicts only built when a caller indexes or
+iterates the result.
+
 Usage (CLI):
-    python src/predict.py --input data/test_traffic.csv
+    python src/predict.py --input data/test_traffic.csv [--workers N]
 
 Usage (Python):
     from src.predict import Predictor
@@ -18,14 +22,80 @@ from __future__ import annotations
 import os
 import sys
 import argparse
+from collections.abc import Sequence
 import joblib
 import pandas as pd
 import numpy as np
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterator, List, Optional, Tuple
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.feature_engineering import extract_features, extract_features_batch, FEATURE_COLUMNS
+from src.feature_engineering import extract_features, FEATURE_COLUMNS
+from src.parallel_features import extract_features_parallel
+
+
+class BatchPrediction(Sequence):
+    """Columnar result of Predictor.predict_batch().
+
+    Holds the anomaly scores, IsolationForest labels (1 = normal, -1 =
+    anomaly) and the feature matrix as arrays. Indexing or iterating yields
+    the same dicts as Predictor.predict(), built on demand.
+    """
+
+    def __init__(
+        self,
+        requests: List[str],
+        scores: np.ndarray,
+        labels: np.ndarray,
+        features: np.ndarray,
+        feature_columns: List[str],
+    ):
+        self.requests = requests
+        self.scores = scores
+        self.labels = labels
+        self.features = features
+        self.feature_columns = list(feature_columns)
+
+    def __len__(self) -> int:
+        return len(self.requests)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._row(i) for i in range(*index.indices(len(self)))]
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("BatchPrediction index out of range")
+        return self._row(index)
+
+    def __iter__(self) -> Iterator[Dict]:
+        return (self._row(i) for i in range(len(self)))
+
+    def _row(self, i: int) -> Dict:
+        return {
+            "raw_request": self.requests[i],
+            "anomaly_score": float(self.scores[i]),
+            "prediction": "Normal" if self.labels[i] == 1 else "Suspicious",
+            "features": dict(zip(self.feature_columns, self.features[i].tolist())),
+        }
+
+    @property
+    def suspicious(self) -> np.ndarray:
+        """Boolean mask of the requests labelled Suspicious."""
+        return self.labels != 1
+
+    @property
+    def predictions(self) -> np.ndarray:
+        """"Normal" / "Suspicious" per request."""
+        return np.where(self.suspicious, "Suspicious", "Normal")
+
+    def to_frame(self) -> pd.DataFrame:
+        """One row per request: raw_request, anomaly_score, prediction, features."""
+        df = pd.DataFrame(self.features, columns=self.feature_columns)
+        df.insert(0, "raw_request", self.requests)
+        df.insert(1, "anomaly_score", self.scores)
+        df.insert(2, "prediction", self.predictions)
+        return df
 
 
 class Predictor:
@@ -70,32 +140,29 @@ class Predictor:
             "features": features,
         }
 
-    def predict_batch(self, requests: List[str]) -> List[Dict]:
+    def predict_batch(self, requests: List[str], workers: Optional[int] = 1) -> BatchPrediction:
         """Score a batch of HTTP requests.
         
-        Returns a list of prediction dicts (same format as predict()).
+        Features are extracted on `workers` processes (None = FEATURE_WORKERS /
+        CPU count); the default of 1 stays in-process.
+        Returns a BatchPrediction: score / label / feature arrays that also
+        reads as a list of prediction dicts (same format as predict()).
         """
+        requests = list(requests)
         if not requests:
-            return []
+            return BatchPrediction(
+                [], np.empty(0), np.empty(0, dtype=int),
+                np.empty((0, len(self.feature_columns))), self.feature_columns,
+            )
         
-        features_df = extract_features_batch(requests)
-        X = features_df[self.feature_columns].values
+        matrix = extract_features_parallel(requests, workers)
+        X = matrix[:, [FEATURE_COLUMNS.index(col) for col in self.feature_columns]]
         
         X_scaled = self.scaler.transform(X)
         scores = self.model.decision_function(X_scaled)
         labels = self.model.predict(X_scaled)
         
-        results = []
-        for i, req in enumerate(requests):
-            features = {col: float(features_df.iloc[i][col]) for col in self.feature_columns}
-            results.append({
-                "raw_request": req,
-                "anomaly_score": float(scores[i]),
-                "prediction": "Normal" if labels[i] == 1 else "Suspicious",
-                "features": features,
-            })
-        
-        return results
+        return BatchPrediction(requests, scores, labels, X, self.feature_columns)
 
 
 def main():
@@ -104,6 +171,8 @@ def main():
                         help="Path to CSV file with 'request' column")
     parser.add_argument("--model", type=str, default="models/isolation_forest.pkl",
                         help="Path to trained model file")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Feature extraction processes (default: FEATURE_WORKERS / CPU count)")
     args = parser.parse_args()
 
     predictor = Predictor(args.model)
@@ -120,16 +189,16 @@ def main():
     requests = df["request"].tolist()
     print(f"[INFO] Scoring {len(requests)} requests...")
     
-    results = predictor.predict_batch(requests)
+    results = predictor.predict_batch(requests, workers=args.workers)
     
     print(f"\n{'='*80}")
     print(f"{'Request':<50} {'Score':>10} {'Label':>12}")
     print(f"{'='*80}")
-    for r in results:
-        req_display = r["raw_request"][:47] + "..." if len(r["raw_request"]) > 50 else r["raw_request"]
-        print(f"{req_display:<50} {r['anomaly_score']:>10.4f} {r['prediction']:>12}")
+    for req, score, label in zip(results.requests, results.scores.tolist(), results.predictions.tolist()):
+        req_display = req[:47] + "..." if len(req) > 50 else req
+        print(f"{req_display:<50} {score:>10.4f} {label:>12}")
     
-    n_suspicious = sum(1 for r in results if r["prediction"] == "Suspicious")
+    n_suspicious = int(results.suspicious.sum())
     print(f"\n[SUMMARY] {n_suspicious}/{len(results)} requests flagged as suspicious "
           f"({n_suspicious/len(results)*100:.1f}%)")
 
@@ -0,0 +1,128 @@
+"""
+CyHub — Parsed Request
+
+One raw HTTP request is inspected by several detectors on the /analyze path:
+the pre-gate payload scan, base feature extraction, Model 1 features, the
+traversal / SQLi / XSS rule checks and API-request detection. Each used to
+re-split, re-lowercase and re-count the same string.
+
+ParsedRequest is built once per request and handed to all of them. Every
+part and view (request line, headers, body, lowered / uppercased text,
+character histogram) is computed on first use and then cached, so
+construction is free and a detector only pays for what it reads. Feature
+builders also keep their results in `derived`, so e.g. Model 1 reuses the
+base keyword scores instead of rescanning.
+
+Every consumer still accepts a plain string and parses it on the spot.
+"""
+
+from __future__ import annotations
+
+from collections import Counter
+from functools import cached_property
+from typing import Any, Dict, Tuple, Union
+
+_API_METHODS = ("POST", "PUT", "DELETE", "PATCH")
+_API_CONTENT_TYPES = ("application/json", "application/xml", "application/x-www-form-urlencoded")
+
+
+class ParsedRequest:
+    """A raw HTTP request split into its parts, with cached derived views."""
+
+    def __init__(self, raw: str):
+        self.raw = raw
+        # Results computed from this request by feature builders (e.g. base features)
+        self.derived: Dict[str, Any] = {}
+
+    @cached_property
+    def _split(self) -> Tuple[str, str, Dict[str, str], str]:
+        lines = [line.rstrip("\r") for line in self.raw.splitlines()]
+        request_line = lines[0].strip() if lines else ""
+        parts = request_line.split()
+
+        method = parts[0] if len(parts) >= 1 else ""
+        url = parts[1] if len(parts) >= 2 else ""
+
+        headers: Dict[str, str] = {}
+        body_lines = []
+        in_body = False
+        for line in lines[1:]:
+            if not in_body:
+                if not line.strip():
+                    in_body = True
+                    continue
+                if ":" in line:
+                    key, value = line.split(":", 1)
+                    headers[key.strip().lower()] = value.strip()
+                    continue
+            body_lines.append(line)
+
+        return method, url, headers, "\n".join(body_lines).strip()
+
+    @classmethod
+    def of(cls, request: Union[str, "ParsedRequest"]) -> "ParsedRequest":
+        """Return `request` as a ParsedRequest, parsing it if it is a string."""
+        return request if isinstance(request, ParsedRequest) else cls(request)
+
+    @property
+    def method(self) -> str:
+        return self._split[0]
+
+    @property
+    def url(self) -> str:
+        return self._split[1]
+
+    @property
+    def headers(self) -> Dict[str, str]:
+        """Header names lowercased; a repeated header keeps its last value."""
+        return self._split[2]
+
+    @property
+    def body(self) -> str:
+        return self._split[3]
+
+    @property
+    def host(self) -> str:
+        return self.headers.get("host", "")
+
+    @property
+    def cookie(self) -> str:
+        return self.headers.get("cookie", "")
+
+    @property
+    def user_agent(self) -> str:
+        return self.headers.get("user-agent", "")
+
+    @property
+    def client_ip(self) -> str:
+        """Originating client: first X-Forwarded-For hop, else X-Real-IP ("" if neither)."""
+        forwarded = self.headers.get("x-forwarded-for", "").split(",")[0].strip()
+        return forwarded or self.headers.get("x-real-ip", "")
+
+    @cached_property
+    def lower_text(self) -> str:
+        return self.raw.lower()
+
+    @cached_property
+    def upper_text(self) -> str:
+        return self.raw.upper()
+
+    @cached_property
+    def char_counts(self) -> Counter:
+        """Character histogram of the raw request (first-seen order)."""
+        return Counter(self.raw)
+
+    @cached_property
+    def parts_text(self) -> str:
+        """Method, URL, body, cookie and user agent joined by newlines."""
+        return "\n".join(filter(None, [self.method, self.url, self.body, self.cookie, self.user_agent]))
+
+    @cached_property
+    def is_api(self) -> bool:
+        """API call (write method or API content type) vs. browser request."""
+        if not self.raw:
+            return False
+        return (
+            any(self.raw.startswith(m) for m in _API_METHODS)
+            or any(ct in self.raw for ct in _API_CONTENT_TYPES)
+        )
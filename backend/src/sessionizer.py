@@ -0,0 +1,233 @@
+"""
+CyHub — Online Sessionizer
+
+Model 2 only scored flows built offline from an uploaded CSV
+(bot_feature_builder.generate_flow_features), so live /analyze traffic never
+reached it. The Sessionizer keeps running aggregates for each active client
+IP and returns the same 14 BOT_FEATURE_COUNT flow features after every
+request, in constant time, without rereading the IP's history:
+
+  duration / count / rate     first and last timestamp, request count
+  unique_urls / repetition    URL counter and the largest count so far
+  unique_user_agents          set of user-agents seen
+  iat_mean / std / min / max  Welford running moments of inter-arrival times
+  burst_ratio                 requests in the busiest 10% of seconds, tracked
+                              with a histogram of per-second counts
+  hour_of_day                 hour (UTC) of the session's first request
+  url_entropy                 running Σ c·log2(c) of the URL counter
+  session_depth_mean          running sum of URL path depths
+
+Every feature matches generate_flow_features() over the same requests, up to
+float rounding in the running sums (iat moments, URL entropy).
+
+A session ends after SESSION_IDLE_SECONDS without requests; the next request
+from that IP starts a new one. The least recently seen IPs are dropped beyond
+SESSION_MAX_IPS.
+
+Environment:
+  SESSION_IDLE_SECONDS   idle gap that ends a session (default 600)
+  SESSION_MAX_IPS        sessions kept at once (default 100000)
+  SESSION_MIN_REQUESTS   requests before a session yields features (default 10)
+"""
+
+from __future__ import annotations
+
+import math
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+from src.bot_feature_builder import _url_depth
+from src.entropy import entropy_from_terms, entropy_term
+
+
+def _top_seconds(seconds: int) -> int:
+    """How many of a session's busiest seconds make up its burst (top 10%)."""
+    return max(1, int(seconds * 0.10))
+
+
+class _Session:
+    """Running flow aggregates of one IP's session."""
+
+    __slots__ = (
+        "first_ts", "last_ts", "count", "hour",
+        "url_counts", "top_url_count", "url_terms", "depth_sum", "user_agents",
+        "iat_mean", "iat_m2", "iat_min", "iat_max",
+        "second", "second_count", "seconds", "second_hist",
+        "burst_floor", "burst_above", "burst_sum",
+    )
+
+    def __init__(self, ts: float):
+        self.first_ts = self.last_ts = ts
+        self.count = 0
+        self.hour = time.gmtime(ts).tm_hour
+        self.url_counts: Dict[str, int] = {}
+        self.top_url_count = 0
+        self.url_terms = 0.0
+        self.depth_sum = 0
+        self.user_agents = set()
+        self.iat_mean = self.iat_m2 = 0.0
+        self.iat_min = math.inf
+        self.iat_max = -math.inf
+        # Per-second counts: only the current second can still grow, so the
+        # others live on as a histogram (count → number of seconds)
+        self.second = 0
+        self.second_count = 0
+        self.seconds = 0
+        self.second_hist: Dict[int, int] = {}
+        # The busiest _top_seconds() seconds: every second counting more
+        # than burst_floor (burst_above of them), plus enough seconds counting
+        # exactly burst_floor; burst_sum is their total
+        self.burst_floor = 0
+        self.burst_above = 0
+        self.burst_sum = 0
+
+    def add(self, ts: float, url: str, user_agent: str) -> None:
+        if self.count:
+            iat = ts - self.last_ts
+            k = self.count
+            delta = iat - self.iat_mean
+            self.iat_mean += delta / k
+            self.iat_m2 += delta * (iat - self.iat_mean)
+            self.iat_min = min(self.iat_min, iat)
+            self.iat_max = max(self.iat_max, iat)
+        self.last_ts = ts
+        self.count += 1
+
+        c = self.url_counts.get(url, 0)
+        self.url_counts[url] = c + 1
+        self.url_terms += entropy_term(c + 1) - entropy_term(c)
+        self.top_url_count = max(self.top_url_count, c + 1)
+        self.depth_sum += _url_depth(url)
+        if user_agent:
+            self.user_agents.add(user_agent)
+
+        second = math.floor(ts)
+        if self.seconds and second == self.second:
+            self._count_again()
+        else:
+            self._count_new_second(second)
+
+    def _bump(self, c: int) -> None:
+        """Move one second from count c to c + 1 in the histogram."""
+        hist = self.second_hist
+        hist[c] -= 1
+        if not hist[c]:
+            del hist[c]
+        hist[c + 1] = hist.get(c + 1, 0) + 1
+
+    def _count_new_second(self, second: int) -> None:
+        self.second, self.second_count = second, 1
+        self.seconds += 1
+        self.second_hist[1] = self.second_hist.get(1, 0) + 1
+        if self.seconds == 1:
+            self.burst_floor, self.burst_above, self.burst_sum = 1, 0, 1
+            return
+        top = _top_seconds(self.seconds)
+        if top == _top_seconds(self.seconds - 1):
+            return
+        # One more second joins the burst: another one at the floor if any is
+        # left out, else the busiest second below it (amortised O(1): the
+        # floor only rises one step per request)
+        if top - self.burst_above > self.second_hist.get(self.burst_floor, 0):
+            self.burst_above += self.second_hist.get(self.burst_floor, 0)
+            floor = self.burst_floor - 1
+            while floor not in self.second_hist:
+                floor -= 1
+            self.burst_floor = floor
+        self.burst_sum += self.burst_floor
+
+    def _count_again(self) -> None:
+        c = self.second_count
+        self.second_count = c + 1
+        self._bump(c)
+        floor = self.burst_floor
+        if c > floor:
+            self.burst_sum += 1
+        elif c == floor:
+            # A second at the floor is in the burst as long as one is taken
+            self.burst_sum += 1
+            self.burst_above += 1
+            if self.burst_above == _top_seconds(self.seconds):
+                self.burst_floor = floor + 1
+                self.burst_above -= self.second_hist[floor + 1]
+
+    def features(self) -> List[float]:
+        n = self.count
+        duration = self.last_ts - self.first_ts
+        if n > 1:
+            iats = [self.iat_mean, math.sqrt(self.iat_m2 / (n - 1)), self.iat_min, self.iat_max]
+        else:
+            iats = [0.0] * 4
+        return [
+            duration, float(n), float(len(self.url_counts)), n / max(duration, 1.0),
+            self.top_url_count / n, float(len(self.user_agents)),
+            *iats,
+            self.burst_sum / n if duration > 0 else 1.0,
+            float(self.hour),
+            entropy_from_terms(self.url_terms, n, len(self.url_counts)),
+            self.depth_sum / n,
+        ]
+
+
+class Sessionizer:
+    """Per-IP running Model 2 flow features for live traffic."""
+
+    def __init__(
+        self,
+        idle_seconds: Optional[float] = None,
+        max_ips: Optional[int] = None,
+        min_requests: Optional[int] = None,
+    ):
+        self.idle_seconds = (
+            float(os.getenv("SESSION_IDLE_SECONDS", "600")) if idle_seconds is None else idle_seconds
+        )
+        self.max_ips = int(os.getenv("SESSION_MAX_IPS", "100000")) if max_ips is None else max_ips
+        self.min_requests = (
+            int(os.getenv("SESSION_MIN_REQUESTS", "10")) if min_requests is None else min_requests
+        )
+        # Least recently seen first
+        self._sessions: "OrderedDict[str, _Session]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def update(
+        self, ip: str, url: str, timestamp: Optional[float] = None, user_agent: str = "",
+    ) -> Optional[List[float]]:
+        """Add one request to the IP's session and return its flow features.
+
+        Returns None until the session has `min_requests` requests. A
+        timestamp older than the session's last one counts as that one
+        (the offline builder sorts by time first).
+        """
+        ts = time.time() if timestamp is None else timestamp
+        session = self._sessions.get(ip)
+        if session is None or ts - session.last_ts > self.idle_seconds:
+            session = self._sessions[ip] = _Session(ts)
+        else:
+            ts = max(ts, session.last_ts)
+        self._sessions.move_to_end(ip)
+        session.add(ts, url, user_agent)
+        while len(self._sessions) > self.max_ips:
+            self._sessions.popitem(last=False)
+        return session.features() if session.count >= self.min_requests else None
+
+    def features(self, ip: str) -> Optional[List[float]]:
+        """The IP's current BOT_FEATURE_COUNT flow features (None if no session)."""
+        session = self._sessions.get(ip)
+        return session.features() if session is not None else None
+
+    def evict_idle(self, now: Optional[float] = None) -> int:
+        """Drop sessions idle for more than `idle_seconds`; returns how many."""
+        cutoff = (time.time() if now is None else now) - self.idle_seconds
+        evicted = 0
+        while self._sessions:
+            ip, session = next(iter(self._sessions.items()))
+            if session.last_ts >= cutoff:
+                break
+            del self._sessions[ip]
+            evicted += 1
+        return evicted
+
@@ -67,6 +67,7 @@ class ComprehensiveThreatReport(BaseModel):
     from_cache: bool
     request_type: str          # "Browser" | "API"
     explanation: List[str] = []   # Human-readable list of detected threat signals
+    deadline_skipped: List[str] = []   # Stages / models left out because the latency budget expired
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -194,6 +195,7 @@ def calculate_threat_scores(
     # static context-based weights (backwards-compatible).
     model1_ran = anomaly_result.get("model1_ran", True)
     model3_ran = anomaly_result.get("model3_ran", True)
+    model4_ran = model4_result.get("model4_ran", True)
 
     if weights is not None:
         w_url     = weights.get("w_url",     0.25)
@@ -215,6 +217,8 @@ def calculate_threat_scores(
 
         if not model3_ran:
             w_traffic = 0.0
+        if not model4_ran:
+            w_url = 0.0
         # Only zero payload weight if Model 1 didn't run AND no heuristic detected a threat
         if not model1_ran and payload_score == 0:
             w_payload = 0.0
@@ -327,6 +331,7 @@ async def generate_report(
     domain_suspicious = domain_classification in ("suspicious", "unknown", "phishing", "malware")
     model1_ran = anomaly_result.get("model1_ran", True)
     model3_ran = anomaly_result.get("model3_ran", True)
+    model4_ran = (model4_result or {}).get("model4_ran", True)
 
     weights = get_dynamic_weights(
         is_api_request=is_api_request,
@@ -335,6 +340,7 @@ async def generate_report(
         domain_suspicious=domain_suspicious,
         model1_ran=model1_ran,
         model3_ran=model3_ran,
+        model4_ran=model4_ran,
     )
 
     # 2. Calculate threat scores (5 signals with adaptive weights)
@@ -410,6 +416,11 @@ async def generate_report(
         from_cache=domain_check.get("from_cache", False) if domain_check else False,
         request_type="API" if is_api_request else "Browser",
         explanation=explanation,
+        deadline_skipped=(
+            (["domain"] if domain_check and domain_check.get("deadline_skipped") else [])
+            + (["model4"] if not model4_ran else [])
+            + list(anomaly_result.get("deadline_skipped", []))
+        ),
     )
 
 
@@ -0,0 +1,202 @@
+"""
+CyHub — Per-Stage Latency Tracing
+
+Lightweight span timing for the /analyze and /predict-url pipelines.
+
+A sampled request gets a Trace (trace ID + list of spans) stored in a
+contextvar; stages wrap themselves in `span("name")`, which records a
+perf_counter_ns start/duration. Tasks created by asyncio.gather inherit the
+contextvar, so parallel stages (Model 4 vs. anomaly models) land on the same
+trace. Work handed to executor threads is timed around the await.
+
+When a request is not sampled, `span()` is one contextvar lookup returning a
+shared no-op context manager.
+
+Finished traces feed per-stage histograms (fixed log-spaced buckets), exposed
+via `stage_histograms()`; the trace can also be returned to the client as a
+`Server-Timing` header.
+
+Environment:
+  TRACE_SAMPLE_RATE     fraction of requests traced, 0.0–1.0 (default 0.0)
+  TRACE_SERVER_TIMING   true → add Server-Timing to traced responses (default false)
+"""
+
+from __future__ import annotations
+
+import os
+import random
+import threading
+import time
+import uuid
+from bisect import bisect_left
+from contextvars import ContextVar, Token
+from typing import Any, Awaitable, Dict, List, Optional, Tuple
+
+TRACE_SAMPLE_RATE = float(os.getenv("TRACE_SAMPLE_RATE", "0.0"))
+TRACE_SERVER_TIMING = os.getenv("TRACE_SERVER_TIMING", "false").strip().lower() in ("1", "true", "yes")
+
+# Histogram bucket upper bounds in milliseconds (+inf implied)
+_BUCKETS_MS = (
+    0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 25.0, 50.0,
+    100.0, 250.0, 500.0, 1000.0, 2500.0, 5000.0, 10000.0,
+)
+
+
+class Trace:
+    """Spans recorded for one request."""
+
+    __slots__ = ("trace_id", "start_ns", "spans")
+
+    def __init__(self, trace_id: Optional[str] = None):
+        self.trace_id = trace_id or uuid.uuid4().hex
+        self.start_ns = time.perf_counter_ns()
+        self.spans: List[Tuple[str, int, int]] = []   # (name, start offset ns, duration ns)
+
+    def server_timing(self) -> str:
+        """Render spans as a Server-Timing header value (durations in ms)."""
+        parts = []
+        for name, _, duration_ns in self.spans:
+            parts.append(f"{name.replace('.', '_')};dur={duration_ns / 1e6:.3f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "trace_id": self.trace_id,
+            "spans": [
+                {"name": name, "start_ms": round(start / 1e6, 3), "duration_ms": round(dur / 1e6, 3)}
+                for name, start, dur in self.spans
+            ],
+        }
+
+
+_current: ContextVar[Optional[Trace]] = ContextVar("cyhub_trace", default=None)
+
+
+class _Span:
+    __slots__ = ("_trace", "_name", "_start")
+
+    def __init__(self, trace: Trace, name: str):
+        self._trace = trace
+        self._name = name
+        self._start = 0
+
+    def __enter__(self) -> "_Span":
+        self._start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        end = time.perf_counter_ns()
+        self._trace.spans.append((self._name, self._start - self._trace.start_ns, end - self._start))
+
+
+class _NoopSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+
+_NOOP = _NoopSpan()
+
+
+def span(name: str):
+    """Time a stage on the current trace; no-op when the request isn't sampled."""
+    trace = _current.get()
+    if trace is None:
+        return _NOOP
+    return _Span(trace, name)
+
+
+async def traced(name: str, awaitable: Awaitable[Any]) -> Any:
+    """Await `awaitable` inside span(name) — for stages scheduled via gather()."""
+    with span(name):
+        return await awaitable
+
+
+def current_trace() -> Optional[Trace]:
+    return _current.get()
+
+
+def start_trace(trace_id: Optional[str] = None, force: bool = False) -> Optional[Token]:
+    """Begin a trace for this request if sampled (or forced). Returns a reset token."""
+    if not force and (TRACE_SAMPLE_RATE <= 0.0 or random.random() >= TRACE_SAMPLE_RATE):
+        return None
+    return _current.set(Trace(trace_id))
+
+
+def finish_trace(token: Optional[Token]) -> Optional[Trace]:
+    """End the current trace, fold its spans into the stage histograms, and return it."""
+    if token is None:
+        return None
+    trace = _current.get()
+    _current.reset(token)
+    if trace is not None:
+        total_ns = time.perf_counter_ns() - trace.start_ns
+        _HISTOGRAMS.record("total", total_ns)
+        for name, _, duration_ns in trace.spans:
+            _HISTOGRAMS.record(name, duration_ns)
+    return trace
+
+
+class StageHistograms:
+    """Fixed-bucket latency histograms keyed by stage name."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._stages: Dict[str, List[float]] = {}   # name → [count, sum_ms, *bucket_counts]
+
+    def record(self, name: str, duration_ns: int) -> None:
+        ms = duration_ns / 1e6
+        index = bisect_left(_BUCKETS_MS, ms)
+        with self._lock:
+            cells = self._stages.get(name)
+            if cells is None:
+                cells = self._stages[name] = [0, 0.0] + [0] * (len(_BUCKETS_MS) + 1)
+            cells[0] += 1
+            cells[1] += ms
+            cells[2 + index] += 1
+
+    @staticmethod
+    def _quantile(buckets: List[int], count: int, q: float) -> float:
+        """Upper bucket bound containing the q-th observation."""
+        target = q * count
+        seen = 0
+        for bound, n in zip(_BUCKETS_MS, buckets):
+            seen += n
+            if seen >= target:
+                return bound
+        return float("inf")
+
+    def snapshot(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            stages = {name: list(cells) for name, cells in self._stages.items()}
+        result = {}
+        for name, cells in sorted(stages.items()):
+            count, total_ms, buckets = int(cells[0]), cells[1], [int(b) for b in cells[2:]]
+            result[name] = {
+                "count": count,
+                "mean_ms": round(total_ms / count, 3) if count else 0.0,
+                "p50_ms": self._quantile(buckets, count, 0.50),
+                "p90_ms": self._quantile(buckets, count, 0.90),
+                "p99_ms": self._quantile(buckets, count, 0.99),
+                "buckets_ms": {
+                    **{str(bound): n for bound, n in zip(_BUCKETS_MS, buckets)},
+                    "+Inf": buckets[-1],
+                },
+            }
+        return result
+
+    def reset(self) -> None:
+        with self._lock:
+            self._stages.clear()
+
+
+_HISTOGRAMS = StageHistograms()
+
+
+def stage_histograms() -> Dict[str, Dict[str, Any]]:
+    """Aggregated per-stage latency for all traced requests since startup."""
+    return _HISTOGRAMS.snapshot()
@@ -6,7 +6,7 @@ The model learns baseline traffic patterns and can then detect anomalous
 requests as statistical outliers.
 
 Usage:
-    python src/train_model.py
+    python src/train_model.py [--input data/normal_traffic.csv] [--workers N]
 
 Outputs:
     models/isolation_forest.pkl — serialized model + scaler pipeline
@@ -14,8 +14,11 @@ Outputs:
 
 from __future__ import annotations
 
+import argparse
 import os
 import sys
+from typing import Optional
+
 import joblib
 import pandas as pd
 import numpy as np
@@ -24,7 +27,8 @@ from sklearn.preprocessing import StandardScaler
 
 sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from src.feature_engineering import extract_features_batch, FEATURE_COLUMNS
+from src.feature_engineering import FEATURE_COLUMNS
+from src.parallel_features import extract_features_parallel
 
 
 def load_training_data(path: str = "data/normal_traffic.csv") -> pd.DataFrame:
@@ -51,12 +55,13 @@ def train_model(
     model_path: str = "models/isolation_forest.pkl",
     contamination: float = 0.05,
     random_state: int = 42,
+    workers: Optional[int] = None,
 ) -> None:
     """Train the Isolation Forest model and save to disk.
     
     Pipeline:
         1. Load normal traffic CSV
-        2. Extract feature vectors
+        2. Extract feature vectors (on `workers` processes, see parallel_features)
         3. Scale features with StandardScaler
         4. Fit Isolation Forest on scaled features
         5. Serialize model + scaler to .pkl
@@ -65,8 +70,7 @@ def train_model(
     requests = df["request"].tolist()
     
     print("[INFO] Extracting features...")
-    features_df = extract_features_batch(requests)
-    X = features_df[FEATURE_COLUMNS].values
+    X = extract_features_parallel(requests, workers)
     print(f"[INFO] Feature matrix shape: {X.shape}")
     
     print("[INFO] Fitting StandardScaler...")
@@ -103,4 +107,10 @@ def train_model(
 
 
 if __name__ == "__main__":
-    train_model()
+    parser = argparse.ArgumentParser(description="CyHub — Train the base Isolation Forest")
+    parser.add_argument("--input", type=str, default="data/normal_traffic.csv")
+    parser.add_argument("--output", type=str, default="models/isolation_forest.pkl")
+    parser.add_argument("--workers", type=int, default=None,
+                        help="Feature extraction processes (default: FEATURE_WORKERS / CPU count)")
+    args = parser.parse_args()
+    train_model(args.input, args.output, workers=args.workers)
@@ -0,0 +1,101 @@
+"""
+CyHub — Model 1 Training Script (Payload / Injection Attack)
+
+Trains a local RandomForest on labelled HTTP requests using the same
+11-feature vector that is sent to the Model 1 HuggingFace Space, so the
+artifact can serve as an in-process replacement (MODEL1_BACKEND=local|auto).
+
+Usage:
+    python src/train_model1.py [--input data/payload_traffic.csv]
+
+Input CSV columns:
+    request  raw HTTP request string
+    label    1 = attack, 0 = benign
+
+Outputs:
+    models/model1_payload.pkl — serialized model pipeline
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.multi_predict import _extract_model1_features
+
+MODEL1_FEATURE_COLUMNS = [
+    "request_length", "url_depth", "parameter_count", "special_char_count",
+    "digit_ratio", "shannon_entropy", "sql_keyword_score", "script_tag_score",
+    "path_traversal_score", "cookie_length", "user_agent_length",
+]
+
+
+def load_training_data(path: str) -> pd.DataFrame:
+    """Load labelled request samples from CSV."""
+    if not os.path.exists(path):
+        print(f"[ERROR] Training data not found at: {path}")
+        print("        Expected a CSV with 'request' and 'label' columns.")
+        sys.exit(1)
+
+    df = pd.read_csv(path)
+    missing = {"request", "label"} - set(df.columns)
+    if missing:
+        print(f"[ERROR] CSV is missing columns: {sorted(missing)}")
+        sys.exit(1)
+
+    df = df.dropna(subset=["request", "label"])
+    print(f"[INFO] Loaded {len(df)} labelled samples from {path}")
+    return df
+
+
+def train_model1(
+    data_path: str = "data/payload_traffic.csv",
+    model_path: str = "models/model1_payload.pkl",
+    random_state: int = 42,
+) -> None:
+    """Train the local Model 1 classifier and save it to disk."""
+    df = load_training_data(data_path)
+
+    print("[INFO] Extracting Model 1 features...")
+    X = np.vstack([_extract_model1_features(str(r)) for r in df["request"]])
+    y = df["label"].astype(int).values
+    print(f"[INFO] Feature matrix shape: {X.shape}")
+
+    print("[INFO] Training RandomForest...")
+    model = RandomForestClassifier(
+        n_estimators=200,
+        class_weight="balanced",
+        random_state=random_state,
+        n_jobs=-1,
+    )
+    model.fit(X, y)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    pipeline = {
+        "model": model,
+        "scaler": None,
+        "feature_columns": MODEL1_FEATURE_COLUMNS,
+        "positive_class": 1,
+        "threshold": 0.5,
+        "n_training_samples": len(y),
+    }
+    joblib.dump(pipeline, model_path)
+    print(f"[SUCCESS] Model 1 saved to {model_path}")
+    print(f"[STATS] Training accuracy: {model.score(X, y):.4f} "
+          f"({int(y.sum())}/{len(y)} attack samples)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CyHub — Train local Model 1 (payload)")
+    parser.add_argument("--input", type=str, default="data/payload_traffic.csv")
+    parser.add_argument("--output", type=str, default="models/model1_payload.pkl")
+    args = parser.parse_args()
+    train_model1(args.input, args.output)
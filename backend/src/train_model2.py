@@ -0,0 +1,102 @@
+"""
+CyHub — Model 2 Training Script (Bot / Botnet Activity)
+
+Trains a local RandomForest on per-IP sessions built with the same
+14-feature flow vector used by /bot-analysis, so the artifact can serve as
+an in-process replacement for the Model 2 Space (MODEL2_BACKEND=local|auto).
+
+Usage:
+    python src/train_model2.py [--input data/bot_traffic.csv]
+
+Input CSV columns:
+    timestamp, ip, url [, user_agent]   access-log rows
+    label                               1 = bot, 0 = human (a session is a bot
+                                        if any of its rows is labelled 1)
+
+Outputs:
+    models/model2_bot.pkl — serialized model pipeline
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import joblib
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.bot_feature_builder import generate_flow_features
+
+MODEL2_FEATURE_COLUMNS = [
+    "flow_duration", "packet_count", "unique_urls", "request_rate",
+    "url_repetition_ratio", "unique_user_agents", "iat_mean", "iat_std",
+    "iat_min", "iat_max", "burst_ratio", "hour_of_day", "url_entropy",
+    "session_depth_mean",
+]
+
+
+def load_training_data(path: str) -> pd.DataFrame:
+    """Load labelled access-log rows from CSV."""
+    if not os.path.exists(path):
+        print(f"[ERROR] Training data not found at: {path}")
+        print("        Expected a CSV with 'timestamp', 'ip', 'url' and 'label' columns.")
+        sys.exit(1)
+
+    df = pd.read_csv(path)
+    missing = {"timestamp", "ip", "url", "label"} - set(df.columns)
+    if missing:
+        print(f"[ERROR] CSV is missing columns: {sorted(missing)}")
+        sys.exit(1)
+
+    print(f"[INFO] Loaded {len(df)} log rows from {path}")
+    return df
+
+
+def train_model2(
+    data_path: str = "data/bot_traffic.csv",
+    model_path: str = "models/model2_bot.pkl",
+    random_state: int = 42,
+) -> None:
+    """Train the local Model 2 classifier and save it to disk."""
+    df = load_training_data(data_path)
+
+    print("[INFO] Building per-IP flow features...")
+    ip_labels, X = generate_flow_features(df)
+    session_labels = df.groupby(df["ip"].astype(str))["label"].max()
+    y = session_labels.loc[ip_labels].astype(int).values
+    print(f"[INFO] Feature matrix shape: {X.shape}")
+
+    print("[INFO] Training RandomForest...")
+    model = RandomForestClassifier(
+        n_estimators=200,
+        class_weight="balanced",
+        random_state=random_state,
+        n_jobs=-1,
+    )
+    model.fit(X, y)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    pipeline = {
+        "model": model,
+        "scaler": None,
+        "feature_columns": MODEL2_FEATURE_COLUMNS,
+        "positive_class": 1,
+        "threshold": 0.5,
+        "n_training_samples": len(y),
+    }
+    joblib.dump(pipeline, model_path)
+    print(f"[SUCCESS] Model 2 saved to {model_path}")
+    print(f"[STATS] Training accuracy: {model.score(X, y):.4f} "
+          f"({int(y.sum())}/{len(y)} bot sessions)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CyHub — Train local Model 2 (bot)")
+    parser.add_argument("--input", type=str, default="data/bot_traffic.csv")
+    parser.add_argument("--output", type=str, default="models/model2_bot.pkl")
+    args = parser.parse_args()
+    train_model2(args.input, args.output)
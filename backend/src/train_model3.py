@@ -0,0 +1,112 @@
+"""
+CyHub — Model 3 Training Script (Network Traffic Anomaly)
+
+Trains a local RandomForest on CIC-IDS style flow records, applying the same
+18 → 35 feature engineering used when Model 3 is queried, so the artifact can
+serve as an in-process replacement (MODEL3_BACKEND=local|auto).
+
+Usage:
+    python src/train_model3.py [--input data/traffic_flows.csv]
+
+Input CSV columns:
+    the 18 base flow columns (Flow Duration, Flow Bytes/s, ... Idle Max)
+    Label   "BENIGN" / 0 = normal, anything else = attack
+
+Outputs:
+    models/model3_traffic.pkl — serialized model pipeline
+"""
+
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+
+import joblib
+import numpy as np
+import pandas as pd
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from src.multi_predict import _BASE_COLS, _LOG_COLS, _engineer_model3_matrix
+
+MODEL3_FEATURE_COLUMNS = (
+    _BASE_COLS
+    + [f"log_{c}" for c in _LOG_COLS]
+    + [
+        "fwd_bwd_pkt_ratio", "fwd_bwd_len_ratio", "bytes_per_pkt",
+        "iat_variability", "pkt_std_to_mean", "active_idle_ratio",
+    ]
+)
+
+
+def load_training_data(path: str) -> pd.DataFrame:
+    """Load labelled flow records from CSV."""
+    if not os.path.exists(path):
+        print(f"[ERROR] Training data not found at: {path}")
+        print("        Expected a CSV with the 18 base flow columns and a 'Label' column.")
+        sys.exit(1)
+
+    df = pd.read_csv(path)
+    df.columns = [c.strip() for c in df.columns]
+    missing = (set(_BASE_COLS) | {"Label"}) - set(df.columns)
+    if missing:
+        print(f"[ERROR] CSV is missing columns: {sorted(missing)}")
+        sys.exit(1)
+
+    print(f"[INFO] Loaded {len(df)} flow records from {path}")
+    return df
+
+
+def _encode_labels(labels: pd.Series) -> np.ndarray:
+    """Map BENIGN/0 → 0 and every attack label → 1."""
+    normalized = labels.astype(str).str.strip().str.upper()
+    return (~normalized.isin({"BENIGN", "NORMAL", "0"})).astype(int).values
+
+
+def train_model3(
+    data_path: str = "data/traffic_flows.csv",
+    model_path: str = "models/model3_traffic.pkl",
+    random_state: int = 42,
+) -> None:
+    """Train the local Model 3 classifier and save it to disk."""
+    df = load_training_data(data_path)
+
+    print("[INFO] Engineering 35 traffic features...")
+    base = df[_BASE_COLS].astype(np.float64).values
+    base = np.where(np.isfinite(base), base, 0.0)
+    X = _engineer_model3_matrix(base)
+    y = _encode_labels(df["Label"])
+    print(f"[INFO] Feature matrix shape: {X.shape}")
+
+    print("[INFO] Training RandomForest...")
+    model = RandomForestClassifier(
+        n_estimators=200,
+        class_weight="balanced",
+        random_state=random_state,
+        n_jobs=-1,
+    )
+    model.fit(X, y)
+
+    os.makedirs(os.path.dirname(model_path), exist_ok=True)
+    pipeline = {
+        "model": model,
+        "scaler": None,
+        "feature_columns": MODEL3_FEATURE_COLUMNS,
+        "positive_class": 1,
+        "threshold": 0.5,
+        "n_training_samples": len(y),
+    }
+    joblib.dump(pipeline, model_path)
+    print(f"[SUCCESS] Model 3 saved to {model_path}")
+    print(f"[STATS] Training accuracy: {model.score(X, y):.4f} "
+          f"({int(y.sum())}/{len(y)} attack flows)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="CyHub — Train local Model 3 (traffic)")
+    parser.add_argument("--input", type=str, default="data/traffic_flows.csv")
+    parser.add_argument("--output", type=str, default="models/model3_traffic.pkl")
+    args = parser.parse_args()
+    train_model3(args.input, args.output)
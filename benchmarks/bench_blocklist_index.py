@@ -0,0 +1,51 @@
+"""
+Blocklist lookups against a BlocklistIndex of a feed-sized blocklist:
+build time, snapshot size and open time, and per-lookup cost.
+
+Usage (from the repo root):
+    python benchmarks/bench_blocklist_index.py [--domains 1000000] [--lookups 200000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, "backend")
+
+from src.blocklist_index import BlocklistIndex, BlocklistIndexBuilder
+
+
+def main(domains: int, lookups: int) -> None:
+    builder = BlocklistIndexBuilder()
+    for i in range(domains):
+        builder.add(f"malicious-{i}.example", ("malware", "phishing", "betting")[i % 3], "urlhaus")
+    start = time.perf_counter()
+    index = builder.build()
+    print(f"build            {time.perf_counter() - start:7.2f} s   ({domains} domains, {index.probes} probes)")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "blocklist.idx")
+        index.save(path)
+        start = time.perf_counter()
+        mapped = BlocklistIndex.open(path)
+        print(f"open snapshot    {(time.perf_counter() - start) * 1e3:7.2f} ms  "
+              f"({os.path.getsize(path) / 2**20:.1f} MiB)")
+
+        for label, names in (
+            ("clean domain", [f"shop-{i}.example" for i in range(lookups)]),
+            ("blocked domain", [f"malicious-{i * 7 % domains}.example" for i in range(lookups)]),
+        ):
+            start = time.perf_counter()
+            found = sum(mapped.lookup(name) is not None for name in names)
+            elapsed = time.perf_counter() - start
+            print(f"{label:16s} {elapsed / lookups * 1e6:7.2f} us/lookup   ({found} found)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--domains", type=int, default=1000000)
+    parser.add_argument("--lookups", type=int, default=200000)
+    args = parser.parse_args()
+    main(args.domains, args.lookups)
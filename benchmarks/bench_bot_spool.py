@@ -0,0 +1,66 @@
+"""
+Peak memory and time of /bot-analysis flow features for a large access log,
+loaded whole vs partitioned by IP on disk (flow_features_from_csv).
+
+Usage (from the repo root):
+    python benchmarks/bench_bot_spool.py [--rows 1000000] [--ips 20000]
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "backend")
+
+from src.bot_feature_builder import flow_features_from_csv, generate_flow_features
+
+
+def _write_log(path: str, rows: int, ips: int) -> None:
+    rng = np.random.RandomState(0)
+    urls = np.array(["/", "/login", "/api/v1/items/3", "/static/app.js", "/search?q=x"])
+    pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-03-01") + pd.to_timedelta(np.sort(rng.randint(0, 86400 * 10**6, rows)), unit="us"),
+        "ip": rng.choice([f"10.{i // 65536}.{i // 256 % 256}.{i % 256}" for i in range(ips)], size=rows),
+        "url": urls[rng.randint(0, len(urls), size=rows)],
+        "user_agent": rng.choice(["curl/8.0", "Mozilla/5.0", "python-requests/2.31"], size=rows),
+    }).to_csv(path, index=False)
+
+
+def _measure(fn, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return result, elapsed, peak
+
+
+def main(rows: int, ips: int) -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "access.csv")
+        _write_log(path, rows, ips)
+        print(f"log: {rows} rows, {ips} IPs, {os.path.getsize(path) / 2**20:.0f} MiB")
+
+        (labels, matrix), in_memory_s, in_memory_peak = _measure(
+            lambda p: generate_flow_features(pd.read_csv(p)), path
+        )
+        print(f"in memory        {in_memory_s:7.2f} s   peak {in_memory_peak / 2**20:7.1f} MiB")
+
+        (spool_labels, spool_matrix), spool_s, spool_peak = _measure(flow_features_from_csv, path)
+        assert spool_labels == labels and np.array_equal(spool_matrix, matrix)
+        print(f"partitioned      {spool_s:7.2f} s   peak {spool_peak / 2**20:7.1f} MiB")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=1000000)
+    parser.add_argument("--ips", type=int, default=20000)
+    args = parser.parse_args()
+    main(args.rows, args.ips)
@@ -0,0 +1,68 @@
+"""
+Shannon entropy of request-sized strings: the former Counter loop vs. the
+shared src.entropy kernel, per call and batched.
+
+Usage (from the repo root):
+    python benchmarks/bench_entropy.py [--rows 100000]
+"""
+
+import argparse
+import math
+import os
+import sys
+import time
+from collections import Counter
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_feature_matrix import _requests
+from src.entropy import shannon_entropy, shannon_entropy_batch
+
+
+def _counter_entropy(s: str) -> float:
+    """The per-request implementation this kernel replaced."""
+    if not s:
+        return 0.0
+    entropy = 0.0
+    for count in Counter(s).values():
+        p = count / len(s)
+        entropy -= p * math.log2(p)
+    return entropy
+
+
+def _cjk(rows: int, chars: int = 1000):
+    """Wide-alphabet rows: up to `chars` distinct code points each."""
+    rng = np.random.default_rng(7)
+    codes = rng.integers(0x4E00, 0x4E00 + 20000, size=(rows, chars))
+    return ["".join(map(chr, row)) for row in codes.tolist()]
+
+
+def _timed(label: str, fn, rows: int, baseline: float = 0.0) -> float:
+    start = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - start
+    speedup = f"   ({baseline / elapsed:.1f}x)" if baseline else ""
+    print(f"{label:<22} {elapsed:7.3f} s   {elapsed / rows * 1e6:6.2f} us/string{speedup}")
+    return elapsed, result
+
+
+def main(rows: int) -> None:
+    for label, texts in (
+        ("requests", _requests(rows)),
+        ("4 KB bodies", [r * 80 for r in _requests(max(1, rows // 20))]),
+        ("CJK text", _cjk(max(1, rows // 50))),
+    ):
+        print(f"-- {label} (mean {sum(map(len, texts)) / len(texts):.0f} chars)")
+        base, old = _timed("Counter loop", lambda: [_counter_entropy(t) for t in texts], len(texts))
+        _, new = _timed("shannon_entropy", lambda: [shannon_entropy(t) for t in texts], len(texts), base)
+        _, batch = _timed("shannon_entropy_batch", lambda: shannon_entropy_batch(texts), len(texts), base)
+        assert np.allclose(old, new) and np.array_equal(new, batch)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=100000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,71 @@
+"""
+Event-loop lag while a large /predict/batch job is scoring.
+
+Runs predict_batch_with_threshold on N synthetic requests and, concurrently,
+a 1 ms ticker that records how late each wake-up is. With the batch lane in
+process mode the loop should stay responsive (sub-millisecond p99 lag).
+
+Usage (from the repo root, after `python backend/src/train_model.py`):
+    python benchmarks/bench_event_loop_lag.py [--rows 100000] [--pool process|thread]
+"""
+
+import argparse
+import asyncio
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+
+
+async def _ticker(lags, stop):
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(0.001)
+        lags.append(time.perf_counter() - start - 0.001)
+
+
+async def main(rows: int, model_path: str) -> None:
+    from src.multi_predict import MultiModelPredictor
+    from src.compute_pool import shutdown_compute_pool
+
+    predictor = MultiModelPredictor(base_model_path=model_path)
+    templates = [
+        "GET /api/users?page={i}&limit=20 HTTP/1.1",
+        "POST /api/login HTTP/1.1\nContent-Type: application/json\n\n{{\"user\": \"u{i}\"}}",
+        "GET /search?q=item{i}' OR 1=1-- HTTP/1.1",
+        "GET /static/js/app.{i}.js HTTP/1.1",
+    ]
+    requests = [templates[i % len(templates)].format(i=i) for i in range(rows)]
+
+    lags = []
+    stop = asyncio.Event()
+    ticker = asyncio.create_task(_ticker(lags, stop))
+
+    start = time.perf_counter()
+    result = await predictor.predict_batch_with_threshold(requests)
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await ticker
+    predictor.shutdown()
+    shutdown_compute_pool()
+
+    lag_ms = np.array(lags) * 1000
+    print(f"rows={result['total_requests']} batch_time={elapsed:.2f}s "
+          f"pool={os.getenv('COMPUTE_BATCH_POOL', 'process')}")
+    print(f"loop lag ms: p50={np.percentile(lag_ms, 50):.3f} "
+          f"p99={np.percentile(lag_ms, 99):.3f} max={lag_ms.max():.3f} (n={len(lag_ms)})")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--rows", type=int, default=100_000)
+    parser.add_argument("--pool", choices=["process", "thread"], default=None)
+    parser.add_argument("--model", default="backend/models/isolation_forest.pkl")
+    args = parser.parse_args()
+    if args.pool:
+        os.environ["COMPUTE_BATCH_POOL"] = args.pool
+    asyncio.run(main(args.rows, args.model))
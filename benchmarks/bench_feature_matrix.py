@@ -0,0 +1,64 @@
+"""
+Base feature extraction for a training-sized column of requests: per-row
+extract_features() dicts vs. the column-wise extract_features_matrix().
+
+Usage (from the repo root):
+    python benchmarks/bench_feature_matrix.py [--rows 1000000]
+"""
+
+import argparse
+import random
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "backend")
+
+from src.feature_engineering import FEATURE_COLUMNS, extract_features, extract_features_matrix
+
+TEMPLATES = [
+    "GET /api/users?page={n}&limit=20 HTTP/1.1",
+    "GET /products/{uuid}/reviews?sort=new HTTP/1.1",
+    "POST /api/login HTTP/1.1",
+    "GET /search?q=laptop+{n}&lang=en HTTP/1.1",
+    "GET /login?user=admin' OR 1=1-- HTTP/1.1",
+    "GET /a?q=<script>alert(document.cookie)</script>",
+    "GET /static/../../../etc/passwd HTTP/1.1",
+    "GET /x?a=SELECT name FROM users WHERE id={n}",
+]
+
+
+def _requests(rows: int) -> list:
+    rng = random.Random(0)
+    return [
+        rng.choice(TEMPLATES).format(
+            n=rng.randint(0, 99999),
+            uuid="%08x-%04x-%04x-%04x-%012x" % tuple(rng.getrandbits(b) for b in (32, 16, 16, 16, 48)),
+        )
+        for _ in range(rows)
+    ]
+
+
+def main(rows: int) -> None:
+    requests = _requests(rows)
+
+    start = time.perf_counter()
+    per_row = pd.DataFrame([extract_features(r) for r in requests])[FEATURE_COLUMNS].values
+    per_row_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = extract_features_matrix(requests)
+    matrix_s = time.perf_counter() - start
+
+    assert np.array_equal(per_row, matrix)
+    print(f"per-row dicts    {per_row_s:7.2f} s   {per_row_s / rows * 1e6:6.2f} us/request")
+    print(f"column-wise      {matrix_s:7.2f} s   {matrix_s / rows * 1e6:6.2f} us/request   "
+          f"({per_row_s / matrix_s:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=200000)
+    main(parser.parse_args().rows)
@@ -0,0 +1,67 @@
+"""
+Compiled IsolationForest vs sklearn decision_function.
+
+Compares single-request latency (the /analyze hot path) and batch throughput
+on the trained base model, and checks the scores agree.
+
+Usage (from the repo root, after `python backend/src/train_model.py`):
+    python benchmarks/bench_forest_compiler.py [--rows 10000]
+"""
+
+import argparse
+import sys
+import time
+import warnings
+
+import joblib
+import numpy as np
+
+sys.path.insert(0, "backend")
+warnings.filterwarnings("ignore")
+
+from src.forest_compiler import CompiledForest
+
+
+def _per_call_us(fn, rows, repeat):
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(rows[i % len(rows)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(model_path: str, rows: int) -> None:
+    pipeline = joblib.load(model_path)
+    model, scaler = pipeline["model"], pipeline["scaler"]
+
+    start = time.perf_counter()
+    compiled = CompiledForest.from_pipeline(pipeline)
+    compile_ms = (time.perf_counter() - start) * 1000
+    print(f"compiled {compiled.n_estimators} trees / {len(compiled.value)} nodes "
+          f"in {compile_ms:.1f} ms (max depth {compiled.max_depth})")
+
+    rng = np.random.RandomState(0)
+    X = np.abs(rng.randn(rows, compiled.n_features)) * (scaler.scale_ * 2) + scaler.mean_
+
+    singles = X[:, None, :]
+    sk_us = _per_call_us(lambda r: model.decision_function(scaler.transform(r)), singles, 300)
+    cf_us = _per_call_us(compiled.score_one, singles, 3000)
+    print(f"single row: sklearn {sk_us:8.1f} us   compiled {cf_us:8.1f} us   "
+          f"({sk_us / cf_us:.0f}x)")
+
+    start = time.perf_counter()
+    expected = model.decision_function(scaler.transform(X))
+    sk_s = time.perf_counter() - start
+    start = time.perf_counter()
+    got = compiled.decision_function(X)
+    cf_s = time.perf_counter() - start
+    print(f"batch {rows}: sklearn {sk_s * 1000:8.1f} ms   compiled {cf_s * 1000:8.1f} ms   "
+          f"({sk_s / cf_s:.1f}x)")
+    print(f"max |score diff| = {np.abs(expected - got).max():.2e}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--model", default="backend/models/isolation_forest.pkl")
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.model, args.rows)
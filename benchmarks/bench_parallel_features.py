@@ -0,0 +1,47 @@
+"""
+Base feature extraction for a training-sized column of requests on 1..N
+worker processes with extract_features_parallel().
+
+Usage (from the repo root):
+    python benchmarks/bench_parallel_features.py [--rows 1000000] [--workers 1,2,4,8]
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from bench_feature_matrix import _requests
+from src.feature_engineering import extract_features_matrix
+from src.parallel_features import extract_features_parallel
+
+
+def main(rows: int, workers: list) -> None:
+    requests = _requests(rows)
+
+    start = time.perf_counter()
+    serial = extract_features_matrix(requests)
+    serial_s = time.perf_counter() - start
+    print(f"cpus: {os.cpu_count()}")
+    print(f"serial           {serial_s:7.2f} s   {serial_s / rows * 1e6:6.2f} us/request")
+
+    for n in workers:
+        start = time.perf_counter()
+        matrix = extract_features_parallel(requests, workers=n)
+        elapsed = time.perf_counter() - start
+        assert np.array_equal(serial, matrix)
+        print(f"{n:2d} workers       {elapsed:7.2f} s   {elapsed / rows * 1e6:6.2f} us/request   "
+              f"({serial_s / elapsed:.1f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--rows", type=int, default=400000)
+    parser.add_argument("--workers", type=str, default="1,2,4")
+    args = parser.parse_args()
+    main(args.rows, [int(n) for n in args.workers.split(",")])
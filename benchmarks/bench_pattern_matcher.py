@@ -0,0 +1,58 @@
+"""
+Per-request CPU time of the rule pattern checks: one substring / regex search
+per pattern vs. the compiled MultiPatternMatcher.
+
+Both sides compute the same results — the SQLi / XSS / traversal rule hits,
+the script-tag score and the SQL keyword score — for the /analyze samples of
+bench_request_parser.
+
+Usage (from the repo root):
+    python benchmarks/bench_pattern_matcher.py [--repeat 20000]
+"""
+
+import argparse
+import re
+import sys
+import time
+
+sys.path.insert(0, "backend")
+sys.path.insert(0, "benchmarks")
+
+from bench_request_parser import SAMPLES
+from src.feature_engineering import SQL_KEYWORDS, compute_sql_keyword_score
+from src.pattern_matcher import RULE_PATTERNS, scan_rules
+
+
+def _per_pattern(raw: str) -> tuple:
+    lower, upper = raw.lower(), raw.upper()
+    hits = {name: {p for p in patterns if p in lower} for name, patterns in RULE_PATTERNS.items()}
+    keywords = sum(1 for kw in SQL_KEYWORDS if re.search(r"\b" + kw + r"\b", upper))
+    return hits, keywords
+
+
+def _matcher(raw: str) -> tuple:
+    return scan_rules(raw), compute_sql_keyword_score(raw)
+
+
+def _per_request_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(SAMPLES[i % len(SAMPLES)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(repeat: int) -> None:
+    for sample in SAMPLES:
+        hits, keywords = _per_pattern(sample)
+        assert (hits, keywords) == _matcher(sample)
+
+    per_pattern_us = _per_request_us(_per_pattern, repeat)
+    matcher_us = _per_request_us(_matcher, repeat)
+    print(f"search per pattern {per_pattern_us:8.1f} us/request")
+    print(f"pattern matcher    {matcher_us:8.1f} us/request   ({per_pattern_us / matcher_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=20000)
+    main(parser.parse_args().repeat)
@@ -0,0 +1,67 @@
+"""
+Per-request CPU time of the /analyze detectors: string-per-detector vs. one
+shared ParsedRequest.
+
+Runs the synchronous request inspection done for one /analyze call — payload
+scan, API detection, base features, Model 1 features and the rule checks —
+once with every detector handed the raw string (each re-parses, re-lowercases
+and re-counts it) and once with a single ParsedRequest shared by all of them.
+
+Usage (from the repo root):
+    python benchmarks/bench_request_parser.py [--repeat 2000]
+"""
+
+import argparse
+import sys
+import time
+
+sys.path.insert(0, "backend")
+
+from src.decision_controller import scan_payload
+from src.feature_engineering import extract_features
+from src.multi_predict import MultiModelPredictor, _extract_model1_features
+from src.request_parser import ParsedRequest
+
+SAMPLES = [
+    "GET /products/123e4567-e89b-12d3-a456-426614174000/reviews?page=2&sort=new HTTP/1.1\n"
+    "Host: shop.example.com\nUser-Agent: Mozilla/5.0 (X11; Linux x86_64)\nAccept: text/html\n"
+    "Cookie: session=abc123; theme=dark",
+    "POST /api/login HTTP/1.1\nHost: api.example.com\nContent-Type: application/json\n"
+    "User-Agent: python-requests/2.31\n\n{\"user\": \"admin' OR 1=1--\", \"password\": \"x\"}",
+    "GET /search?q=%3Cscript%3Ealert(document.cookie)%3C/script%3E&lang=en HTTP/1.1\n"
+    "Host: www.example.org\nUser-Agent: curl/8.4.0",
+    "GET /static/../../../../etc/passwd HTTP/1.1\nHost: files.example.net\nUser-Agent: Wget/1.21",
+]
+
+
+def _detectors(request) -> None:
+    scan_payload(request)
+    MultiModelPredictor._is_api_request(request)
+    extract_features(request)
+    _extract_model1_features(request)
+    MultiModelPredictor._detect_sqli(request)
+    MultiModelPredictor._detect_xss(request)
+    MultiModelPredictor._detect_path_traversal(request)
+
+
+def _per_request_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for i in range(repeat):
+        fn(SAMPLES[i % len(SAMPLES)])
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def main(repeat: int) -> None:
+    for sample in SAMPLES:   # warm regex caches
+        _detectors(sample)
+
+    string_us = _per_request_us(_detectors, repeat)
+    shared_us = _per_request_us(lambda raw: _detectors(ParsedRequest(raw)), repeat)
+    print(f"string per detector  {string_us:8.1f} us/request")
+    print(f"shared ParsedRequest {shared_us:8.1f} us/request   ({string_us / shared_us:.2f}x)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--repeat", type=int, default=2000)
+    main(parser.parse_args().repeat)
@@ -0,0 +1,101 @@
+import asyncio
+import sys
+
+sys.path.insert(0, "backend")
+
+from src import multi_predict
+from src.multi_predict import (
+    MultiModelPredictor,
+    _dedup_requests,
+    _expand_results,
+    _request_template,
+    batch_summary,
+)
+
+
+def test_stream_batch_keeps_order_and_bounds_concurrency():
+    predictor = MultiModelPredictor.__new__(MultiModelPredictor)
+    predictor._base_model = object()
+    predictor._base_scaler = object()
+    active = {"now": 0, "peak": 0}
+
+    async def score(chunk):
+        active["now"] += 1
+        active["peak"] = max(active["peak"], active["now"])
+        # Later chunks finish first
+        await asyncio.sleep(0.01 * (10 - chunk[0]))
+        active["now"] -= 1
+        return [{"row": n} for n in chunk], {"normal": len(chunk)}
+
+    predictor._score_batch_chunk = score
+
+    async def chunks():
+        for i in range(10):
+            yield [i]
+
+    async def run():
+        return [r async for r, _ in predictor.stream_batch_with_threshold(chunks(), window=3)]
+
+    results = asyncio.run(run())
+
+    assert [r[0]["row"] for r in results] == list(range(10))
+    assert active["peak"] <= 3
+
+
+def test_batch_summary_contamination_rate():
+    counts = {"normal": 3, "sql_injection": 1, "xss": 0, "path_traversal": 0, "unknown_attack": 0}
+    summary = batch_summary(counts, 4)
+
+    assert summary["total_requests"] == 4
+    assert summary["contamination_rate"] == 25.0
+
+    assert summary["deduplication"]["scored_requests"] == 4
+
+
+def test_dedup_scatters_results_back_to_every_row():
+    requests = ["GET /health", "GET /a?id=1", "GET /health", "GET /a?id=2", "GET /health"]
+
+    unique, inverse = _dedup_requests(requests, "exact")
+    assert unique == ["GET /health", "GET /a?id=1", "GET /a?id=2"]
+    assert [unique[i] for i in inverse] == requests
+
+    scored = [{"raw_request": r, "anomaly_score": 0.1, "is_anomaly": False, "threat_type": "Normal"} for r in unique]
+    results, counts = _expand_results(requests, scored, inverse)
+    assert [r["raw_request"] for r in results] == requests
+    assert counts["normal"] == 5
+
+    counts["scored"] = len(unique)
+    dedup = batch_summary(counts, len(requests))["deduplication"]
+    assert (dedup["scored_requests"], dedup["reused_results"], dedup["saved_rate"]) == (3, 2, 40.0)
+
+
+def test_template_dedup_masks_numbers_and_ids():
+    a = "GET /u/123e4567-e89b-12d3-a456-426614174000/orders/42?t=1700000000 HTTP/1.1"
+    b = "GET /u/00000000-0000-0000-0000-000000000001/orders/7?t=1700000123 HTTP/1.1"
+
+    assert _request_template(a) == _request_template(b) == "GET /u/{uuid}/orders/0?t=0 HTTP/0.0"
+    assert _dedup_requests([a, b, "GET /health"], "template") == ([a, "GET /health"], [0, 0, 1])
+
+
+def test_template_dedup_shares_scores_not_verdicts(monkeypatch):
+    monkeypatch.setattr(multi_predict, "_BATCH_DEDUP", "template")
+    traversal = "GET /files?name=%2e%2e%2fetc%2fpasswd HTTP/1.1"
+    lookalike = "GET /files?name=%3e%3e%3fetc%3fpasswd HTTP/1.1"
+    assert _request_template(traversal) == _request_template(lookalike)
+
+    predictor = MultiModelPredictor.__new__(MultiModelPredictor)
+    predictor._base_model = predictor._base_scaler = object()
+    scored = []
+
+    async def score(chunk):
+        scored.append(list(chunk))
+        return [{"raw_request": r, "anomaly_score": 0.0, "is_anomaly": False, "threat_type": "Normal"} for r in chunk], {}
+
+    predictor._score_batch_chunk = score
+    summary = asyncio.run(predictor.predict_batch_with_threshold([lookalike, traversal, lookalike]))
+
+    # One scoring call for the template; each row is classified on its own text
+    assert scored == [[lookalike]]
+    assert [r["anomaly_score"] for r in summary["results"]] == [0.0] * 3
+    assert [r["threat_type"] for r in summary["results"]] == ["Normal", "Path Traversal", "Normal"]
+    assert (summary["path_traversal"], summary["deduplication"]["reused_results"]) == (1, 2)
@@ -0,0 +1,89 @@
+import asyncio
+import sys
+
+sys.path.insert(0, "backend")
+
+from src.blocklist_index import BlocklistIndex, BlocklistIndexBuilder
+from src.domain_intelligence import DomainIntelligence
+
+RECORDS = [
+    {"domain": f"bad{i}.example", "category": "malware" if i % 2 else "phishing", "source": "urlhaus", "confidence": 0.9}
+    for i in range(2000)
+] + [{"domain": "bad1.example", "category": "betting"}, {"domain": None}]
+
+
+def test_index_lookup_and_snapshot_round_trip(tmp_path):
+    index = BlocklistIndex.from_records(RECORDS)
+    assert len(index) == 2000
+    assert index.lookup("bad1.example") == {"category": "malware", "source": "urlhaus", "confidence": 0.9}
+    assert index.lookup("bad2.example")["category"] == "phishing"
+    assert "good.example" not in index
+    # Every blocked domain passes its Bloom filter; few clean ones do
+    assert sum(index._may_contain(int(h)) for h in index.hashes) == 2000
+
+    path = tmp_path / "blocklist.idx"
+    index.save(str(path))
+    mapped = BlocklistIndex.open(str(path))
+    assert len(mapped) == 2000 and mapped.probes == index.probes
+    assert all(mapped.lookup(f"bad{i}.example") == index.lookup(f"bad{i}.example") for i in range(0, 2000, 7))
+    assert mapped.lookup("good.example") is None
+
+    # Replacing the snapshot leaves an open map intact
+    builder = BlocklistIndexBuilder()
+    builder.add("other.example", "defacement", "spamhaus")
+    builder.build().save(str(path))
+    assert mapped.lookup("bad3.example")["category"] == "malware"
+    assert BlocklistIndex.open(str(path)).lookup("other.example")["source"] == "spamhaus"
+    assert [p.name for p in tmp_path.iterdir()] == ["blocklist.idx"]
+
+
+class _Cursor:
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _BlockedDomains:
+    def __init__(self, records):
+        self.records = records
+        self.find_one_calls = 0
+
+    def find(self, *args):
+        return _Cursor(list(self.records))
+
+    async def find_one(self, query):
+        self.find_one_calls += 1
+        return next((r for r in self.records if r["domain"] == query["domain"]), None)
+
+
+def test_check_blocklist_reads_index_not_mongo(tmp_path, monkeypatch):
+    monkeypatch.setenv("BLOCKLIST_SNAPSHOT_PATH", str(tmp_path / "blocklist.idx"))
+    collection = _BlockedDomains([{"domain": "evil.example", "category": "malware", "source": "urlhaus"}])
+    intel = DomainIntelligence({"blocked_domains": collection})
+
+    # No index yet: per-domain queries
+    assert asyncio.run(intel.check_blocklist("evil.example"))["category"] == "malware"
+    assert collection.find_one_calls == 1
+
+    assert asyncio.run(intel.refresh_blocklist_index()) == 1
+    assert asyncio.run(intel.check_blocklist("clean.example")) is None
+    assert asyncio.run(intel.check_blocklist("evil.example"))["source"] == "urlhaus"
+    assert collection.find_one_calls == 1
+
+    # A fresh snapshot is reused; an explicit rebuild picks up new records
+    collection.records.append({"domain": "new.example", "category": "phishing"})
+    assert asyncio.run(intel.refresh_blocklist_index()) == 1
+    assert asyncio.run(intel.refresh_blocklist_index(rebuild=True)) == 2
+
+    # Another process (no MongoDB) maps the shared snapshot
+    reader = DomainIntelligence(None)
+    assert reader.cache_sizes()["blocklist_index"] == 2
+    assert asyncio.run(reader.check_blocklist("new.example"))["category"] == "phishing"
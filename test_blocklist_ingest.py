@@ -0,0 +1,163 @@
+import asyncio
+import sys
+
+import httpx
+
+sys.path.insert(0, "backend")
+
+from src import blocklist_ingest
+from src.blocklist_index import BlocklistIndex
+from src.blocklist_ingest import ingest_source, ingest_sources
+from src.domain_intelligence import DomainIntelligence
+
+
+class _Cursor:
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+def _matches(doc, query):
+    for key, value in query.items():
+        if isinstance(value, dict) and "$in" in value:
+            if doc.get(key) not in value["$in"]:
+                return False
+        elif doc.get(key) != value:
+            return False
+    return True
+
+
+class _Collection:
+    """The slice of a motor collection the ingester uses, in memory."""
+
+    def __init__(self):
+        self.docs = []
+        self.bulk_calls = 0
+
+    async def create_index(self, key):
+        return key
+
+    async def find_one(self, query):
+        return next((dict(d) for d in self.docs if _matches(d, query)), None)
+
+    def find(self, query=None, projection=None):
+        return _Cursor([dict(d) for d in self.docs if _matches(d, query or {})])
+
+    async def update_one(self, query, update, upsert=False):
+        doc = next((d for d in self.docs if _matches(d, query)), None)
+        if doc is None and upsert:
+            doc = dict(query)
+            self.docs.append(doc)
+        if doc is not None:
+            doc.update(update["$set"])
+
+    async def bulk_write(self, ops, ordered=True):
+        self.bulk_calls += 1
+        for op in ops:
+            if type(op).__name__ == "UpdateOne":
+                await self.update_one(op._filter, op._doc, op._upsert)
+            else:
+                self.docs = [d for d in self.docs if not _matches(d, op._filter)]
+
+
+def _db():
+    return {"blocked_domains": _Collection(), "blocklist_sources": _Collection()}
+
+
+def _domains(db, source):
+    return sorted(d["domain"] for d in db["blocked_domains"].docs if d["source"] == source)
+
+
+def _ingest(db, url, **kwargs):
+    return asyncio.run(ingest_source(
+        db, "spamhaus", url, DomainIntelligence._parse_blocklist_line,
+        DomainIntelligence._categorize_threat, batch_size=2, **kwargs,
+    ))
+
+
+def test_local_feed_is_applied_as_a_delta(tmp_path):
+    feed = tmp_path / "drop.txt"
+    feed.write_text("# header\nbad-casino.example\nphish.example\n\nphish.example\n10.0.0.0/8\nmalware.example\n")
+    db = _db()
+
+    first = _ingest(db, feed.as_uri())
+    assert (first["status"], first["added"], first["removed"]) == ("loaded", 3, 0)
+    assert _domains(db, "spamhaus") == ["bad-casino.example", "malware.example", "phish.example"]
+    assert db["blocked_domains"].bulk_calls == 2
+    assert next(d for d in db["blocked_domains"].docs if d["domain"] == "bad-casino.example")["category"] == "betting"
+
+    # Unchanged file: not even read
+    assert _ingest(db, feed.as_uri())["status"] == "not_modified"
+
+    feed.write_text("phish.example\nnew.example\n")
+    second = _ingest(db, str(feed))
+    assert (second["added"], second["removed"], second["unchanged"]) == (1, 2, 1)
+    assert _domains(db, "spamhaus") == ["new.example", "phish.example"]
+
+    assert _ingest(db, str(feed), force=True)["unchanged"] == 2
+
+
+def test_http_feed_sends_validators(monkeypatch):
+    seen = []
+
+    def handler(request):
+        seen.append(request.headers.get("if-none-match"))
+        if request.headers.get("if-none-match") == '"v1"':
+            return httpx.Response(304)
+        body = "a.example\nb.example\n" if request.url.path == "/drop.txt" else "c.example\n"
+        return httpx.Response(200, headers={"ETag": '"v1"'}, text=body)
+
+    class _Gateway:
+        def client_for(self, url):
+            return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+    monkeypatch.setattr(blocklist_ingest, "get_gateway", lambda: _Gateway())
+    db = _db()
+
+    async def run():
+        return await ingest_sources(
+            db, [("spamhaus", "https://feeds.example/drop.txt"), ("urlhaus", "https://feeds.example/recent.txt")],
+            DomainIntelligence._parse_blocklist_line, DomainIntelligence._categorize_threat,
+        )
+
+    first = asyncio.run(run())
+    assert [r["status"] for r in first] == ["loaded", "loaded"]
+    assert _domains(db, "spamhaus") == ["a.example", "b.example"]
+    assert _domains(db, "urlhaus") == ["c.example"]
+    assert [r["status"] for r in asyncio.run(run())] == ["not_modified", "not_modified"]
+    assert seen.count('"v1"') == 2
+
+
+def test_overlapping_feeds_keep_a_shared_domain(tmp_path):
+    spamhaus, urlhaus = tmp_path / "drop.txt", tmp_path / "recent.txt"
+    spamhaus.write_text("a.example\nshared.example\n")
+    urlhaus.write_text("shared.example\nc.example\n")
+    db = _db()
+
+    async def run():
+        return await ingest_sources(
+            db, [("spamhaus", str(spamhaus)), ("urlhaus", str(urlhaus))],
+            DomainIntelligence._parse_blocklist_line, DomainIntelligence._categorize_threat,
+        )
+
+    asyncio.run(run())
+    assert _domains(db, "spamhaus") == ["a.example", "shared.example"]
+    assert _domains(db, "urlhaus") == ["c.example", "shared.example"]
+
+    # spamhaus drops the shared domain; urlhaus still lists it
+    spamhaus.write_text("a.example\n")
+    asyncio.run(run())
+    assert _domains(db, "spamhaus") == ["a.example"]
+    assert _domains(db, "urlhaus") == ["c.example", "shared.example"]
+
+    index = BlocklistIndex.from_records(db["blocked_domains"].docs)
+    assert len(index) == 3
+    assert index.lookup("shared.example")["source"] == "urlhaus"
@@ -0,0 +1,115 @@
+import io
+import math
+import sys
+from typing import List, Tuple
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "backend")
+
+from src.bot_feature_builder import (
+    BOT_FEATURE_COUNT,
+    _url_depth,
+    flow_features_from_csv,
+    generate_flow_features,
+)
+
+
+URL_ENTROPY = 12
+
+
+def _value_counts_entropy(values: pd.Series) -> float:
+    """URL entropy exactly as the original loop computed it (frozen copy)."""
+    counts = values.value_counts(normalize=True)
+    return float(-sum(p * math.log2(p) for p in counts if p > 0))
+
+
+def _per_ip_flow_features(df: pd.DataFrame) -> Tuple[List[str], np.ndarray]:
+    """The former per-IP loop implementation, kept as the reference."""
+    df = df.copy()
+    df["timestamp"] = pd.to_datetime(df["timestamp"], format="mixed")
+    df = df.dropna(subset=["timestamp"]).sort_values("timestamp")
+    has_ua = "user_agent" in df.columns
+    ip_labels, rows = [], []
+    for ip, session in df.groupby("ip", sort=False):
+        session = session.sort_values("timestamp")
+        ts, urls = session["timestamp"], session["url"]
+        duration = float((ts.max() - ts.min()).total_seconds())
+        n = len(session)
+        iats = np.diff((ts.astype(np.int64) / 1e9).values)
+        if len(iats) > 0:
+            iat_stats = [float(np.mean(iats)), float(np.std(iats)), float(np.min(iats)), float(np.max(iats))]
+        else:
+            iat_stats = [0.0] * 4
+        if duration > 0:
+            counts_per_sec = ts.dt.floor("s").value_counts()
+            top_n = max(1, int(len(counts_per_sec) * 0.10))
+            burst_ratio = int(counts_per_sec.nlargest(top_n).sum()) / n
+        else:
+            burst_ratio = 1.0
+        rows.append([
+            duration, float(n), float(urls.nunique()), n / max(duration, 1.0),
+            int(urls.value_counts().iloc[0]) / n,
+            float(session["user_agent"].nunique()) if has_ua else 0.0,
+            *iat_stats, burst_ratio, float(ts.iloc[0].hour),
+            _value_counts_entropy(urls), float(urls.apply(_url_depth).mean()),
+        ])
+        ip_labels.append(str(ip))
+    matrix = np.array(rows, dtype=np.float64).reshape(-1, BOT_FEATURE_COUNT)
+    return ip_labels, np.where(np.isfinite(matrix), matrix, 0.0)
+
+
+def _assert_matches_loop(matrix, expected):
+    """Every column exact except URL entropy: the loop summed p*log2(p) in
+    value_counts() order, the kernel sums counts in ascending order, so the
+    two can differ in the last bits."""
+    others = np.arange(matrix.shape[1]) != URL_ENTROPY
+    assert np.array_equal(matrix[:, others], expected[:, others])
+    np.testing.assert_allclose(matrix[:, URL_ENTROPY], expected[:, URL_ENTROPY], rtol=0, atol=1e-12)
+
+
+def _flows(n_rows, n_ips, seed):
+    rng = np.random.RandomState(seed)
+    # Ties, sub-second bursts, multi-second gaps, sessions over 128 requests
+    offsets = np.cumsum(rng.choice([0, 0, 1, 10**6, 10**9, 3 * 10**9, 10**11], size=n_rows))
+    urls = np.array(["/", "/a", "/a/b?x=1", "/api/v1/items/3", "/static//x.js"])
+    return pd.DataFrame({
+        "timestamp": pd.Timestamp("2024-03-01 23:59:58") + pd.to_timedelta(rng.permutation(offsets), unit="ns"),
+        "ip": rng.choice([f"10.0.0.{i}" for i in range(n_ips)], size=n_rows),
+        "url": urls[rng.randint(0, len(urls), size=n_rows)],
+        "user_agent": rng.choice(["curl/8.0", "Mozilla/5.0", None], size=n_rows),
+    })
+
+
+def test_vectorized_flow_features_match_per_ip_loop():
+    for seed, (n_rows, n_ips) in enumerate([(1, 1), (40, 6), (700, 4), (3000, 40)]):
+        df = _flows(n_rows, n_ips, seed)
+        # Rows without a timestamp are dropped; here every row of one IP
+        with_nat = df.copy()
+        with_nat.loc[(df.index % 7 == 3) | (df["ip"] == "10.0.0.0"), "timestamp"] = pd.NaT
+        for frame in (df, df.drop(columns="user_agent").astype({"timestamp": str}),
+                      with_nat, with_nat.astype({"timestamp": str})):
+            ip_labels, matrix = generate_flow_features(frame)
+            expected_labels, expected = _per_ip_flow_features(frame)
+
+            assert ip_labels == expected_labels
+            assert matrix.shape == (len(expected_labels), BOT_FEATURE_COUNT)
+            _assert_matches_loop(matrix, expected)
+        assert "10.0.0.0" not in generate_flow_features(with_nat)[0]
+
+
+def test_partitioned_csv_matches_in_memory_flow_features(tmp_path):
+    df = _flows(3000, 40, seed=7)
+    # Distinct timestamps, so the session order is fully determined
+    df["timestamp"] = pd.Timestamp("2024-03-01") + pd.to_timedelta(
+        np.random.RandomState(7).permutation(len(df)) * 1_000_003, unit="ns"
+    )
+    data = df.to_csv(index=False).encode()
+
+    expected_labels, expected = generate_flow_features(pd.read_csv(io.BytesIO(data)))
+    ip_labels, matrix = flow_features_from_csv(io.BytesIO(data), partitions=5, chunk_rows=400, spool_dir=tmp_path)
+
+    assert ip_labels == expected_labels
+    assert np.array_equal(matrix, expected)
+    assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,118 @@
+import asyncio
+import socket
+import sys
+import threading
+import time
+
+sys.path.insert(0, "backend")
+
+from src.dns_resolver import CachingResolver
+from src.domain_intelligence import DomainIntelligence
+
+
+class _FakeLookup:
+    """Blocking gethostbyname stand-in that counts calls per name."""
+
+    def __init__(self, delay=0.0):
+        self.delay = delay
+        self.calls = {}
+        self._lock = threading.Lock()
+
+    def __call__(self, name):
+        with self._lock:
+            self.calls[name] = self.calls.get(name, 0) + 1
+        time.sleep(self.delay)
+        if name.startswith("missing"):
+            raise socket.gaierror(socket.EAI_NONAME, "Name or service not known")
+        if name.startswith("slow"):
+            time.sleep(1.0)
+        return "192.0.2.1"
+
+
+def test_answers_and_failures_are_cached():
+    lookup = _FakeLookup()
+    resolver = CachingResolver(lookup, timeout=0.2, ttl=60, negative_ttl=60, failure_ttl=60, max_entries=2)
+
+    async def run():
+        first = await resolver.resolve("example.com")
+        again = await resolver.resolve("example.com")
+        missing = [await resolver.resolve("missing.example") for _ in range(3)]
+        slow = [await resolver.resolve("slow.example") for _ in range(2)]
+        return first, again, missing, slow
+
+    first, again, missing, slow = asyncio.run(run())
+    assert (first.address, first.ok, first.cached) == ("192.0.2.1", True, False)
+    assert again.cached and again.ok
+    assert [a.status for a in missing] == ["nxdomain"] * 3
+    assert [a.status for a in slow] == ["timeout", "timeout"]
+    assert lookup.calls == {"example.com": 1, "missing.example": 1, "slow.example": 1}
+    # Bounded: the least recently used name was dropped
+    assert len(resolver) == 2 and resolver.cached("example.com") is None
+    resolver.shutdown()
+
+
+def test_concurrent_lookups_share_one_resolution_and_expire():
+    lookup = _FakeLookup(delay=0.05)
+    resolver = CachingResolver(lookup, timeout=1.0, ttl=0.05, workers=2)
+
+    async def run():
+        return await asyncio.gather(*(resolver.resolve("example.com") for _ in range(20)))
+
+    answers = asyncio.run(run())
+    assert all(a.ok for a in answers)
+    assert lookup.calls["example.com"] == 1
+
+    time.sleep(0.06)
+    asyncio.run(resolver.resolve("example.com"))
+    assert lookup.calls["example.com"] == 2
+    resolver.shutdown()
+
+
+def test_domain_intelligence_uses_injected_resolver(monkeypatch, tmp_path):
+    monkeypatch.setenv("BLOCKLIST_SNAPSHOT_PATH", str(tmp_path / "blocklist.idx"))
+    lookup = _FakeLookup()
+    intel = DomainIntelligence(None, resolver=CachingResolver(lookup, timeout=1.0))
+
+    assert asyncio.run(intel.validate_dns("example.org")) is True
+    assert asyncio.run(intel.validate_dns("missing.example")) is False
+    assert asyncio.run(intel.validate_dns("missing.example")) is False
+    assert lookup.calls == {"example.org": 1, "missing.example": 1}
+    assert intel.cache_sizes()["dns"] == 2
+    intel.resolver.shutdown()
+
+
+def test_busy_threads_give_an_uncached_busy_answer():
+    lookup = _FakeLookup(delay=0.3)
+    # The timeout is shorter than two queued lookups but longer than one
+    resolver = CachingResolver(lookup, timeout=0.5, failure_ttl=60, workers=1)
+
+    async def run():
+        return await asyncio.gather(resolver.resolve("example.com"), resolver.resolve("example.org"))
+
+    first, busy = asyncio.run(run())
+    assert (first.status, busy.status) == ("ok", "busy")
+    assert "example.org" not in lookup.calls
+    assert resolver.cached("example.org") is None
+    assert asyncio.run(resolver.resolve("example.org")).ok
+    resolver.shutdown()
+
+
+def test_saturated_resolver_does_not_mark_domains_non_existent(monkeypatch, tmp_path):
+    monkeypatch.setenv("BLOCKLIST_SNAPSHOT_PATH", str(tmp_path / "blocklist.idx"))
+    lookup = _FakeLookup(delay=0.3)
+    intel = DomainIntelligence(None, resolver=CachingResolver(lookup, timeout=1.0, workers=2))
+    domains = [f"shop{i}.example" for i in range(4)]
+
+    async def check():
+        return await asyncio.gather(*(intel.check_domain(d) for d in domains))
+
+    results = asyncio.run(check())
+    # Two names were looked up; the other two were not checked, not failed
+    assert sum(d in lookup.calls for d in domains) == 2
+    assert [r["classification"] for r in results] == ["unknown"] * 4
+    assert all(r["passes_domain_filter"] and r["blocked_reason"] is None for r in results)
+    # Only checked domains keep a verdict; the rest are resolved next time
+    assert sorted(intel._verdicts) == sorted(d for d in domains if d in lookup.calls)
+    asyncio.run(check())
+    assert all(lookup.calls.get(d) == 1 for d in domains)
+    intel.resolver.shutdown()
@@ -0,0 +1,61 @@
+import asyncio
+import sys
+
+sys.path.insert(0, "backend")
+
+from src.domain_intelligence import DomainIntelligence
+from src.domain_trie import DomainSuffixTrie
+
+
+def test_suffix_trie_matches_entries_and_subdomains():
+    trie = DomainSuffixTrie(["github.com", "aws.amazon.com", "", "github.com"])
+
+    assert len(trie) == 2
+    assert trie.match("github.com") == "github.com"
+    assert trie.match("api.github.com") == "github.com"
+    assert trie.match("a.b.aws.amazon.com") == "aws.amazon.com"
+    for domain in ("evilgithub.com", "amazon.com", "com", "github.com.evil.io", "", "github..com"):
+        assert domain not in trie
+
+
+class _Cursor:
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Collection:
+    def __init__(self, records):
+        self.records = records
+
+    def find(self, *args):
+        return _Cursor(list(self.records))
+
+
+def test_whitelist_merges_env_hardcoded_and_mongo(monkeypatch):
+    monkeypatch.setenv("WHITELIST_DOMAINS", " Intranet.Example ,,")
+    collection = _Collection([{"domain": "www.partner.io"}, {"domain": None}])
+    intel = DomainIntelligence({"whitelisted_domains": collection})
+
+    async def check(domain):
+        return await intel.check_whitelist(domain)
+
+    assert asyncio.run(check("wiki.intranet.example"))
+    assert asyncio.run(check("api.github.com"))
+    assert not asyncio.run(check("cdn.partner.io"))
+
+    asyncio.run(intel.refresh_whitelist())
+    assert asyncio.run(check("cdn.partner.io"))
+
+    collection.records = []
+    asyncio.run(intel.refresh_whitelist())
+    assert not asyncio.run(check("cdn.partner.io"))
+    assert intel.cache_sizes()["whitelist"] == len(DomainIntelligence.MAJOR_DOMAINS_WHITELIST) + 1
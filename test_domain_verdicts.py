@@ -0,0 +1,94 @@
+import asyncio
+import sys
+
+sys.path.insert(0, "backend")
+
+from src.dns_resolver import CachingResolver
+from src.domain_intelligence import DomainIntelligence
+
+
+class _Cursor:
+    def __init__(self, records):
+        self._records = iter(records)
+
+    def __aiter__(self):
+        return self
+
+    async def __anext__(self):
+        try:
+            return next(self._records)
+        except StopIteration:
+            raise StopAsyncIteration
+
+
+class _Collection:
+    def __init__(self, records=()):
+        self.records = list(records)
+        self.find_one_calls = 0
+
+    def find(self, *args):
+        return _Cursor(list(self.records))
+
+    async def find_one(self, query):
+        self.find_one_calls += 1
+        return next((r for r in self.records if r["domain"] == query["domain"]), None)
+
+    async def update_one(self, query, update, upsert=False):
+        pass
+
+
+def _intel(tmp_path, monkeypatch, calls):
+    monkeypatch.setenv("BLOCKLIST_SNAPSHOT_PATH", str(tmp_path / "blocklist.idx"))
+
+    def lookup(name):
+        calls.append(name)
+        return "192.0.2.1"
+
+    db = {"blocked_domains": _Collection(), "domain_cache": _Collection(), "whitelisted_domains": _Collection()}
+    # ttl=0: every DNS validation reaches the lookup unless the verdict answers
+    return DomainIntelligence(db, resolver=CachingResolver(lookup, ttl=0)), db
+
+
+def test_repeat_domain_is_answered_from_its_verdict(tmp_path, monkeypatch):
+    calls = []
+    intel, db = _intel(tmp_path, monkeypatch, calls)
+
+    first = asyncio.run(intel.check_domain("https://www.shop.example/cart"))
+    assert (first["passes_domain_filter"], first["from_cache"]) == (True, False)
+    assert calls == ["shop.example"]
+    assert db["domain_cache"].find_one_calls == 1
+
+    asyncio.run(intel.cache_classification("shop.example", "phishing", 2, confidence=0.93))
+    second = asyncio.run(intel.check_domain("http://shop.example/"))
+    assert (second["classification"], second["passes_domain_filter"], second["from_cache"]) == ("phishing", False, True)
+    assert intel._verdicts["shop.example"][1]["model4_confidence"] == 0.93
+    # No DNS, blocklist or cache queries the second time
+    assert calls == ["shop.example"]
+    assert db["domain_cache"].find_one_calls == 1
+    assert db["blocked_domains"].find_one_calls == 1
+
+    heuristic = [asyncio.run(intel.check_domain("secure-login.example")) for _ in range(2)]
+    assert [r["blocked_reason"] for r in heuristic] == ["suspicious_keyword_secure"] * 2
+    assert calls.count("secure-login.example") == 1
+    assert intel.cache_sizes()["verdicts"] == 2
+    intel.resolver.shutdown()
+
+
+def test_blocklist_change_invalidates_verdicts(tmp_path, monkeypatch):
+    calls = []
+    intel, db = _intel(tmp_path, monkeypatch, calls)
+
+    assert asyncio.run(intel.check_domain("deals.example"))["passes_domain_filter"] is True
+    db["blocked_domains"].records.append({"domain": "deals.example", "category": "betting", "source": "urlhaus"})
+    assert asyncio.run(intel.check_domain("deals.example"))["passes_domain_filter"] is True
+
+    asyncio.run(intel.refresh_blocklist_index(rebuild=True))
+    blocked = asyncio.run(intel.check_domain("deals.example"))
+    assert (blocked["passes_domain_filter"], blocked["blocked_reason"]) == (False, "betting")
+    assert calls == ["deals.example"]
+
+    # A new whitelist entry also drops the records
+    db["whitelisted_domains"].records.append({"domain": "deals.example"})
+    asyncio.run(intel.refresh_whitelist())
+    assert asyncio.run(intel.check_domain("deals.example"))["classification"] == "normal"
+    intel.resolver.shutdown()
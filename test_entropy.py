@@ -0,0 +1,64 @@
+import math
+import random
+import sys
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "backend")
+
+from src.bot_feature_builder import _shannon_entropy
+from src.entropy import char_entropy, entropy_from_counts, shannon_entropy, shannon_entropy_batch
+from src.feature_engineering import compute_shannon_entropy
+from src.model4_features import shannon_entropy as model4_entropy
+
+
+def _reference(text):
+    n = len(text)
+    return -sum(c / n * math.log2(c / n) for c in Counter(text).values())
+
+
+def _texts():
+    rng = random.Random(7)
+    alphabets = ["ab", "abcdefgh/?=&", "".join(map(chr, range(32, 127))), "aé😀Δx", "z"]
+    texts = ["", "a", "aaaa", "abc", "a" * 70000 + "b"]
+    for _ in range(300):
+        alphabet = rng.choice(alphabets)
+        texts.append("".join(rng.choice(alphabet) for _ in range(rng.choice([2, 10, 47, 48, 300, 3000]))))
+    return texts
+
+
+def test_kernel_matches_reference_entropy():
+    for text in _texts():
+        assert math.isclose(shannon_entropy(text), _reference(text), rel_tol=1e-12, abs_tol=1e-12)
+    assert shannon_entropy("aaaa") == 0.0
+    assert math.isclose(shannon_entropy("abc"), math.log2(3))
+
+
+def test_every_path_gives_the_same_float():
+    texts = _texts()
+    batch = shannon_entropy_batch(texts)
+
+    for text, batched in zip(texts, batch):
+        value = shannon_entropy(text)
+        assert value == batched == char_entropy(Counter(text), len(text))
+        assert value == compute_shannon_entropy(text) == model4_entropy(text)
+    assert shannon_entropy_batch([]).shape == (0,)
+
+
+def test_count_histogram_entropy():
+    urls = pd.Series(["/a", "/b", "/a", "/c", "/a", None])
+
+    assert math.isclose(_shannon_entropy(urls), -sum(p * math.log2(p) for p in (3 / 5, 1 / 5, 1 / 5)))
+    assert entropy_from_counts([4, 0]) == 0.0
+    assert np.isclose(entropy_from_counts([1, 1, 1, 1]), 2.0)
+
+
+def test_batch_with_wide_alphabet_rows():
+    rng = random.Random(11)
+    texts = ["".join(chr(0x4E00 + rng.randrange(5000)) for _ in range(rng.choice([5, 200, 900]))) for _ in range(60)]
+    texts += ["GET /é?q=1", "".join(map(chr, range(0x4E00, 0x4E00 + 1000))), "ab"]
+    batch = shannon_entropy_batch(texts)
+
+    assert [shannon_entropy(t) for t in texts] == batch.tolist()
@@ -0,0 +1,35 @@
+import sys
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+
+from src.feature_engineering import FEATURE_COLUMNS, extract_features, extract_features_matrix
+
+REQUESTS = [
+    "GET /api/users?page=1&limit=20 HTTP/1.1",
+    "GET /u/123E4567-e89b-12d3-a456-426614174000/x?id=1 OR 1=1",
+    "GET /a?q=<script>alert(document.cookie)</script>&x=onloadocument.x",
+    "select\x0cfrom:where\x1cUNION xOR OR_ or",
+    "GET /straße?İ=ÉXECUTE 😀",
+    "",
+    "POST /api/login HTTP/1.1\r\n\r\n{\"user\": \"admin' OR 1=1--\"}",
+]
+
+
+def _rows(requests):
+    return np.array([[extract_features(r)[col] for col in FEATURE_COLUMNS] for r in requests])
+
+
+def test_matrix_matches_per_row_features():
+    matrix = extract_features_matrix(REQUESTS * 3, chunk_rows=4)
+
+    assert matrix.dtype == np.float64 and matrix.flags["C_CONTIGUOUS"]
+    assert np.array_equal(matrix, _rows(REQUESTS * 3))
+    assert extract_features_matrix([]).shape == (0, len(FEATURE_COLUMNS))
+
+
+def test_block_with_separator_char_falls_back_per_row():
+    requests = REQUESTS + ["GET /a\x00SELECT b\x00<script"]
+
+    assert np.array_equal(extract_features_matrix(requests), _rows(requests))
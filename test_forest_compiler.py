@@ -0,0 +1,50 @@
+import sys
+
+import numpy as np
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, "backend")
+
+from src.forest_compiler import CompiledForest
+
+
+def _fit(n_features=7, **kwargs):
+    rng = np.random.RandomState(42)
+    X = np.abs(rng.randn(600, n_features)) * rng.uniform(1, 300, n_features)
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=50, contamination=0.05, random_state=42, **kwargs)
+    model.fit(scaler.transform(X))
+    X_test = np.abs(rng.randn(300, n_features)) * rng.uniform(1, 400, n_features)
+    return model, scaler, X_test
+
+
+def test_batch_scores_match_sklearn():
+    model, scaler, X = _fit()
+    compiled = CompiledForest(model, scaler)
+
+    expected = model.decision_function(scaler.transform(X))
+    np.testing.assert_allclose(compiled.decision_function(X), expected, atol=1e-9)
+    np.testing.assert_allclose(
+        compiled.score_samples(X), model.score_samples(scaler.transform(X)), atol=1e-9
+    )
+
+
+def test_single_row_scores_match_sklearn():
+    model, scaler, X = _fit()
+    compiled = CompiledForest.from_pipeline({"model": model, "scaler": scaler})
+
+    for row in X[:25]:
+        expected = float(model.decision_function(scaler.transform(row.reshape(1, -1)))[0])
+        assert abs(compiled.score_one(row) - expected) < 1e-9
+
+
+def test_feature_subsampling_and_no_scaler():
+    rng = np.random.RandomState(0)
+    X = rng.randn(400, 5)
+    model = IsolationForest(
+        n_estimators=30, max_features=3, bootstrap=True, random_state=0
+    ).fit(X)
+    compiled = CompiledForest(model)
+
+    np.testing.assert_allclose(compiled.decision_function(X), model.decision_function(X), atol=1e-9)
@@ -0,0 +1,44 @@
+import asyncio
+import sys
+
+import httpx
+
+sys.path.insert(0, "backend")
+
+from src.http_gateway import HttpGateway
+
+
+def test_clients_are_pooled_per_host():
+    gateway = HttpGateway()
+    a1 = gateway.client_for("https://model1.example/predict")
+    a2 = gateway.client_for("https://model1.example/health")
+    b = gateway.client_for("https://model4.example/predict")
+
+    assert a1 is a2
+    assert a1 is not b
+    asyncio.run(gateway.aclose())
+
+
+def test_in_flight_is_tracked_per_host():
+    gateway = HttpGateway()
+    seen = []
+
+    async def handler(request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(0.01)
+        seen.append(gateway.pool_stats()["https://model1.example"]["in_flight"])
+        return httpx.Response(200, json={"ok": True})
+
+    async def run():
+        pool = gateway._pool("https://model1.example/predict")
+        pool.client = httpx.AsyncClient(transport=httpx.MockTransport(handler))
+        responses = await asyncio.gather(
+            *[gateway.post("https://model1.example/predict", json={}) for _ in range(3)]
+        )
+        await gateway.aclose()
+        return responses
+
+    responses = asyncio.run(run())
+
+    assert [r.status_code for r in responses] == [200, 200, 200]
+    assert max(seen) == 3
+    assert gateway.pool_stats() == {}
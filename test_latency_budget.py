@@ -0,0 +1,98 @@
+import asyncio
+import sys
+import time
+
+sys.path.insert(0, "backend")
+
+from src.decision_controller import get_dynamic_weights
+from src.threat_engine import generate_report
+
+
+def test_weights_renormalize_without_model4():
+    weights = get_dynamic_weights(is_api_request=False, model4_ran=False)
+
+    assert weights["w_url"] == 0.0
+    assert abs(sum(weights.values()) - 1.0) < 1e-3
+
+
+def _report(model4_result):
+    return asyncio.run(generate_report(
+        url="https://example.com",
+        domain_check={"domain": "example.com", "passes_domain_filter": True, "threat_flags": {}},
+        model4_result=model4_result,
+        anomaly_result={
+            "model1_ran": False,
+            "model3_ran": True,
+            "traffic_confidence": 0.0,
+            "deadline_skipped": ["model1"],
+        },
+        is_api_request=True,
+    ))
+
+
+def test_report_lists_models_skipped_by_deadline():
+    late = _report({"classification": "unknown", "confidence": 0.0, "model4_ran": False})
+    unknown = _report({"classification": "unknown", "confidence": 1.0})
+
+    assert late.deadline_skipped == ["model4", "model1"]
+    assert unknown.deadline_skipped == ["model1"]
+    # A Model 4 that missed the deadline must not score like an "unknown" URL
+    assert late.threat_scores.overall_threat_score < unknown.threat_scores.overall_threat_score
+
+
+class _SlowDomains:
+    """Domain intelligence whose check never fits the budget."""
+
+    hf_model4_url = "https://model4.example/predict"
+
+    def __init__(self):
+        self.cached = []
+
+    async def check_domain(self, url, raw_request=""):
+        await asyncio.sleep(1.0)
+        return {"domain": "slow.example", "passes_domain_filter": False, "threat_flags": {}}
+
+    async def call_model4(self, features):
+        return {"classification": "unknown", "confidence": 0.0}
+
+    async def cache_classification(self, *args):
+        self.cached.append(args)
+
+
+def test_domain_stage_is_bounded_by_the_budget(monkeypatch):
+    import httpx
+    import main
+
+    domains = _SlowDomains()
+    monkeypatch.setattr(main, "domain_intelligence", domains)
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            start = time.perf_counter()
+            response = await client.post(
+                "/analyze", json={"url": "https://slow.example/"}, headers={"X-Latency-Budget-Ms": "100"},
+            )
+            return response, time.perf_counter() - start
+
+    response, elapsed = asyncio.run(run())
+    assert response.status_code == 200
+    assert elapsed < 0.5
+    assert response.json()["deadline_skipped"] == ["domain"]
+
+
+def test_late_unknown_model4_results_are_not_cached(monkeypatch):
+    import main
+
+    domains = _SlowDomains()
+    monkeypatch.setattr(main, "domain_intelligence", domains)
+
+    async def run():
+        for classification in ("unknown", "phishing"):
+            task = asyncio.get_running_loop().create_future()
+            task.set_result({"classification": classification, "confidence": 0.8})
+            main._cache_late_model4("late.example", task)
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert [args[1] for args in domains.cached] == ["phishing"]
@@ -0,0 +1,54 @@
+import asyncio
+import sys
+
+import joblib
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+
+sys.path.insert(0, "backend")
+
+from src.local_models import LocalInferenceEngine, configured_backend
+
+
+def _write_pipeline(path, n_features):
+    rng = np.random.RandomState(0)
+    X = rng.rand(200, n_features)
+    y = (X[:, 0] > 0.5).astype(int)
+    model = RandomForestClassifier(n_estimators=10, random_state=0).fit(X, y)
+    joblib.dump({"model": model, "scaler": None, "positive_class": 1}, path)
+
+
+def test_local_engine_scores_loaded_models(tmp_path):
+    model_path = tmp_path / "model1.pkl"
+    _write_pipeline(model_path, 11)
+
+    engine = LocalInferenceEngine(paths={"model1": str(model_path)}, pool_kind="thread", workers=1)
+    try:
+        assert engine.available("model1")
+        assert not engine.available("model3")
+
+        attack, attack_conf = asyncio.run(engine.predict("model1", np.full((1, 11), 0.9)))
+        benign, benign_conf = asyncio.run(engine.predict("model1", np.full((1, 11), 0.1)))
+
+        assert attack is True and attack_conf > 0.5
+        assert benign is False and benign_conf < 0.5
+    finally:
+        engine.shutdown()
+
+
+def test_backend_resolution(tmp_path, monkeypatch):
+    model_path = tmp_path / "model3.pkl"
+    _write_pipeline(model_path, 35)
+    engine = LocalInferenceEngine(paths={"model3": str(model_path)}, workers=1)
+    try:
+        monkeypatch.setenv("MODEL3_BACKEND", "auto")
+        monkeypatch.setenv("MODEL1_BACKEND", "local")
+        monkeypatch.delenv("MODEL2_BACKEND", raising=False)
+
+        assert configured_backend("model2") == "remote"
+        assert engine.resolve_backend("model3") == "local"
+        # Explicit local without an artifact falls back to the HuggingFace Space
+        assert engine.resolve_backend("model1") == "remote"
+        assert engine.resolve_backend("model2") == "remote"
+    finally:
+        engine.shutdown()
@@ -0,0 +1,54 @@
+import logging
+import queue
+import sys
+
+sys.path.insert(0, "backend")
+
+from src.logging_config import NonBlockingQueueHandler, RateLimitFilter, SamplingFilter
+
+
+def _record(level=logging.DEBUG, lineno=10):
+    return logging.LogRecord("src.multi_predict", level, __file__, lineno, "msg", (), None)
+
+
+def test_rate_limit_per_call_site():
+    limiter = RateLimitFilter(limit=3, window=60)
+
+    passed = [limiter.filter(_record()) for _ in range(10)]
+    assert passed == [True] * 3 + [False] * 7
+    # A different call site has its own budget; INFO and above are not limited
+    assert limiter.filter(_record(lineno=11))
+    assert all(limiter.filter(_record(level=logging.INFO)) for _ in range(10))
+    assert limiter.filter(_record(level=logging.WARNING))
+
+
+def test_rate_limit_level_is_configurable():
+    limiter = RateLimitFilter(limit=1, window=60, max_level=logging.INFO)
+
+    assert [limiter.filter(_record(level=logging.INFO)) for _ in range(3)] == [True, False, False]
+    assert limiter.filter(_record(level=logging.WARNING, lineno=11))
+    assert limiter.filter(_record(level=logging.WARNING, lineno=11))
+
+
+def test_rate_limit_reports_suppressed_after_window():
+    limiter = RateLimitFilter(limit=1, window=0.0)
+    limiter._sites[("src.multi_predict", 10)] = [0.0, 1, 5]
+
+    record = _record()
+    assert limiter.filter(record)
+    assert record.suppressed == 5
+
+
+def test_sampling_only_drops_debug():
+    sampler = SamplingFilter(0.0)
+    assert not sampler.filter(_record(logging.DEBUG))
+    assert sampler.filter(_record(logging.INFO))
+    assert SamplingFilter(1.0).filter(_record(logging.DEBUG))
+
+
+def test_queue_handler_drops_instead_of_blocking():
+    handler = NonBlockingQueueHandler(queue.Queue(maxsize=2))
+    for _ in range(5):
+        handler.handle(_record(logging.INFO))
+    assert handler.queue.qsize() == 2
+    assert handler.dropped == 3
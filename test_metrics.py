@@ -0,0 +1,55 @@
+import sys
+import threading
+
+sys.path.insert(0, "backend")
+
+from src.metrics import Counter, Gauge, Histogram, Registry
+
+
+def test_counter_increments_are_not_lost_across_threads():
+    requests = Counter("test_requests_total", "Requests", ["endpoint"])
+
+    def worker():
+        child = requests.labels("/analyze")
+        for _ in range(10_000):
+            child.inc()
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert requests.labels("/analyze").value() == 80_000
+
+
+def test_prometheus_text_rendering():
+    registry = Registry()
+    latency = registry.register(Histogram("test_latency_seconds", "Latency", ["model"], buckets=(0.1, 1.0)))
+    sizes = registry.register(Gauge("test_entries", "Entries", ["structure"]))
+    latency.labels("model1").observe(0.05)
+    latency.labels("model1").observe(0.5)
+    latency.labels("model1").observe(3.0)
+    sizes.set_function(lambda: 42, "request_logs")
+
+    text = registry.render()
+
+    assert "# TYPE test_latency_seconds histogram" in text
+    assert 'test_latency_seconds_bucket{model="model1",le="0.1"} 1' in text
+    assert 'test_latency_seconds_bucket{model="model1",le="1"} 2' in text
+    assert 'test_latency_seconds_bucket{model="model1",le="+Inf"} 3' in text
+    assert 'test_latency_seconds_count{model="model1"} 3' in text
+    assert 'test_latency_seconds_sum{model="model1"} 3.55' in text
+    assert 'test_entries{structure="request_logs"} 42' in text
+
+
+def test_counter_bound_to_a_running_total():
+    registry = Registry()
+    dropped = {"n": 0}
+    registry.register(Counter("test_dropped_total", "Dropped records", fn=lambda: dropped["n"]))
+    dropped["n"] = 7
+
+    text = registry.render()
+
+    assert "# TYPE test_dropped_total counter" in text
+    assert "test_dropped_total 7" in text
@@ -7,6 +7,7 @@ sys.path.insert(0, "backend")
 from src.multi_predict import (
     _coerce_model2_features,
     _engineer_model3_features,
+    _engineer_model3_matrix,
     _extract_model1_features,
     _extract_model3_base,
 )
@@ -58,3 +59,26 @@ def test_model3_feature_contract():
     assert base_vec.shape == (18,)
     assert engineered.shape == (1, 35)
     assert np.isfinite(engineered).all()
+
+
+def test_model3_training_matrix_matches_rows():
+    # train_model3 engineers its whole (N, 18) base matrix at once
+    base = np.array([
+        _extract_model3_base("", {"request_length": length, "shannon_entropy": entropy})
+        for length, entropy in [(0.0, 0.0), (57.0, 3.5), (1500.0, 4.2), (1501.0, 1.0), (48000.0, 6.9)]
+    ])
+    engineered = _engineer_model3_matrix(base)
+
+    assert engineered.shape == (5, 35)
+    for i, base_vec in enumerate(base):
+        assert np.array_equal(engineered[i:i + 1], _engineer_model3_features(base_vec))
+
+
+def test_model3_scalar_path_matches_matrix_on_edge_values():
+    rng = np.random.default_rng(0)
+    base = rng.normal(size=(500, 18)) * 1e3
+    for value, share in ((0.0, 0.1), (-1e-9, 0.02), (np.nan, 0.02), (np.inf, 0.02), (-np.inf, 0.02)):
+        base[rng.random(base.shape) < share] = value
+
+    rows = np.vstack([_engineer_model3_features(vec) for vec in base])
+    assert rows.tobytes() == _engineer_model3_matrix(base).tobytes()
@@ -0,0 +1,30 @@
+import sys
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+
+import src.parallel_features as parallel_features
+from src.feature_engineering import extract_features_matrix
+from src.parallel_features import extract_features_parallel
+
+REQUESTS = [
+    "GET /api/users?page=1&limit=20 HTTP/1.1",
+    "GET /a?q=<script>alert(document.cookie)</script>",
+    "GET /login?user=admin' OR 1=1-- HTTP/1.1",
+    "GET /static/../../../etc/passwd HTTP/1.1",
+    "",
+]
+
+
+def test_small_input_stays_serial():
+    assert np.array_equal(extract_features_parallel(REQUESTS, workers=4), extract_features_matrix(REQUESTS))
+
+
+def test_parallel_matches_serial(monkeypatch):
+    monkeypatch.setattr(parallel_features, "MIN_PARALLEL_ROWS", 0)
+    requests = REQUESTS * 7
+
+    matrix = extract_features_parallel(requests, workers=2, chunk_rows=3)
+
+    assert np.array_equal(matrix, extract_features_matrix(requests))
@@ -0,0 +1,40 @@
+import sys
+
+sys.path.insert(0, "backend")
+
+from src.feature_engineering import compute_sql_keyword_score
+from src.multi_predict import MultiModelPredictor
+from src.pattern_matcher import RULE_PATTERNS, MultiPatternMatcher, scan_rules
+from src.request_parser import ParsedRequest
+
+
+def test_overlapping_and_prefix_patterns_all_found():
+    matcher = MultiPatternMatcher({"a": ["exec(", "execute("], "b": ["cute", "e("], "c": ["exec("]})
+
+    assert matcher.scan("x execute(1) exec(") == {
+        "a": frozenset({"exec(", "execute("}),
+        "b": frozenset({"cute", "e("}),
+        "c": frozenset({"exec("}),
+    }
+    assert matcher.scan("") == {"a": frozenset(), "b": frozenset(), "c": frozenset()}
+
+
+def test_rule_hits_match_substring_search():
+    requests = [
+        "GET /?q=1' OR '1'='1 union select * from users where 1=1--",
+        "GET /a?x=<IMG src=x onerror=alert(1)>&y=document.cookie",
+        "GET /static/..%2f..%2fetc/passwd",
+        "GET /a/../b/..\\c",
+        "POST /api HTTP/1.1\n\n{\"name\": \"Execute order\"}",
+    ]
+    for raw in requests:
+        lower = raw.lower()
+        hits = scan_rules(ParsedRequest(raw))
+        for name, patterns in RULE_PATTERNS.items():
+            assert hits[name] == {p for p in patterns if p in lower}
+
+    assert MultiModelPredictor._detect_sqli(requests[0])
+    assert MultiModelPredictor._detect_xss(requests[1])
+    assert MultiModelPredictor._detect_path_traversal(requests[3])
+    assert not MultiModelPredictor._detect_sqli(requests[4])
+    assert compute_sql_keyword_score(requests[0]) == 3
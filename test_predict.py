@@ -0,0 +1,50 @@
+import sys
+
+import joblib
+import pytest
+from sklearn.ensemble import IsolationForest
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, "backend")
+
+from src.feature_engineering import FEATURE_COLUMNS, extract_features_matrix
+from src.predict import Predictor
+
+REQUESTS = [
+    "GET /api/users?page=1&limit=20 HTTP/1.1",
+    "GET /login?user=admin' OR 1=1-- HTTP/1.1",
+    "GET /a?q=<script>alert(document.cookie)</script>",
+    "GET /static/../../../etc/passwd HTTP/1.1",
+]
+
+
+@pytest.fixture
+def model_path(tmp_path):
+    # Columns stored in a different order than FEATURE_COLUMNS
+    X = extract_features_matrix([f"GET /api/items/{i}?page={i % 7} HTTP/1.1" for i in range(200)])[:, ::-1]
+    scaler = StandardScaler().fit(X)
+    model = IsolationForest(n_estimators=20, random_state=0).fit(scaler.transform(X))
+    path = tmp_path / "isolation_forest.pkl"
+    joblib.dump({"model": model, "scaler": scaler, "feature_columns": FEATURE_COLUMNS[::-1]}, path)
+    return str(path)
+
+
+def test_batch_rows_match_single_predictions(model_path):
+    predictor = Predictor(model_path)
+
+    results = predictor.predict_batch(REQUESTS)
+
+    assert len(results) == len(REQUESTS)
+    assert results.scores.shape == (len(REQUESTS),)
+    assert results.features.shape == (len(REQUESTS), len(predictor.feature_columns))
+    assert list(results) == [predictor.predict(r) for r in REQUESTS]
+    assert results[-1] == results[len(REQUESTS) - 1]
+    assert list(results.to_frame()["prediction"]) == [r["prediction"] for r in results]
+    assert int(results.suspicious.sum()) == sum(r["prediction"] == "Suspicious" for r in results)
+
+
+def test_empty_batch(model_path):
+    results = Predictor(model_path).predict_batch([])
+
+    assert len(results) == 0 and list(results) == []
+    assert results.to_frame().empty
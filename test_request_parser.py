@@ -0,0 +1,58 @@
+import sys
+
+import numpy as np
+
+sys.path.insert(0, "backend")
+
+from src.feature_engineering import (
+    compute_script_tag_score,
+    compute_shannon_entropy,
+    compute_sql_keyword_score,
+    count_special_chars,
+    extract_features,
+)
+from src.multi_predict import _extract_model1_features
+from src.request_parser import ParsedRequest
+
+REQUESTS = [
+    "POST /api/login?next=/home HTTP/1.1\r\nHost: api.example.com\r\nCookie: sid=1; t=2\r\n"
+    "User-Agent: curl/8.4\r\nContent-Type: application/json\r\n\r\n{\"user\": \"admin' OR 1=1--\"}",
+    "GET /u/123e4567-e89b-12d3-a456-426614174000?q=<script>alert(document.cookie)</script> HTTP/1.1\nHost: b",
+    "GET /static/../../etc/passwd",
+    "select\x0cfrom:where\x1cUNION",
+    "",
+]
+
+
+def test_parsed_request_parts():
+    parsed = ParsedRequest(REQUESTS[0])
+
+    assert parsed.method == "POST"
+    assert parsed.url == "/api/login?next=/home"
+    assert parsed.host == "api.example.com"
+    assert parsed.cookie == "sid=1; t=2"
+    assert parsed.body == "{\"user\": \"admin' OR 1=1--\"}"
+    assert parsed.is_api
+    assert not ParsedRequest(REQUESTS[2]).is_api
+
+
+def test_shared_parse_matches_string_features():
+    for raw in REQUESTS:
+        parsed = ParsedRequest(raw)
+        assert extract_features(parsed) == extract_features(raw)
+        assert np.array_equal(_extract_model1_features(parsed), _extract_model1_features(raw))
+
+
+def test_model1_payload_features_match_joined_text():
+    for raw in REQUESTS:
+        parsed = ParsedRequest(raw)
+        payload_text = "\n".join(filter(None, [
+            parsed.method, parsed.url, parsed.body, parsed.cookie, parsed.user_agent, raw,
+        ]))
+        X = _extract_model1_features(parsed)[0]
+
+        assert X[3] == count_special_chars(payload_text)
+        assert X[4] == sum(c.isdigit() for c in payload_text) / max(1, len(payload_text))
+        assert X[5] == compute_shannon_entropy(payload_text)
+        assert X[6] == compute_sql_keyword_score(payload_text)
+        assert X[7] == compute_script_tag_score(payload_text)
@@ -0,0 +1,123 @@
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, "backend")
+
+from src.bot_feature_builder import BOT_FEATURE_COUNT, generate_flow_features
+from src.sessionizer import Sessionizer
+
+
+def _live_traffic(n_rows, n_ips, seed):
+    rng = np.random.RandomState(seed)
+    # Same-second bursts, sub-second and multi-second gaps, long sessions
+    ts = 1709337598.0 + np.cumsum(rng.choice([0.0, 0.0, 0.001, 0.2, 1.0, 3.0, 40.0], size=n_rows))
+    urls = np.array(["/", "/a", "/a/b?x=1", "/api/v1/items/3", "/static//x.js"])
+    return (
+        ts,
+        rng.choice([f"10.0.0.{i}" for i in range(n_ips)], size=n_rows),
+        urls[rng.randint(0, len(urls), size=n_rows)],
+        rng.choice(["curl/8.0", "Mozilla/5.0"], size=n_rows),
+    )
+
+
+def test_running_features_match_offline_flow_features():
+    ts, ips, urls, uas = _live_traffic(5000, 12, seed=3)
+    sessions = Sessionizer(idle_seconds=1e12, min_requests=1)
+    for row in zip(ips, urls, ts, uas):
+        assert len(sessions.update(*row)) == BOT_FEATURE_COUNT
+
+    labels, expected = generate_flow_features(pd.DataFrame({
+        "timestamp": pd.to_datetime(ts, unit="s"), "ip": ips, "url": urls, "user_agent": uas,
+    }))
+    actual = np.array([sessions.features(ip) for ip in labels])
+    np.testing.assert_allclose(actual, expected, rtol=1e-9, atol=1e-9)
+
+
+def test_burst_ratio_tracks_busiest_seconds():
+    sessions = Sessionizer(min_requests=1)
+    # 20 seconds; seconds 3 and 11 carry 5 and 4 requests, the rest one each
+    for second in range(20):
+        for _ in range({3: 5, 11: 4}.get(second, 1)):
+            features = sessions.update("1.2.3.4", "/", 1000.0 + second)
+    assert features[1] == 27
+    assert features[10] == 9 / 27
+
+
+def test_session_lifecycle():
+    sessions = Sessionizer(idle_seconds=60, max_ips=2, min_requests=3)
+    assert sessions.update("a", "/", 0.0) is None
+    assert sessions.update("a", "/", 1.0) is None
+    assert sessions.update("a", "/x", 2.0)[1] == 3
+    # A late timestamp counts as the last one seen
+    assert sessions.update("a", "/", 1.5)[8] == 0.0
+
+    # An idle gap starts a new session
+    assert sessions.update("a", "/", 100.0) is None
+    assert sessions.features("a")[1] == 1
+
+    sessions.update("b", "/", 101.0)
+    sessions.update("c", "/", 102.0)
+    assert len(sessions) == 2 and sessions.features("a") is None
+
+    assert sessions.evict_idle(now=161.5) == 1
+    assert sessions.features("b") is None and sessions.features("c") is not None
+
+
+def test_analyze_sessions_by_the_analyzed_client(monkeypatch):
+    import asyncio
+
+    import httpx
+    import main
+
+    calls = []
+
+    class _Predictor:
+        async def predict(self, request, flow_features=None, deadline=None, session_flows=False):
+            calls.append((flow_features, session_flows))
+            return {"model1_ran": False, "model2_ran": False, "model3_ran": False, "deadline_skipped": []}
+
+    monkeypatch.setattr(main, "predictor", _Predictor())
+    monkeypatch.setattr(main, "domain_intelligence", None)
+    monkeypatch.setattr(main, "sessionizer", Sessionizer(min_requests=2))
+    forwarded = "GET /a/b?x=1 HTTP/1.1\nHost: shop.example\nX-Forwarded-For: 203.0.113.7, 10.0.0.1\nUser-Agent: curl/8.0"
+    anonymous = "GET /a HTTP/1.1\nHost: shop.example"
+
+    async def run():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            for raw in (forwarded, anonymous, forwarded):
+                await client.post("/analyze", json={"raw_request": raw})
+
+    asyncio.run(run())
+    # Keyed by X-Forwarded-For, not by the /analyze caller; marked as session flows
+    assert [features is None for features, _ in calls] == [True, True, False]
+    assert all(session_flows for _, session_flows in calls)
+    assert main.sessionizer.features("203.0.113.7")[1] == 2
+    assert len(main.sessionizer) == 1
+
+
+def test_session_flows_run_model2_and_supplied_flows_model3():
+    import asyncio
+
+    from src.multi_predict import MultiModelPredictor
+
+    predictor = MultiModelPredictor.__new__(MultiModelPredictor)
+    predictor._base_model = predictor._base_scaler = object()
+    predictor._extract_and_score_local = lambda parsed: ({"sql_keyword_score": 0, "script_tag_score": 0}, 0.1)
+
+    async def bot(features):
+        return True, 0.9, "scraper"
+
+    async def traffic(request, base):
+        return True, 0.8
+
+    predictor._predict_bot, predictor._predict_traffic = bot, traffic
+    flows = [1.0] * BOT_FEATURE_COUNT
+    live = asyncio.run(predictor.predict("GET / HTTP/1.1", flows, session_flows=True))
+    supplied = asyncio.run(predictor.predict("GET / HTTP/1.1", flows))
+
+    assert (live["model2_ran"], live["model3_ran"], live["threat_type"]) == (True, False, "Bot Activity")
+    # Flows supplied to /predict still run Model 3 only
+    assert (supplied["model2_ran"], supplied["model3_ran"]) == (False, True)
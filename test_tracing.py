@@ -0,0 +1,43 @@
+import asyncio
+import sys
+
+sys.path.insert(0, "backend")
+
+from src import tracing
+from src.tracing import span, traced
+
+
+def test_span_is_noop_without_trace():
+    assert tracing.current_trace() is None
+    with span("payload_scan") as s:
+        pass
+    assert s is tracing._NOOP
+    assert tracing.start_trace() is None  # TRACE_SAMPLE_RATE defaults to 0
+
+
+def test_trace_collects_parallel_spans_and_histograms():
+    async def stage(delay):
+        await asyncio.sleep(delay)
+        with span("inner"):
+            pass
+
+    async def handler():
+        token = tracing.start_trace("abc123", force=True)
+        with span("domain_check"):
+            await asyncio.sleep(0)
+        await asyncio.gather(traced("model4", stage(0.01)), traced("predict", stage(0.0)))
+        return tracing.finish_trace(token)
+
+    trace = asyncio.run(handler())
+
+    assert trace.trace_id == "abc123"
+    names = [name for name, _, _ in trace.spans]
+    assert sorted(names) == ["domain_check", "inner", "inner", "model4", "predict"]
+    durations = {name: dur for name, _, dur in trace.spans}
+    assert durations["model4"] >= 10_000_000
+    assert "model4;dur=" in trace.server_timing()
+    assert tracing.current_trace() is None
+
+    stages = tracing.stage_histograms()
+    assert stages["model4"]["count"] >= 1
+    assert stages["total"]["count"] >= 1